@@ -0,0 +1,205 @@
+import asyncio
+import time
+import asyncpg
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Iterable, List, Optional, Tuple
+from .config import settings
+from .replicas import replica_addresses, replica_monitor, parse_lsn, write_position_key
+from app.utils.exceptions import PoolTimeoutException, ReadOnlyUnitOfWorkException
+from app.utils.metrics import DB_QUERY_DURATION, DB_POOL_WAIT, DB_READ_ROUTES, statement_label
+from app.utils import profiler
+from app.services.async_cache_service import get_string, set_strings
+
+async_pool: Optional[asyncpg.Pool] = None
+replica_pools: List[asyncpg.Pool] = []
+
+def _log_query(record):
+    # Runs via loop.call_soon in the querying task's context
+    label = statement_label(record.query)
+    DB_QUERY_DURATION.observe(record.elapsed, "asyncpg", label)
+    profiler.record("sql", label, record.elapsed, record.args)
+    profiler.log_slow_statement("asyncpg", label, record.elapsed)
+
+async def _init_connection(conn: asyncpg.Connection):
+    conn.add_query_logger(_log_query)
+
+async def _create_pool(host: str, port: int, min_size: int) -> asyncpg.Pool:
+    return await asyncpg.create_pool(
+        min_size=min_size,
+        max_size=settings.db_async_pool_max_size,
+        max_inactive_connection_lifetime=settings.db_pool_max_lifetime,
+        init=_init_connection,
+        host=host,
+        port=port,
+        database=settings.db_name,
+        user=settings.db_user,
+        password=settings.db_password or None
+    )
+
+async def init_async_pool():
+    global async_pool, replica_pools
+    try:
+        async_pool = await _create_pool(settings.db_host, settings.db_port, settings.db_async_pool_min_size)
+        # Replica pools connect on demand, so a replica that is down doesn't block startup
+        replica_pools = [await _create_pool(host, port, 0) for host, port in replica_addresses()]
+        print("Async database connection pool initialized"
+              + (f" with {len(replica_pools)} read replica(s)" if replica_pools else ""))
+    except Exception as e:
+        print(f"Failed to initialize async connection pool: {e}")
+        raise
+
+async def close_async_pool():
+    for pool in replica_pools:
+        await pool.close()
+    if async_pool is not None:
+        await async_pool.close()
+
+async def _acquire(pool: Optional[asyncpg.Pool] = None, label: str = "async") -> asyncpg.Connection:
+    pool = pool or async_pool
+    if pool is None:
+        raise Exception("Async connection pool not initialized")
+    started = time.perf_counter()
+    try:
+        conn = await asyncio.wait_for(pool.acquire(), timeout=settings.db_pool_acquire_timeout)
+        DB_POOL_WAIT.observe(time.perf_counter() - started, label)
+        return conn
+    except asyncio.TimeoutError:
+        raise PoolTimeoutException(
+            f"No database connection available within {settings.db_pool_acquire_timeout:.1f}s"
+        )
+
+async def _acquire_read(user_id: Optional[int]) -> Tuple[asyncpg.Connection, asyncpg.Pool]:
+    # A healthy replica that has replayed the user's last recorded write, or
+    # the primary. If Redis can't say whether the user wrote, the primary.
+    if not replica_pools:
+        return await _acquire(), async_pool
+    
+    index = None
+    known, position = (await get_string(write_position_key(user_id))) if user_id is not None else (True, None)
+    if known:
+        index = replica_monitor.choose(parse_lsn(position) if position else 0)
+    if index is not None:
+        try:
+            conn = await _acquire(replica_pools[index], "async_replica")
+            DB_READ_ROUTES.inc("asyncpg", "replica")
+            return conn, replica_pools[index]
+        except PoolTimeoutException:
+            pass
+        except Exception as e:
+            replica_monitor.mark_down(index, e)
+    DB_READ_ROUTES.inc("asyncpg", "primary")
+    return await _acquire(), async_pool
+
+async def record_writes(user_ids: Iterable[int]):
+    # Call once the write has committed. Until a replica replays past the
+    # primary's current WAL position, these users' reads stay on the primary.
+    user_ids = set(user_ids)
+    if not replica_pools or not user_ids:
+        return
+    conn = await _acquire()
+    try:
+        position = await conn.fetchval("SELECT pg_current_wal_lsn()::text")
+    finally:
+        await async_pool.release(conn)
+    await set_strings([write_position_key(user_id) for user_id in user_ids], position,
+                      settings.db_replica_read_your_writes_ttl)
+
+class AsyncUnitOfWork:
+    # asyncio counterpart of database.UnitOfWork: one connection and one
+    # transaction for every async repository call made while it is active.
+    # A read-only unit may run on a replica and must not write.
+    def __init__(self, read_only: bool = False, user_id: Optional[int] = None):
+        self.read_only = read_only
+        self.user_id = user_id
+        self.conn: Optional[asyncpg.Connection] = None
+        self.pool: Optional[asyncpg.Pool] = None
+        self.transaction = None
+    
+    async def connection(self) -> asyncpg.Connection:
+        if self.conn is None:
+            if self.read_only:
+                self.conn, self.pool = await _acquire_read(self.user_id)
+            else:
+                self.conn, self.pool = await _acquire(), async_pool
+            self.transaction = self.conn.transaction(readonly=self.read_only)
+            await self.transaction.start()
+        return self.conn
+
+_current_unit: ContextVar[Optional[AsyncUnitOfWork]] = ContextVar("async_unit_of_work", default=None)
+
+def _check_writable(unit: AsyncUnitOfWork, read_only: bool):
+    if unit.read_only and not read_only:
+        raise ReadOnlyUnitOfWorkException("Cannot write inside a read-only unit of work")
+
+@asynccontextmanager
+async def async_unit_of_work(read_only: bool = False, user_id: Optional[int] = None):
+    current = _current_unit.get()
+    if current is not None:
+        _check_writable(current, read_only)
+        yield current
+        return
+    
+    unit = AsyncUnitOfWork(read_only, user_id)
+    token = _current_unit.set(unit)
+    try:
+        yield unit
+        if unit.conn is not None:
+            await unit.transaction.commit()
+    except BaseException:
+        if unit.conn is not None:
+            await unit.transaction.rollback()
+        raise
+    finally:
+        _current_unit.reset(token)
+        if unit.conn is not None:
+            await unit.pool.release(unit.conn)
+
+@asynccontextmanager
+async def get_async_connection(read_only: bool = False, user_id: Optional[int] = None):
+    # read_only calls outside a unit of work may be served by a replica; pass
+    # the user whose data is read so their own recent writes are visible
+    unit = _current_unit.get()
+    if unit is not None:
+        _check_writable(unit, read_only)
+        yield await unit.connection()
+        return
+    
+    if read_only:
+        conn, pool = await _acquire_read(user_id)
+    else:
+        conn, pool = await _acquire(), async_pool
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+@asynccontextmanager
+async def get_async_primary_connection():
+    # See database.get_primary_connection
+    unit = _current_unit.get()
+    if unit is not None:
+        conn = await unit.connection()
+        if unit.pool is async_pool:
+            yield conn
+            return
+    
+    conn = await _acquire()
+    try:
+        yield conn
+    finally:
+        await async_pool.release(conn)
+
+def _stats(pool: asyncpg.Pool) -> dict:
+    size = pool.get_size()
+    idle = pool.get_idle_size()
+    return {'size': size, 'in_use': size - idle, 'idle': idle,
+            'min_size': pool.get_min_size(), 'max_size': pool.get_max_size()}
+
+def pool_stats() -> Optional[dict]:
+    if async_pool is None:
+        return None
+    return _stats(async_pool)
+
+def replica_pool_stats() -> List[dict]:
+    return [_stats(pool) for pool in replica_pools]
@@ -0,0 +1,78 @@
+import argparse
+import sys
+import time
+from app.config import settings
+from app.database import init_pool
+from app.replicas import replica_monitor
+from app.repositories.position_repository import PositionRepository
+from app.services.batch_portfolio_service import BatchPortfolioService, ndjson_lines
+
+def positions_command(args) -> int:
+    position_repo = PositionRepository()
+    
+    if args.action == 'rebuild':
+        rebuilt = position_repo.rebuild(args.user_id)
+        print(f"Rebuilt {rebuilt} positions from transactions")
+        return 0
+    
+    mismatches = position_repo.verify(args.user_id)
+    for row in mismatches:
+        print(
+            f"Mismatch user={row['user_id']} symbol={row['symbol']}: "
+            f"buy_units {row['actual_buy_units']} != {row['expected_buy_units']}, "
+            f"buy_cost {row['actual_buy_cost']} != {row['expected_buy_cost']}, "
+            f"sell_units {row['actual_sell_units']} != {row['expected_sell_units']}"
+        )
+    print(f"Positions verified: {len(mismatches)} mismatches")
+    return 1 if mismatches else 0
+
+def summaries_command(args) -> int:
+    # NDJSON goes to stdout or --output; the tally to stderr
+    started = time.perf_counter()
+    batch = BatchPortfolioService(args.page_size).summaries(args.user_id, args.warm_cache)
+    output = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for page in batch:
+            output.write(ndjson_lines(page))
+    finally:
+        if args.output:
+            output.close()
+        else:
+            output.flush()
+    print(
+        f"Wrote {batch.found} summaries ({batch.missing} unknown users, {batch.warmed} cached) "
+        f"in {time.perf_counter() - started:.1f}s",
+        file=sys.stderr
+    )
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="WealthWise maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    positions = subparsers.add_parser("positions", help="Rebuild or verify the positions aggregate")
+    positions.add_argument("action", choices=["rebuild", "verify"])
+    positions.add_argument("--user-id", type=int, default=None, help="Limit to a single user")
+    positions.set_defaults(handler=positions_command)
+    
+    summaries = subparsers.add_parser("summaries", help="Write portfolio summaries as NDJSON")
+    summaries.add_argument("--user-id", type=int, action="append", default=None,
+                           help="Repeat for several users; all users when omitted")
+    summaries.add_argument("--output", default=None, help="File to write instead of stdout")
+    summaries.add_argument("--warm-cache", action="store_true", help="Also cache each summary for GET /portfolio-summary")
+    summaries.add_argument("--page-size", type=int, default=settings.batch_summary_page_size)
+    summaries.set_defaults(handler=summaries_command)
+    
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    init_pool()
+    replica_monitor.start()
+    try:
+        return args.handler(args)
+    finally:
+        replica_monitor.stop()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,12 +9,56 @@ class Settings:
     db_name: str = os.getenv("DB_NAME", "wealthwise")
     db_user: str = os.getenv("DB_USER", os.getenv("USER", "postgres"))
     db_password: str = os.getenv("DB_PASSWORD", "")
+    db_pool_min_size: int = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+    db_pool_max_size: int = int(os.getenv("DB_POOL_MAX_SIZE", "20"))
+    db_pool_acquire_timeout: float = float(os.getenv("DB_POOL_ACQUIRE_TIMEOUT", "5"))
+    db_pool_max_lifetime: float = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+    db_pool_health_check_idle: float = float(os.getenv("DB_POOL_HEALTH_CHECK_IDLE", "30"))
+    db_async_pool_min_size: int = int(os.getenv("DB_ASYNC_POOL_MIN_SIZE", "2"))
+    db_async_pool_max_size: int = int(os.getenv("DB_ASYNC_POOL_MAX_SIZE", "20"))
+    db_prepare_statements: bool = os.getenv("DB_PREPARE_STATEMENTS", "false").lower() == "true"
+    # Comma-separated host[:port] list of streaming replicas; empty sends every query to the primary
+    db_replica_hosts: str = os.getenv("DB_REPLICA_HOSTS", "")
+    db_replica_max_lag_bytes: int = int(os.getenv("DB_REPLICA_MAX_LAG_BYTES", "16777216"))
+    db_replica_check_interval: float = float(os.getenv("DB_REPLICA_CHECK_INTERVAL", "1.0"))
+    db_replica_read_your_writes_ttl: int = int(os.getenv("DB_REPLICA_READ_YOUR_WRITES_TTL", "300"))
+    profiling_enabled: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    profiling_allow_header: bool = os.getenv("PROFILING_ALLOW_HEADER", "false").lower() == "true"
+    profiling_slow_request_ms: float = float(os.getenv("PROFILING_SLOW_REQUEST_MS", "500"))
+    slow_query_ms: float = float(os.getenv("SLOW_QUERY_MS", "200"))
+    atomic_sells: bool = os.getenv("ATOMIC_SELLS", "true").lower() == "true"
     
     secret_key: str = os.getenv("SECRET_KEY", "welthwise")
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 1440
+    auth_pool_workers: int = int(os.getenv("AUTH_POOL_WORKERS", "2"))
+    auth_pool_max_queue: int = int(os.getenv("AUTH_POOL_MAX_QUEUE", "64"))
+    auth_pool_timeout: float = float(os.getenv("AUTH_POOL_TIMEOUT", "5"))
+    auth_token_cache_size: int = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
     
     redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     cache_ttl: int = 300
+    cache_generation_ttl: int = int(os.getenv("CACHE_GENERATION_TTL", "86400"))
+    local_cache_max_entries: int = int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", "10000"))
+    local_cache_max_bytes: int = int(os.getenv("LOCAL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    local_cache_ttl: float = float(os.getenv("LOCAL_CACHE_TTL", "30"))
+    price_update_interval: int = int(os.getenv("PRICE_UPDATE_INTERVAL", "60"))
+    scheduler_election_interval: float = float(os.getenv("SCHEDULER_ELECTION_INTERVAL", "5"))
+    scheduler_lock_key: int = int(os.getenv("SCHEDULER_LOCK_KEY", "727001"))
+    price_snapshot_check_interval: float = float(os.getenv("PRICE_SNAPSHOT_CHECK_INTERVAL", "1.0"))
+    live_max_subscribers: int = int(os.getenv("LIVE_MAX_SUBSCRIBERS", "10000"))
+    live_heartbeat_interval: float = float(os.getenv("LIVE_HEARTBEAT_INTERVAL", "15"))
+    history_max_points: int = int(os.getenv("HISTORY_MAX_POINTS", "500"))
+    bulk_import_max_rows: int = int(os.getenv("BULK_IMPORT_MAX_ROWS", "200000"))
+    bulk_import_max_errors: int = int(os.getenv("BULK_IMPORT_MAX_ERRORS", "1000"))
+    batch_summary_page_size: int = int(os.getenv("BATCH_SUMMARY_PAGE_SIZE", "1000"))
+    cache_warm_enabled: bool = os.getenv("CACHE_WARM_ENABLED", "true").lower() == "true"
+    cache_warm_active_window: int = int(os.getenv("CACHE_WARM_ACTIVE_WINDOW", "3600"))
+    cache_warm_max_users: int = int(os.getenv("CACHE_WARM_MAX_USERS", "20000"))
+    cache_warm_workers: int = int(os.getenv("CACHE_WARM_WORKERS", "4"))
+    cache_warm_chunk_size: int = int(os.getenv("CACHE_WARM_CHUNK_SIZE", "250"))
+    cache_warm_budget: float = float(os.getenv("CACHE_WARM_BUDGET", "20"))
+    cache_warm_touch_interval: float = float(os.getenv("CACHE_WARM_TOUCH_INTERVAL", "60"))
+    cache_bulk_invalidate_threshold: int = int(os.getenv("CACHE_BULK_INVALIDATE_THRESHOLD", "10000"))
 
 settings = Settings()
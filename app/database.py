@@ -1,33 +1,372 @@
+import re
+import time
+import threading
 import psycopg2
-from psycopg2 import pool
+import psycopg2.extensions
 from psycopg2.extras import RealDictCursor
+from collections import deque
 from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable, Optional, Dict, List, Tuple
 from .config import settings
+from .replicas import replica_addresses, replica_monitor, parse_lsn, write_position_key
+from app.utils.exceptions import PoolTimeoutException, ReadOnlyUnitOfWorkException
+from app.utils.metrics import DB_QUERY_DURATION, DB_POOL_WAIT, DB_READ_ROUTES, statement_label
+from app.utils import profiler
+from app.services.cache_service import get_string, set_strings
 
 connection_pool = None
+replica_pools: List["ConnectionPool"] = []
+
+ACQUIRE_LATENCY_BUCKETS_MS = [0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000]
+MAX_PREPARED_STATEMENTS = 256
+
+class PooledConnection(psycopg2.extensions.connection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.prepared: Dict[str, str] = {}
+
+class Cursor(RealDictCursor):
+    # With DB_PREPARE_STATEMENTS on, positional-parameter statements are
+    # PREPAREd once per connection and re-run with EXECUTE, skipping the
+    # parse/plan step on every later call. Every statement is timed.
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return self._execute(query, vars)
+        finally:
+            elapsed = time.perf_counter() - started
+            label = statement_label(query)
+            DB_QUERY_DURATION.observe(elapsed, "psycopg2", label)
+            profiler.record("sql", label, elapsed, vars)
+            profiler.log_slow_statement("psycopg2", label, elapsed)
+    
+    def _execute(self, query, vars):
+        if not settings.db_prepare_statements or not vars or not isinstance(vars, (tuple, list)):
+            return super().execute(query, vars)
+        
+        prepared = self.connection.prepared
+        name = prepared.get(query)
+        if name is None:
+            if len(prepared) >= MAX_PREPARED_STATEMENTS or '%%' in query or '%(' in query:
+                return super().execute(query, vars)
+            name = f"ww_stmt_{len(prepared) + 1}"
+            counter = iter(range(1, len(vars) + 1))
+            super().execute(f"PREPARE {name} AS " + re.sub(r'%s', lambda _: f"${next(counter)}", query))
+            prepared[query] = name
+        return super().execute(f"EXECUTE {name} ({', '.join(['%s'] * len(vars))})", vars)
+
+class ConnectionPool:
+    # Thread-safe pool: callers block (up to acquire_timeout) for a free
+    # connection instead of failing when all max_size are checked out.
+    # Connections idle longer than health_check_idle are pinged before reuse
+    # and ones older than max_lifetime are replaced.
+    def __init__(self, min_size: int, max_size: int, acquire_timeout: float,
+                 max_lifetime: float, health_check_idle: float, name: str = "sync", **connect_kwargs):
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_idle = health_check_idle
+        self.connect_kwargs = connect_kwargs
+        self._idle: deque = deque()
+        self._size = 0
+        self._waiters = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._latency_counts = [0] * (len(ACQUIRE_LATENCY_BUCKETS_MS) + 1)
+        self._latency_sum_ms = 0.0
+        self._stats = {'acquired': 0, 'timeouts': 0, 'health_check_failures': 0, 'recycled': 0}
+        
+        for _ in range(min_size):
+            self._idle.append(self._connect())
+            self._size += 1
+    
+    def _connect(self) -> PooledConnection:
+        return psycopg2.connect(connection_factory=PooledConnection, **self.connect_kwargs)
+    
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+    
+    def _count(self, stat: str):
+        with self._cond:
+            self._stats[stat] += 1
+    
+    def _usable(self, conn) -> bool:
+        now = time.monotonic()
+        if conn.closed:
+            return False
+        if now - conn.created_at > self.max_lifetime:
+            self._count('recycled')
+            return False
+        if now - conn.last_used > self.health_check_idle:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                conn.rollback()
+            except Exception:
+                self._count('health_check_failures')
+                return False
+        return True
+    
+    def getconn(self, timeout: Optional[float] = None) -> PooledConnection:
+        started = time.monotonic()
+        deadline = started + (self.acquire_timeout if timeout is None else timeout)
+        
+        while True:
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or self._closed:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutException(
+                            f"No database connection available within {deadline - started:.1f}s"
+                        )
+                    self._waiters += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiters -= 1
+                conn = self._idle.pop() if self._idle else None
+                if conn is None:
+                    # Reserve the slot before connecting outside the lock
+                    self._size += 1
+            
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                break
+            if self._usable(conn):
+                break
+            self._close(conn)
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+        
+        elapsed_ms = (time.monotonic() - started) * 1000
+        DB_POOL_WAIT.observe(elapsed_ms / 1000, self.name)
+        with self._cond:
+            self._stats['acquired'] += 1
+            self._latency_sum_ms += elapsed_ms
+            for i, bound in enumerate(ACQUIRE_LATENCY_BUCKETS_MS):
+                if elapsed_ms <= bound:
+                    self._latency_counts[i] += 1
+                    break
+            else:
+                self._latency_counts[-1] += 1
+        return conn
+    
+    def putconn(self, conn, close: bool = False):
+        if not close and not conn.closed:
+            try:
+                if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                close = True
+        
+        with self._cond:
+            if close or conn.closed or self._closed:
+                self._close(conn)
+                self._size -= 1
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+            self._cond.notify()
+    
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                self._close(self._idle.pop())
+                self._size -= 1
+            self._cond.notify_all()
+    
+    def stats(self) -> Dict:
+        with self._cond:
+            idle = len(self._idle)
+            return {
+                'size': self._size,
+                'in_use': self._size - idle,
+                'idle': idle,
+                'waiters': self._waiters,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                **self._stats,
+                'acquire_latency_ms': {
+                    'buckets': {
+                        **{str(bound): count for bound, count in zip(ACQUIRE_LATENCY_BUCKETS_MS, self._latency_counts)},
+                        '+Inf': self._latency_counts[-1]
+                    },
+                    'sum': round(self._latency_sum_ms, 3)
+                }
+            }
+
+def _create_pool(host: str, port: int, min_size: int, name: str) -> ConnectionPool:
+    return ConnectionPool(
+        min_size=min_size,
+        max_size=settings.db_pool_max_size,
+        acquire_timeout=settings.db_pool_acquire_timeout,
+        max_lifetime=settings.db_pool_max_lifetime,
+        health_check_idle=settings.db_pool_health_check_idle,
+        name=name,
+        host=host,
+        port=port,
+        database=settings.db_name,
+        user=settings.db_user,
+        password=settings.db_password
+    )
 
 def init_pool():
-    global connection_pool
+    global connection_pool, replica_pools
     try:
-        connection_pool = psycopg2.pool.SimpleConnectionPool(
-            minconn=1,
-            maxconn=20,
-            host=settings.db_host,
-            port=settings.db_port,
-            database=settings.db_name,
-            user=settings.db_user,
-            password=settings.db_password
-        )
-        print("Database connection pool initialized")
+        connection_pool = _create_pool(settings.db_host, settings.db_port, settings.db_pool_min_size, "sync")
+        # Replica pools connect on demand, so a replica that is down doesn't block startup
+        replica_pools = [_create_pool(host, port, 0, "sync_replica") for host, port in replica_addresses()]
+        print("Database connection pool initialized"
+              + (f" with {len(replica_pools)} read replica(s)" if replica_pools else ""))
     except Exception as e:
         print(f"Failed to initialize connection pool: {e}")
         raise
 
-@contextmanager
-def get_db_connection():
+def _getconn_read(user_id: Optional[int]) -> Tuple[PooledConnection, ConnectionPool]:
+    # Same routing as async_database._acquire_read
     if connection_pool is None:
         raise Exception("Connection pool not initialized")
+    if not replica_pools:
+        return connection_pool.getconn(), connection_pool
     
+    index = None
+    known, position = get_string(write_position_key(user_id)) if user_id is not None else (True, None)
+    if known:
+        index = replica_monitor.choose(parse_lsn(position) if position else 0)
+    if index is not None:
+        try:
+            conn = replica_pools[index].getconn()
+            DB_READ_ROUTES.inc("psycopg2", "replica")
+            return conn, replica_pools[index]
+        except PoolTimeoutException:
+            pass
+        except Exception as e:
+            replica_monitor.mark_down(index, e)
+    DB_READ_ROUTES.inc("psycopg2", "primary")
+    return connection_pool.getconn(), connection_pool
+
+def record_writes(user_ids: Iterable[int]):
+    # Call once the write has committed; see async_database.record_writes
+    user_ids = set(user_ids)
+    if not replica_pools or not user_ids:
+        return
+    conn = connection_pool.getconn()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_current_wal_lsn()::text")
+            position = cursor.fetchone()[0]
+    finally:
+        connection_pool.putconn(conn)
+    set_strings([write_position_key(user_id) for user_id in user_ids], position,
+                settings.db_replica_read_your_writes_ttl)
+
+class UnitOfWork:
+    # One pooled connection and one database transaction shared by every
+    # repository call made while it is active. The connection is checked out
+    # on first use, so a unit that never touches the database costs nothing.
+    # A read-only unit may run on a replica and must not write.
+    def __init__(self, read_only: bool = False, user_id: Optional[int] = None):
+        self.read_only = read_only
+        self.user_id = user_id
+        self.conn = None
+        self.pool = None
+    
+    def connection(self):
+        if self.conn is None:
+            if self.read_only:
+                self.conn, self.pool = _getconn_read(self.user_id)
+            else:
+                if connection_pool is None:
+                    raise Exception("Connection pool not initialized")
+                self.conn, self.pool = connection_pool.getconn(), connection_pool
+        return self.conn
+
+_current_unit: ContextVar[Optional[UnitOfWork]] = ContextVar("unit_of_work", default=None)
+
+def _check_writable(unit: UnitOfWork, read_only: bool):
+    # A read-only unit may hold a replica connection; fail mis-routed writes
+    # here even when no replicas are configured
+    if unit.read_only and not read_only:
+        raise ReadOnlyUnitOfWorkException("Cannot write inside a read-only unit of work")
+
+@contextmanager
+def unit_of_work(read_only: bool = False, user_id: Optional[int] = None):
+    current = _current_unit.get()
+    if current is not None:
+        _check_writable(current, read_only)
+        yield current
+        return
+    
+    unit = UnitOfWork(read_only, user_id)
+    token = _current_unit.set(unit)
+    try:
+        yield unit
+        if unit.conn is not None:
+            unit.conn.commit()
+    except Exception:
+        if unit.conn is not None:
+            unit.conn.rollback()
+        raise
+    finally:
+        _current_unit.reset(token)
+        if unit.conn is not None:
+            unit.pool.putconn(unit.conn)
+
+@contextmanager
+def get_db_connection(read_only: bool = False, user_id: Optional[int] = None):
+    # read_only calls outside a unit of work may be served by a replica; pass
+    # the user whose data is read so their own recent writes are visible
+    unit = _current_unit.get()
+    if unit is not None:
+        _check_writable(unit, read_only)
+        yield unit.connection()
+        return
+    
+    if read_only:
+        conn, pool = _getconn_read(user_id)
+    else:
+        if connection_pool is None:
+            raise Exception("Connection pool not initialized")
+        conn, pool = connection_pool.getconn(), connection_pool
+    try:
+        yield conn
+    except Exception as e:
+        conn.rollback()
+        raise e
+    finally:
+        pool.putconn(conn)
+
+@contextmanager
+def get_primary_connection():
+    # Reads that must see the primary even inside a read-only unit of work,
+    # e.g. loading the process-wide price snapshot. If that unit is on a
+    # replica, a separate primary connection is used instead.
+    unit = _current_unit.get()
+    if unit is not None:
+        conn = unit.connection()
+        if unit.pool is connection_pool:
+            yield conn
+            return
+    
+    if connection_pool is None:
+        raise Exception("Connection pool not initialized")
     conn = connection_pool.getconn()
     try:
         yield conn
@@ -37,5 +376,11 @@ def get_db_connection():
     finally:
         connection_pool.putconn(conn)
 
+def commit(conn):
+    # Inside a unit of work the unit commits once at the end
+    unit = _current_unit.get()
+    if unit is None or unit.conn is not conn:
+        conn.commit()
+
 def get_db_cursor(conn):
-    return conn.cursor(cursor_factory=RealDictCursor)
+    return conn.cursor(cursor_factory=Cursor)
@@ -1,7 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 from app.database import init_pool
-from app.routers import users, transactions, portfolio, prices, auth, admin
-from app.utils.scheduler import start_scheduler
+from app.async_database import init_async_pool, close_async_pool
+from app.replicas import replica_monitor
+from app.routers import users, transactions, portfolio, prices, auth, admin, metrics
+from app.utils.scheduler import start_scheduler, stop_scheduler
+from app.services.cache_service import start_listener
+from app.services import async_cache_service
+from app.services.auth_service import password_pool
+from app.utils.exceptions import PoolTimeoutException, AuthBusyException
+from app.utils.metrics import MetricsMiddleware
+from app.utils.profiler import ProfilerMiddleware
 
 app = FastAPI(
     title="WealthWise Portfolio Tracker API",
@@ -11,17 +20,41 @@ app = FastAPI(
     openapi_url="/openapi.json"
 )
 
+app.add_middleware(ProfilerMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 @app.on_event("startup")
-def startup():
+async def startup():
     init_pool()
+    await init_async_pool()
+    replica_monitor.start()
+    start_listener()
     start_scheduler()
 
+@app.on_event("shutdown")
+async def shutdown():
+    stop_scheduler()
+    replica_monitor.stop()
+    password_pool.shutdown()
+    await close_async_pool()
+    await async_cache_service.close()
+
+@app.exception_handler(PoolTimeoutException)
+@app.exception_handler(AuthBusyException)
+def pool_timeout_handler(request: Request, exc: Exception):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": "1"}
+    )
+
 app.include_router(auth.router, tags=["Authentication"])
 app.include_router(users.router, tags=["Users"])
 app.include_router(transactions.router, tags=["Transactions"])
 app.include_router(portfolio.router, tags=["Portfolio"])
 app.include_router(prices.router, tags=["Prices"])
 app.include_router(admin.router, tags=["Admin"])
+app.include_router(metrics.router, tags=["Metrics"])
 
 @app.get("/", tags=["Root"])
 def root():
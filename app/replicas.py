@@ -0,0 +1,185 @@
+import itertools
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import psycopg2
+from .config import settings
+
+def replica_addresses() -> List[Tuple[str, int]]:
+    addresses = []
+    for entry in settings.db_replica_hosts.split(","):
+        entry = entry.strip()
+        if entry:
+            host, _, port = entry.partition(":")
+            addresses.append((host, int(port or settings.db_port)))
+    return addresses
+
+def parse_lsn(lsn: str) -> int:
+    # "16/B374D848" -> byte position in the WAL
+    high, low = lsn.split("/")
+    return (int(high, 16) << 32) | int(low, 16)
+
+def format_lsn(position: int) -> str:
+    return f"{position >> 32:X}/{position & 0xFFFFFFFF:X}"
+
+class ReplicaState:
+    __slots__ = ('host', 'port', 'healthy', 'replay_lsn', 'lag_bytes', 'error', 'checked_at')
+    
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.healthy = False
+        self.replay_lsn = 0
+        self.lag_bytes: Optional[int] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[str] = None
+
+# Tracks every replica's health and replay position on a background thread,
+# over its own connections rather than the pools. A replica takes reads only
+# while it answers, is in recovery, and is within max_lag_bytes of the
+# primary's pg_current_wal_lsn(). Both the sync and async pools route by it;
+# a replica is never trusted before its first successful check.
+class ReplicaMonitor:
+    def __init__(self, addresses: List[Tuple[str, int]], interval: float, max_lag_bytes: int):
+        self.interval = interval
+        self.max_lag_bytes = max_lag_bytes
+        self.states = [ReplicaState(host, port) for host, port in addresses]
+        self.primary_lsn: Optional[int] = None
+        self._connections: Dict[Tuple[str, int], psycopg2.extensions.connection] = {}
+        self._round_robin = itertools.count()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.states)
+    
+    def _query(self, host: str, port: int, sql: str):
+        conn = self._connections.get((host, port))
+        try:
+            if conn is None or conn.closed:
+                conn = psycopg2.connect(
+                    host=host, port=port, database=settings.db_name, user=settings.db_user,
+                    password=settings.db_password, connect_timeout=2, options="-c statement_timeout=2000"
+                )
+                conn.autocommit = True
+                self._connections[(host, port)] = conn
+            with conn.cursor() as cursor:
+                cursor.execute(sql)
+                return cursor.fetchone()
+        except Exception:
+            if conn is not None:
+                conn.close()
+            self._connections.pop((host, port), None)
+            raise
+    
+    def check(self):
+        try:
+            primary_lsn = parse_lsn(self._query(settings.db_host, settings.db_port, "SELECT pg_current_wal_lsn()::text")[0])
+        except Exception as e:
+            print(f"Replica check could not read the primary WAL position: {e}")
+            primary_lsn = None
+        
+        results = []
+        for state in self.states:
+            try:
+                in_recovery, replay_lsn = self._query(
+                    state.host, state.port, "SELECT pg_is_in_recovery(), pg_last_wal_replay_lsn()::text"
+                )
+                results.append((state, in_recovery, parse_lsn(replay_lsn) if replay_lsn else 0, None))
+            except Exception as e:
+                results.append((state, False, 0, str(e).strip()))
+        
+        with self._lock:
+            self.primary_lsn = primary_lsn
+            for state, in_recovery, replay_lsn, error in results:
+                lag = max(0, primary_lsn - replay_lsn) if primary_lsn is not None and in_recovery else None
+                healthy = error is None and lag is not None and lag <= self.max_lag_bytes
+                if error is None and not in_recovery:
+                    error = "not in recovery"
+                elif error is None and lag is None:
+                    error = "primary WAL position unknown"
+                elif error is None and not healthy:
+                    error = f"lagging {lag} bytes behind the primary"
+                if healthy != state.healthy:
+                    print(f"Replica {state.host}:{state.port} is now {'healthy' if healthy else f'unhealthy: {error}'}")
+                state.healthy = healthy
+                if in_recovery:
+                    state.replay_lsn = max(state.replay_lsn, replay_lsn)
+                state.lag_bytes = lag
+                state.error = error
+                state.checked_at = datetime.now(timezone.utc).isoformat()
+    
+    def choose(self, min_lsn: int = 0) -> Optional[int]:
+        # Index of a healthy replica that has replayed up to min_lsn, or None
+        # for the primary; spreads reads round-robin over the eligible ones
+        with self._lock:
+            eligible = [i for i, state in enumerate(self.states) if state.healthy and state.replay_lsn >= min_lsn]
+        if not eligible:
+            return None
+        return eligible[next(self._round_robin) % len(eligible)]
+    
+    def mark_down(self, index: int, error: Exception):
+        # A replica that failed a connection is skipped until the next check
+        with self._lock:
+            state = self.states[index]
+            if state.healthy:
+                print(f"Replica {state.host}:{state.port} failed, reading from the primary: {error}")
+            state.healthy = False
+            state.error = str(error).strip()
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"Replica check failed: {e}")
+    
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self.check()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-monitor", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+        for conn in list(self._connections.values()):
+            conn.close()
+        self._connections.clear()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'primary_lsn': format_lsn(self.primary_lsn) if self.primary_lsn is not None else None,
+                'max_lag_bytes': self.max_lag_bytes,
+                'replicas': [
+                    {
+                        'host': f"{state.host}:{state.port}",
+                        'healthy': state.healthy,
+                        'replay_lsn': format_lsn(state.replay_lsn) if state.replay_lsn else None,
+                        'lag_bytes': state.lag_bytes,
+                        'error': state.error,
+                        'checked_at': state.checked_at
+                    }
+                    for state in self.states
+                ]
+            }
+
+replica_monitor = ReplicaMonitor(
+    replica_addresses(),
+    interval=settings.db_replica_check_interval,
+    max_lag_bytes=settings.db_replica_max_lag_bytes
+)
+
+# Read-your-writes: after a user's write commits, the primary's WAL position
+# is stored under this key (in Redis, shared by all workers) for
+# DB_REPLICA_READ_YOUR_WRITES_TTL seconds. That user's reads go to a replica
+# only once it has replayed past it.
+def write_position_key(user_id: int) -> str:
+    return f"wal:user:{user_id}"
@@ -0,0 +1,113 @@
+from datetime import date
+from typing import Dict, List, Optional, TYPE_CHECKING
+from app.async_database import get_async_connection
+
+if TYPE_CHECKING:
+    from app.services.lot_service import LotBook
+
+UPSERT_LOT_BOOK_SQL = """
+    INSERT INTO lot_books (user_id, symbol, lots, bought_units, sold_units, unmatched_units,
+                           realized_cents, realized_cost_cents, last_date, updated_at)
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, NOW())
+    ON CONFLICT (user_id, symbol) DO UPDATE
+    SET lots = EXCLUDED.lots,
+        bought_units = EXCLUDED.bought_units,
+        sold_units = EXCLUDED.sold_units,
+        unmatched_units = EXCLUDED.unmatched_units,
+        realized_cents = EXCLUDED.realized_cents,
+        realized_cost_cents = EXCLUDED.realized_cost_cents,
+        last_date = EXCLUDED.last_date,
+        updated_at = NOW()
+"""
+
+class _StaleProgress(Exception):
+    pass
+
+class AsyncLotRepository:
+    async def get_progress(self, user_id: int) -> Optional[int]:
+        async with get_async_connection() as conn:
+            return await conn.fetchval("SELECT last_transaction_id FROM lot_progress WHERE user_id = $1", user_id)
+    
+    async def get_books(self, user_id: int) -> Dict[str, "LotBook"]:
+        from app.services.lot_service import LotBook
+        async with get_async_connection() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT symbol, lots, bought_units, sold_units, unmatched_units,
+                       realized_cents, realized_cost_cents, last_date
+                FROM lot_books
+                WHERE user_id = $1
+                """,
+                user_id
+            )
+            return {row['symbol']: LotBook.unpack(row['lots'], row) for row in rows}
+    
+    async def get_transactions(self, user_id: int, after_id: int = 0, date_order: bool = False) -> List[Dict]:
+        # Incremental runs go in id order; a full replay in ledger date order
+        order = "t.transaction_date, t.created_at, t.transaction_id" if date_order else "t.transaction_id"
+        async with get_async_connection() as conn:
+            rows = await conn.fetch(
+                f"""
+                SELECT t.transaction_id, t.symbol, t.transaction_type, t.units, t.price, t.transaction_date, s.lots
+                FROM transactions t
+                LEFT JOIN LATERAL (
+                    SELECT array_agg(ARRAY[sel.buy_transaction_id, sel.units] ORDER BY sel.position) AS lots
+                    FROM transaction_lot_selections sel
+                    WHERE sel.sell_transaction_id = t.transaction_id
+                ) s ON t.transaction_type = 'SELL'
+                WHERE t.user_id = $1 AND t.transaction_id > $2
+                ORDER BY {order}
+                """,
+                user_id, after_id
+            )
+            return [dict(row) for row in rows]
+    
+    async def get_buy_lot_ids(self, user_id: int, symbol: str, transaction_ids: List[int]) -> List[int]:
+        async with get_async_connection() as conn:
+            rows = await conn.fetch(
+                """
+                SELECT transaction_id FROM transactions
+                WHERE transaction_id = ANY($1::int[]) AND user_id = $2 AND symbol = $3 AND transaction_type = 'BUY'
+                """,
+                transaction_ids, user_id, symbol.upper()
+            )
+            return [row['transaction_id'] for row in rows]
+    
+    async def save(self, user_id: int, books: Dict[str, "LotBook"], expected_last_id: Optional[int],
+                   last_id: int, replace: bool = False) -> bool:
+        # Compare-and-set on lot_progress, so books and watermark always move
+        # together; returns False if another request got there first
+        async with get_async_connection() as conn:
+            try:
+                async with conn.transaction():
+                    if expected_last_id is None:
+                        status = await conn.execute(
+                            """
+                            INSERT INTO lot_progress (user_id, last_transaction_id, updated_at)
+                            VALUES ($1, $2, NOW())
+                            ON CONFLICT (user_id) DO NOTHING
+                            """,
+                            user_id, last_id
+                        )
+                    else:
+                        status = await conn.execute(
+                            """
+                            UPDATE lot_progress SET last_transaction_id = $2, updated_at = NOW()
+                            WHERE user_id = $1 AND last_transaction_id = $3
+                            """,
+                            user_id, last_id, expected_last_id
+                        )
+                    if status.endswith(" 0"):
+                        raise _StaleProgress()
+                    
+                    if replace:
+                        await conn.execute("DELETE FROM lot_books WHERE user_id = $1", user_id)
+                    await conn.executemany(UPSERT_LOT_BOOK_SQL, [
+                        (user_id, symbol, book.pack(), book.bought_units, book.sold_units, book.unmatched_units,
+                         book.realized_cents, book.realized_cost_cents,
+                         date.fromordinal(book.last_day) if book.last_day else None)
+                        for symbol, book in books.items()
+                    ])
+                return True
+            except _StaleProgress:
+                return False
@@ -0,0 +1,73 @@
+from typing import List, Dict, Optional, Tuple
+from app.async_database import get_async_connection
+
+UPSERT_POSITION_SQL = """
+    INSERT INTO positions (user_id, symbol, buy_units, buy_cost, sell_units, updated_at)
+    VALUES ($1, $2, $3, $4, $5, NOW())
+    ON CONFLICT (user_id, symbol) DO UPDATE
+    SET buy_units = positions.buy_units + EXCLUDED.buy_units,
+        buy_cost = positions.buy_cost + EXCLUDED.buy_cost,
+        sell_units = positions.sell_units + EXCLUDED.sell_units,
+        updated_at = NOW()
+"""
+
+class AsyncPositionRepository:
+    async def get_by_user(self, user_id: int) -> List[Dict]:
+        async with get_async_connection(read_only=True, user_id=user_id) as conn:
+            rows = await conn.fetch(
+                """
+                SELECT symbol, buy_units, buy_cost, sell_units
+                FROM positions
+                WHERE user_id = $1 AND buy_units > sell_units
+                """,
+                user_id
+            )
+            return [dict(row) for row in rows]
+    
+    async def get_totals(self, user_id: int) -> Dict[str, Tuple[int, int]]:
+        # Closed positions included; the lot engine checks its books against these
+        async with get_async_connection() as conn:
+            rows = await conn.fetch(
+                "SELECT symbol, buy_units, sell_units FROM positions WHERE user_id = $1",
+                user_id
+            )
+            return {row['symbol']: (row['buy_units'], row['sell_units']) for row in rows}
+    
+    async def get_by_user_and_symbol(self, user_id: int, symbol: str, for_update: bool = False) -> Optional[Dict]:
+        async with get_async_connection() as conn:
+            result = await conn.fetchrow(
+                f"""
+                SELECT symbol, buy_units, buy_cost, sell_units
+                FROM positions
+                WHERE user_id = $1 AND symbol = $2
+                {"FOR UPDATE" if for_update else ""}
+                """,
+                user_id, symbol.upper()
+            )
+            return dict(result) if result else None
+    
+    async def get_balances(self, keys: List[Tuple[int, str]], for_update: bool = False) -> Dict[Tuple[int, str], int]:
+        if not keys:
+            return {}
+        user_ids, symbols = zip(*keys)
+        async with get_async_connection() as conn:
+            # Locked in key order so concurrent imports can't deadlock each other
+            rows = await conn.fetch(
+                f"""
+                SELECT p.user_id, p.symbol, p.buy_units - p.sell_units AS units
+                FROM positions p
+                JOIN unnest($1::int[], $2::text[]) AS k(user_id, symbol)
+                  ON p.user_id = k.user_id AND p.symbol = k.symbol
+                ORDER BY p.user_id, p.symbol
+                {"FOR UPDATE OF p" if for_update else ""}
+                """,
+                list(user_ids), list(symbols)
+            )
+            return {(row['user_id'], row['symbol']): row['units'] for row in rows}
+    
+    async def apply_deltas(self, deltas: List[Dict]):
+        async with get_async_connection() as conn:
+            await conn.executemany(UPSERT_POSITION_SQL, [
+                (d['user_id'], d['symbol'], d['buy_units'], d['buy_cost'], d['sell_units'])
+                for d in deltas
+            ])
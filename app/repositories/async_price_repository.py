@@ -0,0 +1,23 @@
+from typing import Optional, Dict, List, Set
+from app.async_database import get_async_connection, get_async_primary_connection
+
+class AsyncPriceRepository:
+    async def get_by_symbol(self, symbol: str) -> Optional[Dict]:
+        async with get_async_connection(read_only=True) as conn:
+            result = await conn.fetchrow(
+                "SELECT symbol, current_price, updated_at FROM prices WHERE symbol = $1",
+                symbol.upper()
+            )
+            return dict(result) if result else None
+    
+    async def get_all(self) -> Dict[str, float]:
+        # Primary only, even inside a read-only unit: the price snapshot pairs
+        # this with the current prices version
+        async with get_async_primary_connection() as conn:
+            rows = await conn.fetch("SELECT symbol, current_price FROM prices")
+            return {row['symbol']: float(row['current_price']) for row in rows}
+    
+    async def get_existing_symbols(self, symbols: List[str]) -> Set[str]:
+        async with get_async_connection() as conn:
+            rows = await conn.fetch("SELECT symbol FROM prices WHERE symbol = ANY($1::text[])", symbols)
+            return {row['symbol'] for row in rows}
@@ -0,0 +1,115 @@
+from typing import AsyncIterator, List, Dict, Optional, Tuple
+from datetime import date, datetime
+from decimal import Decimal
+from app.async_database import get_async_connection
+from app.repositories.async_position_repository import UPSERT_POSITION_SQL
+from app.repositories.position_repository import position_delta
+
+TRANSACTION_COLUMNS = "transaction_id, user_id, symbol, transaction_type, units, price, transaction_date, created_at"
+KEYSET_ORDER = "ORDER BY transaction_date DESC, created_at DESC, transaction_id DESC"
+
+def _user_filter(user_id: int, symbol: Optional[str]) -> Tuple[str, list]:
+    if symbol:
+        return "user_id = $1 AND symbol = $2", [user_id, symbol.upper()]
+    return "user_id = $1", [user_id]
+
+class AsyncTransactionRepository:
+    async def create(self, user_id: int, symbol: str, transaction_type: str,
+                     units: int, price: float, transaction_date: date,
+                     lots: Optional[List[Tuple[int, int]]] = None) -> Dict:
+        delta = position_delta(user_id, symbol, transaction_type, units, price)
+        async with get_async_connection() as conn:
+            # A savepoint inside an async unit of work, its own transaction otherwise
+            async with conn.transaction():
+                result = await conn.fetchrow(
+                    """
+                    INSERT INTO transactions (user_id, symbol, transaction_type, units, price, transaction_date)
+                    VALUES ($1, $2, $3, $4, $5, $6)
+                    RETURNING transaction_id, user_id, symbol, transaction_type, units, price, transaction_date, created_at
+                    """,
+                    user_id, symbol.upper(), transaction_type, units, Decimal(str(price)), transaction_date
+                )
+                await conn.execute(
+                    UPSERT_POSITION_SQL,
+                    delta['user_id'], delta['symbol'], delta['buy_units'],
+                    Decimal(delta['buy_cost']), delta['sell_units']
+                )
+                if lots:
+                    await conn.executemany(
+                        """
+                        INSERT INTO transaction_lot_selections (sell_transaction_id, buy_transaction_id, position, units)
+                        VALUES ($1, $2, $3, $4)
+                        """,
+                        [(result['transaction_id'], buy_id, position, lot_units)
+                         for position, (buy_id, lot_units) in enumerate(lots)]
+                    )
+            return dict(result)
+    
+    async def copy_many(self, records: List[Tuple]) -> int:
+        # records: (user_id, symbol, transaction_type, units, price, transaction_date)
+        async with get_async_connection() as conn:
+            await conn.copy_records_to_table(
+                'transactions',
+                records=records,
+                columns=['user_id', 'symbol', 'transaction_type', 'units', 'price', 'transaction_date']
+            )
+            return len(records)
+    
+    async def get_by_user(self, user_id: int) -> List[Dict]:
+        async with get_async_connection(read_only=True, user_id=user_id) as conn:
+            rows = await conn.fetch(
+                """
+                SELECT transaction_id, user_id, symbol, transaction_type, units, price, transaction_date, created_at
+                FROM transactions
+                WHERE user_id = $1
+                ORDER BY transaction_date DESC, created_at DESC, transaction_id DESC
+                """,
+                user_id
+            )
+            return [dict(row) for row in rows]
+    
+    async def get_by_user_and_symbol(self, user_id: int, symbol: str) -> List[Dict]:
+        async with get_async_connection(read_only=True, user_id=user_id) as conn:
+            rows = await conn.fetch(
+                """
+                SELECT transaction_id, user_id, symbol, transaction_type, units, price, transaction_date, created_at
+                FROM transactions
+                WHERE user_id = $1 AND symbol = $2
+                ORDER BY transaction_date DESC, created_at DESC, transaction_id DESC
+                """,
+                user_id, symbol.upper()
+            )
+            return [dict(row) for row in rows]
+    
+    async def get_page(self, user_id: int, symbol: Optional[str], limit: int,
+                       after: Optional[Tuple[date, datetime, int]] = None) -> List[Dict]:
+        # Keyset pagination: the row comparison seeks straight into the
+        # (user_id[, symbol], transaction_date, created_at, transaction_id) index
+        where, params = _user_filter(user_id, symbol)
+        if after:
+            n = len(params)
+            where += f" AND (transaction_date, created_at, transaction_id) < (${n + 1}, ${n + 2}, ${n + 3})"
+            params.extend(after)
+        params.append(limit)
+        async with get_async_connection(read_only=True, user_id=user_id) as conn:
+            rows = await conn.fetch(
+                f"SELECT {TRANSACTION_COLUMNS} FROM transactions WHERE {where} {KEYSET_ORDER} LIMIT ${len(params)}",
+                *params
+            )
+            return [dict(row) for row in rows]
+    
+    async def iter_batches(self, user_id: int, symbol: Optional[str],
+                           batch_size: int = 1000) -> AsyncIterator[List[Dict]]:
+        # Reads through a server-side cursor, so only one batch is ever held
+        where, params = _user_filter(user_id, symbol)
+        async with get_async_connection(read_only=True, user_id=user_id) as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(
+                    f"SELECT {TRANSACTION_COLUMNS} FROM transactions WHERE {where} {KEYSET_ORDER}",
+                    *params
+                )
+                while True:
+                    rows = await cursor.fetch(batch_size)
+                    if not rows:
+                        break
+                    yield [dict(row) for row in rows]
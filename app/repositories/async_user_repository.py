@@ -0,0 +1,36 @@
+from typing import Optional, Dict, List, Set
+from app.async_database import get_async_connection
+
+class AsyncUserRepository:
+    async def create(self, name: str, email: str, password_hash: Optional[str] = None) -> Dict:
+        async with get_async_connection() as conn:
+            result = await conn.fetchrow(
+                """
+                INSERT INTO users (name, email, password_hash)
+                VALUES ($1, $2, $3)
+                RETURNING user_id, name, email, created_at
+                """,
+                name, email, password_hash
+            )
+            return dict(result)
+    
+    async def get_by_id(self, user_id: int) -> Optional[Dict]:
+        async with get_async_connection(read_only=True, user_id=user_id) as conn:
+            result = await conn.fetchrow(
+                "SELECT user_id, name, email, created_at FROM users WHERE user_id = $1",
+                user_id
+            )
+            return dict(result) if result else None
+    
+    async def get_by_email(self, email: str) -> Optional[Dict]:
+        async with get_async_connection() as conn:
+            result = await conn.fetchrow(
+                "SELECT user_id, name, email, password_hash, created_at FROM users WHERE email = $1",
+                email
+            )
+            return dict(result) if result else None
+    
+    async def get_existing_ids(self, user_ids: List[int]) -> Set[int]:
+        async with get_async_connection() as conn:
+            rows = await conn.fetch("SELECT user_id FROM users WHERE user_id = ANY($1::int[])", user_ids)
+            return {row['user_id'] for row in rows}
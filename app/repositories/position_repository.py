@@ -0,0 +1,107 @@
+from typing import List, Dict, Optional
+from decimal import Decimal
+from app.database import get_db_connection, get_db_cursor, commit
+
+AGGREGATE_TRANSACTIONS_SQL = """
+    SELECT user_id, symbol,
+           COALESCE(SUM(units) FILTER (WHERE transaction_type = 'BUY'), 0) AS buy_units,
+           COALESCE(SUM(units * price) FILTER (WHERE transaction_type = 'BUY'), 0) AS buy_cost,
+           COALESCE(SUM(units) FILTER (WHERE transaction_type = 'SELL'), 0) AS sell_units
+    FROM transactions
+    {where}
+    GROUP BY user_id, symbol
+"""
+
+def position_delta(user_id: int, symbol: str, transaction_type: str, units: int, price: float) -> Dict:
+    is_buy = transaction_type == 'BUY'
+    return {
+        'user_id': user_id,
+        'symbol': symbol.upper(),
+        'buy_units': units if is_buy else 0,
+        'buy_cost': Decimal(str(price)) * units if is_buy else 0,
+        'sell_units': 0 if is_buy else units
+    }
+
+class PositionRepository:
+    def get_by_user(self, user_id: int) -> List[Dict]:
+        with get_db_connection(read_only=True, user_id=user_id) as conn:
+            cursor = get_db_cursor(conn)
+            cursor.execute(
+                """
+                SELECT symbol, buy_units, buy_cost, sell_units
+                FROM positions
+                WHERE user_id = %s AND buy_units > sell_units
+                """,
+                (user_id,)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_by_users(self, user_ids: List[int]) -> List[Dict]:
+        with get_db_connection(read_only=True) as conn:
+            cursor = get_db_cursor(conn)
+            cursor.execute(
+                """
+                SELECT user_id, symbol, buy_units, buy_cost, sell_units
+                FROM positions
+                WHERE user_id = ANY(%s) AND buy_units > sell_units
+                """,
+                (user_ids,)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_holders(self, symbols: List[str]) -> List[int]:
+        if not symbols:
+            return []
+        with get_db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            cursor.execute(
+                """
+                SELECT DISTINCT user_id
+                FROM positions
+                WHERE symbol = ANY(%s) AND buy_units > sell_units
+                """,
+                ([symbol.upper() for symbol in symbols],)
+            )
+            return [row['user_id'] for row in cursor.fetchall()]
+    
+    def rebuild(self, user_id: Optional[int] = None) -> int:
+        where, params = ("WHERE user_id = %s", (user_id,)) if user_id is not None else ("", ())
+        with get_db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            # Block concurrent inserts so the aggregate matches the ledger it was built from
+            cursor.execute("LOCK TABLE transactions IN SHARE MODE")
+            cursor.execute(f"DELETE FROM positions {where}", params)
+            cursor.execute(
+                f"""
+                INSERT INTO positions (user_id, symbol, buy_units, buy_cost, sell_units, updated_at)
+                SELECT user_id, symbol, buy_units, buy_cost, sell_units, NOW()
+                FROM ({AGGREGATE_TRANSACTIONS_SQL.format(where=where)}) agg
+                """,
+                params
+            )
+            rebuilt = cursor.rowcount
+            commit(conn)
+            return rebuilt
+    
+    def verify(self, user_id: Optional[int] = None) -> List[Dict]:
+        where, params = ("WHERE user_id = %s", (user_id,)) if user_id is not None else ("", ())
+        with get_db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            cursor.execute(
+                f"""
+                SELECT COALESCE(agg.user_id, p.user_id) AS user_id,
+                       COALESCE(agg.symbol, p.symbol) AS symbol,
+                       agg.buy_units AS expected_buy_units, p.buy_units AS actual_buy_units,
+                       agg.buy_cost AS expected_buy_cost, p.buy_cost AS actual_buy_cost,
+                       agg.sell_units AS expected_sell_units, p.sell_units AS actual_sell_units
+                FROM ({AGGREGATE_TRANSACTIONS_SQL.format(where=where)}) agg
+                FULL OUTER JOIN (SELECT * FROM positions {where}) p
+                    ON p.user_id = agg.user_id AND p.symbol = agg.symbol
+                WHERE agg.buy_units IS DISTINCT FROM p.buy_units
+                   OR agg.buy_cost IS DISTINCT FROM p.buy_cost
+                   OR agg.sell_units IS DISTINCT FROM p.sell_units
+                ORDER BY 1, 2
+                """,
+                params + params
+            )
+            return [dict(row) for row in cursor.fetchall()]
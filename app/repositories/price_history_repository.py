@@ -0,0 +1,27 @@
+from typing import List, Dict
+from datetime import datetime
+from app.database import get_db_connection, get_db_cursor
+
+class PriceHistoryRepository:
+    def get_prices_at(self, symbols: List[str], timestamps: List[datetime]) -> List[Dict]:
+        if not symbols or not timestamps:
+            return []
+        with get_db_connection(read_only=True) as conn:
+            cursor = get_db_cursor(conn)
+            # One backward index probe on (symbol, ts) per symbol and grid point
+            cursor.execute(
+                """
+                SELECT s.symbol, g.idx - 1 AS idx, p.price
+                FROM unnest(%s::varchar[]) AS s(symbol)
+                CROSS JOIN unnest(%s::timestamp[]) WITH ORDINALITY AS g(ts, idx)
+                CROSS JOIN LATERAL (
+                    SELECT h.price
+                    FROM price_history h
+                    WHERE h.symbol = s.symbol AND h.ts <= g.ts
+                    ORDER BY h.ts DESC
+                    LIMIT 1
+                ) p
+                """,
+                (symbols, timestamps)
+            )
+            return [dict(row) for row in cursor.fetchall()]
@@ -1,19 +1,12 @@
-from typing import Optional, Dict
-from app.database import get_db_connection, get_db_cursor
+from typing import Dict, List
+from psycopg2.extras import execute_values
+from app.database import get_db_connection, get_db_cursor, get_primary_connection, commit
 
 class PriceRepository:
-    def get_by_symbol(self, symbol: str) -> Optional[Dict]:
-        with get_db_connection() as conn:
-            cursor = get_db_cursor(conn)
-            cursor.execute(
-                "SELECT symbol, current_price, updated_at FROM prices WHERE symbol = %s",
-                (symbol.upper(),)
-            )
-            result = cursor.fetchone()
-            return dict(result) if result else None
-    
     def get_all(self) -> Dict[str, float]:
-        with get_db_connection() as conn:
+        # Primary only, even inside a read-only unit: the price snapshot pairs
+        # this with the current prices version
+        with get_primary_connection() as conn:
             cursor = get_db_cursor(conn)
             cursor.execute("SELECT symbol, current_price FROM prices")
             return {row['symbol']: float(row['current_price']) for row in cursor.fetchall()}
@@ -23,13 +16,50 @@ class PriceRepository:
             cursor = get_db_cursor(conn)
             cursor.execute(
                 """
-                INSERT INTO prices (symbol, current_price, updated_at)
-                VALUES (%s, %s, NOW())
-                ON CONFLICT (symbol) DO UPDATE
-                SET current_price = EXCLUDED.current_price, updated_at = NOW()
-                RETURNING symbol, current_price, updated_at
+                WITH written AS (
+                    INSERT INTO prices (symbol, current_price, updated_at)
+                    VALUES (%s, %s, NOW())
+                    ON CONFLICT (symbol) DO UPDATE
+                    SET current_price = EXCLUDED.current_price, updated_at = NOW()
+                    RETURNING symbol, current_price, updated_at
+                ), history AS (
+                    INSERT INTO price_history (symbol, ts, price)
+                    SELECT symbol, NOW() AT TIME ZONE 'UTC', current_price FROM written
+                )
+                SELECT symbol, current_price, updated_at FROM written
                 """,
                 (symbol.upper(), price)
             )
-            conn.commit()
+            commit(conn)
             return dict(cursor.fetchone())
+    
+    def update_many(self, prices: Dict[str, float]) -> List[Dict]:
+        if not prices:
+            return []
+        # Deduplicated and sorted so concurrent ticks lock rows in the same order
+        rows = sorted({symbol.upper(): price for symbol, price in prices.items()}.items())
+        with get_db_connection() as conn:
+            cursor = get_db_cursor(conn)
+            result = execute_values(
+                cursor,
+                """
+                WITH written AS (
+                    INSERT INTO prices (symbol, current_price, updated_at)
+                    SELECT v.symbol, v.current_price, NOW()
+                    FROM (VALUES %s) AS v(symbol, current_price)
+                    ON CONFLICT (symbol) DO UPDATE
+                    SET current_price = EXCLUDED.current_price, updated_at = NOW()
+                    RETURNING symbol, current_price, updated_at
+                ), history AS (
+                    INSERT INTO price_history (symbol, ts, price)
+                    SELECT symbol, NOW() AT TIME ZONE 'UTC', current_price FROM written
+                )
+                SELECT symbol, current_price, updated_at FROM written
+                """,
+                rows,
+                template="(%s::varchar, %s::numeric)",
+                page_size=len(rows),
+                fetch=True
+            )
+            commit(conn)
+            return [dict(row) for row in result]
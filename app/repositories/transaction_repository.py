@@ -3,45 +3,65 @@ from datetime import date
 from app.database import get_db_connection, get_db_cursor
 
 class TransactionRepository:
-    def create(self, user_id: int, symbol: str, transaction_type: str, 
-               units: int, price: float, transaction_date: date) -> Dict:
-        with get_db_connection() as conn:
-            cursor = get_db_cursor(conn)
-            cursor.execute(
-                """
-                INSERT INTO transactions (user_id, symbol, transaction_type, units, price, transaction_date)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                RETURNING transaction_id, user_id, symbol, transaction_type, units, price, transaction_date, created_at
-                """,
-                (user_id, symbol.upper(), transaction_type, units, price, transaction_date)
-            )
-            conn.commit()
-            return dict(cursor.fetchone())
-    
     def get_by_user(self, user_id: int) -> List[Dict]:
-        with get_db_connection() as conn:
+        with get_db_connection(read_only=True, user_id=user_id) as conn:
             cursor = get_db_cursor(conn)
             cursor.execute(
                 """
                 SELECT transaction_id, user_id, symbol, transaction_type, units, price, transaction_date, created_at
                 FROM transactions
                 WHERE user_id = %s
-                ORDER BY transaction_date DESC, created_at DESC
+                ORDER BY transaction_date DESC, created_at DESC, transaction_id DESC
                 """,
                 (user_id,)
             )
             return [dict(row) for row in cursor.fetchall()]
     
     def get_by_user_and_symbol(self, user_id: int, symbol: str) -> List[Dict]:
-        with get_db_connection() as conn:
+        with get_db_connection(read_only=True, user_id=user_id) as conn:
             cursor = get_db_cursor(conn)
             cursor.execute(
                 """
                 SELECT transaction_id, user_id, symbol, transaction_type, units, price, transaction_date, created_at
                 FROM transactions
                 WHERE user_id = %s AND symbol = %s
-                ORDER BY transaction_date DESC, created_at DESC
+                ORDER BY transaction_date DESC, created_at DESC, transaction_id DESC
                 """,
                 (user_id, symbol.upper())
             )
             return [dict(row) for row in cursor.fetchall()]
+    
+    def get_daily_flows(self, user_id: int, until: date) -> List[Dict]:
+        with get_db_connection(read_only=True, user_id=user_id) as conn:
+            cursor = get_db_cursor(conn)
+            cursor.execute(
+                """
+                SELECT symbol, transaction_date,
+                       COALESCE(SUM(units) FILTER (WHERE transaction_type = 'BUY'), 0) AS buy_units,
+                       COALESCE(SUM(units * price) FILTER (WHERE transaction_type = 'BUY'), 0) AS buy_cost,
+                       COALESCE(SUM(units) FILTER (WHERE transaction_type = 'SELL'), 0) AS sell_units,
+                       COALESCE(SUM(units * price) FILTER (WHERE transaction_type = 'SELL'), 0) AS sell_proceeds
+                FROM transactions
+                WHERE user_id = %s AND transaction_date <= %s
+                GROUP BY symbol, transaction_date
+                ORDER BY transaction_date
+                """,
+                (user_id, until)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+    
+    def get_net_cash_flows(self, user_ids: List[int]) -> List[Dict]:
+        with get_db_connection(read_only=True) as conn:
+            cursor = get_db_cursor(conn)
+            cursor.execute(
+                """
+                SELECT user_id, transaction_date,
+                       SUM(CASE WHEN transaction_type = 'SELL' THEN units * price ELSE -units * price END) AS amount
+                FROM transactions
+                WHERE user_id = ANY(%s)
+                GROUP BY user_id, transaction_date
+                ORDER BY user_id, transaction_date
+                """,
+                (user_ids,)
+            )
+            return [dict(row) for row in cursor.fetchall()]
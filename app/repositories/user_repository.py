@@ -1,5 +1,5 @@
-from typing import Optional, Dict
-from app.database import get_db_connection, get_db_cursor
+from typing import Optional, Dict, List
+from app.database import get_db_connection, get_db_cursor, commit
 
 class UserRepository:
     def create(self, name: str, email: str, password_hash: Optional[str] = None) -> Dict:
@@ -13,11 +13,11 @@ class UserRepository:
                 """,
                 (name, email, password_hash)
             )
-            conn.commit()
+            commit(conn)
             return dict(cursor.fetchone())
     
     def get_by_id(self, user_id: int) -> Optional[Dict]:
-        with get_db_connection() as conn:
+        with get_db_connection(read_only=True, user_id=user_id) as conn:
             cursor = get_db_cursor(conn)
             cursor.execute(
                 "SELECT user_id, name, email, created_at FROM users WHERE user_id = %s",
@@ -35,3 +35,21 @@ class UserRepository:
             )
             result = cursor.fetchone()
             return dict(result) if result else None
+    
+    def get_ids_after(self, after_id: int, limit: int) -> List[int]:
+        with get_db_connection(read_only=True) as conn:
+            cursor = get_db_cursor(conn)
+            cursor.execute(
+                "SELECT user_id FROM users WHERE user_id > %s ORDER BY user_id LIMIT %s",
+                (after_id, limit)
+            )
+            return [row['user_id'] for row in cursor.fetchall()]
+    
+    def get_existing_ids(self, user_ids: List[int]) -> List[int]:
+        with get_db_connection(read_only=True) as conn:
+            cursor = get_db_cursor(conn)
+            cursor.execute(
+                "SELECT user_id FROM users WHERE user_id = ANY(%s) ORDER BY user_id",
+                (user_ids,)
+            )
+            return [row['user_id'] for row in cursor.fetchall()]
@@ -1,8 +1,39 @@
-from fastapi import APIRouter
-from app.utils.scheduler import trigger_price_update
+from fastapi import APIRouter, HTTPException, status
+from app.utils.scheduler import trigger_price_update, scheduler_stats
+from app import database, async_database
+from app.replicas import replica_monitor
+from app.services import singleflight
+from app.services.auth_service import auth_stats
+from app.services.cache_service import local_cache
+from app.services.cache_warmer import cache_warmer
+from app.services.live_portfolio_service import live_portfolio_hub
+from app.utils.exceptions import NotLeaderException, PriceUpdateFailedException
 
 router = APIRouter(prefix="/admin")
 
 @router.post("/update-prices")
 def manual_price_update():
-    return trigger_price_update()
+    try:
+        return trigger_price_update()
+    except NotLeaderException as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e), headers={"Retry-After": "1"})
+    except PriceUpdateFailedException as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+@router.get("/stats")
+def get_stats():
+    return {
+        "db_pool": database.connection_pool.stats() if database.connection_pool else None,
+        "async_db_pool": async_database.pool_stats(),
+        "replicas": {
+            **replica_monitor.stats(),
+            "sync_pools": [pool.stats() for pool in database.replica_pools],
+            "async_pools": async_database.replica_pool_stats()
+        },
+        "local_cache": local_cache.stats(),
+        "singleflight": singleflight.stats(),
+        "live": live_portfolio_hub.stats(),
+        "cache_warmer": cache_warmer.stats(),
+        "auth": auth_stats(),
+        "scheduler": scheduler_stats()
+    }
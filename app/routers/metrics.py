@@ -0,0 +1,117 @@
+from datetime import datetime
+from fastapi import APIRouter, Response
+from app import database, async_database
+from app.replicas import replica_monitor
+from app.services import singleflight
+from app.services.auth_service import password_pool, token_cache
+from app.services.cache_service import local_cache
+from app.services.cache_warmer import cache_warmer
+from app.services.live_portfolio_service import live_portfolio_hub
+from app.utils import metrics
+from app.utils.metrics import CallbackMetric
+from app.utils.scheduler import scheduler_stats
+
+router = APIRouter()
+
+def _pool_connections():
+    pools = [("sync", database.connection_pool.stats() if database.connection_pool else None),
+             ("async", async_database.pool_stats())]
+    # All replicas of a driver together; per-replica health is in db_replica_*
+    if database.replica_pools:
+        replica_stats = [pool.stats() for pool in database.replica_pools]
+        pools.append(("sync_replica", {key: sum(stats[key] for stats in replica_stats) for key in ('in_use', 'idle')}))
+    if async_database.replica_pools:
+        replica_stats = async_database.replica_pool_stats()
+        pools.append(("async_replica", {key: sum(stats[key] for stats in replica_stats) for key in ('in_use', 'idle')}))
+    for name, stats in pools:
+        if stats:
+            yield (name, "in_use"), stats['in_use']
+            yield (name, "idle"), stats['idle']
+
+def _replica_health():
+    for replica in replica_monitor.stats()['replicas']:
+        yield (replica['host'],), int(replica['healthy'])
+
+def _replica_lag():
+    for replica in replica_monitor.stats()['replicas']:
+        if replica['lag_bytes'] is not None:
+            yield (replica['host'],), replica['lag_bytes']
+
+def _pool_waiters():
+    if database.connection_pool:
+        yield ("sync",), database.connection_pool.stats()['waiters']
+
+def _pool_timeouts():
+    if database.connection_pool:
+        yield ("sync",), database.connection_pool.stats()['timeouts']
+
+def _local_cache_events():
+    stats = local_cache.stats()
+    for event in ('hits', 'misses', 'evictions', 'expirations', 'invalidations'):
+        yield (event,), stats[event]
+
+def _local_cache_size():
+    stats = local_cache.stats()
+    yield ("entries",), stats['entries']
+    yield ("bytes",), stats['bytes']
+
+def _singleflight_calls():
+    for flight, stats in singleflight.stats().items():
+        for outcome, count in stats.items():
+            yield (flight, outcome), count
+
+def _auth_pool_calls():
+    stats = password_pool.stats()
+    for outcome in ('completed', 'rejected', 'timeouts'):
+        yield (outcome,), stats[outcome]
+
+def _token_cache_lookups():
+    stats = token_cache.stats()
+    yield ("hit",), stats['hits']
+    yield ("miss",), stats['misses']
+
+def _scheduler_runs():
+    stats = scheduler_stats()['update_prices']
+    for outcome in ('runs', 'failures', 'missed_runs', 'skipped_as_follower'):
+        yield (outcome,), stats[outcome]
+
+def _scheduler_last_run():
+    last_run_at = scheduler_stats()['update_prices']['last_run_at']
+    if last_run_at:
+        yield (), datetime.fromisoformat(last_run_at).timestamp()
+
+def _cache_warm_users():
+    stats = cache_warmer.stats()
+    for outcome in ('warmed', 'stale', 'skipped', 'failed'):
+        yield (outcome,), stats[f'users_{outcome}']
+
+def _cache_warm_coverage():
+    coverage = cache_warmer.stats()['last_coverage']
+    if coverage is not None:
+        yield (), coverage
+
+CallbackMetric("db_pool_connections", "Pooled database connections by state", ("pool", "state"), _pool_connections)
+CallbackMetric("db_pool_waiters", "Threads waiting for a pooled connection", ("pool",), _pool_waiters)
+CallbackMetric("db_pool_timeouts_total", "Connection acquires that timed out", ("pool",), _pool_timeouts, kind="counter")
+CallbackMetric("db_replica_healthy", "1 if the replica currently takes reads", ("replica",), _replica_health)
+CallbackMetric("db_replica_lag_bytes", "WAL bytes the replica is behind the primary at the last check", ("replica",), _replica_lag)
+CallbackMetric("local_cache_events_total", "In-process cache tier events", ("event",), _local_cache_events, kind="counter")
+CallbackMetric("local_cache_size", "In-process cache tier size", ("unit",), _local_cache_size)
+CallbackMetric("singleflight_calls_total", "Single-flight calls by outcome", ("flight", "outcome"), _singleflight_calls, kind="counter")
+CallbackMetric("auth_pool_queue_depth", "Password hash/check calls waiting for a worker", (),
+               lambda: [((), password_pool.stats()['queue_depth'])])
+CallbackMetric("auth_pool_calls_total", "Password hash/check calls by outcome", ("outcome",), _auth_pool_calls, kind="counter")
+CallbackMetric("auth_token_cache_lookups_total", "Verified-token cache lookups", ("result",), _token_cache_lookups, kind="counter")
+CallbackMetric("cache_warm_users_total", "Active users handled by cache warming, by outcome", ("outcome",),
+               _cache_warm_users, kind="counter")
+CallbackMetric("cache_warm_coverage_ratio", "Share of active users whose summary the last warming run cached", (),
+               _cache_warm_coverage)
+CallbackMetric("live_subscribers", "Open live portfolio streams", (), lambda: [((), live_portfolio_hub.stats()['subscribers'])])
+CallbackMetric("scheduler_is_leader", "1 if this process runs the price tick", (),
+               lambda: [((), int(scheduler_stats()['leader']['is_leader']))])
+CallbackMetric("scheduler_ticks_total", "Price update ticks by outcome", ("outcome",), _scheduler_runs, kind="counter")
+CallbackMetric("scheduler_last_run_timestamp_seconds", "Unix time of the last price tick run here", (), _scheduler_last_run)
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
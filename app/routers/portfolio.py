@@ -1,29 +1,187 @@
-from fastapi import APIRouter, HTTPException, Query, status
-from app.schemas.portfolio import PortfolioSummaryResponse
-from app.services.portfolio_service import PortfolioService
-from app.services.cache_service import get_cache, set_cache
+from datetime import datetime
+import orjson
+from typing import Optional, Tuple
+from fastapi import APIRouter, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
+from app.schemas.portfolio import (
+    PortfolioSummaryResponse, PortfolioHistoryResponse, PortfolioReturnsResponse, PortfolioPnLResponse,
+    PortfolioBatchRequest
+)
+from app.services.history_service import PortfolioHistoryService, history_range
+from app.services.returns_service import ReturnsService
+from app.services.lot_service import LotService, lot_report
+from app.services.batch_portfolio_service import BatchPortfolioService, ndjson_lines
+from app.services.cache_warmer import record_active_user
+from app.services.portfolio_service import AsyncPortfolioService, portfolio_cache_key
+from app.services.async_cache_service import get_raw_cache_entry, get_generation, set_raw_cache
+from app.services.cache_service import local_cache
+from app.services.price_snapshot import price_snapshot
+from app.services.singleflight import AsyncSingleFlight
+from app.services.live_portfolio_service import live_portfolio_hub
 from app.repositories.user_repository import UserRepository
+from app.repositories.async_user_repository import AsyncUserRepository
+from app.database import unit_of_work
+from app.async_database import async_unit_of_work
+from app.utils.exceptions import InvalidHistoryRangeException, UserNotFoundException
 
 router = APIRouter(prefix="/portfolio-summary")
-portfolio_service = PortfolioService()
+portfolio_service = AsyncPortfolioService()
+history_service = PortfolioHistoryService()
+returns_service = ReturnsService()
+lot_service = LotService()
+batch_portfolio_service = BatchPortfolioService()
 user_repo = UserRepository()
+async_user_repo = AsyncUserRepository()
+summary_flight = AsyncSingleFlight("portfolio-summary")
+
+def summary_etag(generation: Optional[Tuple[int, int]], price_version: Optional[int]) -> Optional[str]:
+    # Every transaction, and every price change for a held symbol, bumps the
+    # key's generation; the price version guards against generation counters
+    # restarting after their keys expire.
+    if generation is None or price_version is None:
+        return None
+    return f'"{generation[0]}.{generation[1]}.{price_version}"'
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    if not if_none_match or not etag:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in candidates or "*" in candidates
+
+def summary_response(body: bytes, etag: Optional[str]) -> Response:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"} if etag else None
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @router.get("", response_model=PortfolioSummaryResponse)
-def get_portfolio_summary(user_id: int = Query(..., description="User ID to get portfolio for")):
-    user = user_repo.get_by_id(user_id)
+async def get_portfolio_summary(
+    user_id: int = Query(..., description="User ID to get portfolio for"),
+    if_none_match: Optional[str] = Header(None)
+):
+    # Summaries are only ever cached for existing users, so a hit needs no lookup.
+    # They are cached as the final response bytes and sent without re-encoding.
+    cache_key = portfolio_cache_key(user_id)
+    price_version = (await price_snapshot.get_async()).version
+    
+    if if_none_match:
+        # Revalidation only needs the generation, not the cached body
+        local_generation = local_cache.generation(cache_key)
+        generation = local_generation or await get_generation(cache_key)
+        etag = summary_etag(generation, price_version)
+        # Only for a known user: a cached entry, or a key generation that has
+        # been bumped by their transactions. Unknown ids are at (0, 0) too.
+        if etag_matches(if_none_match, etag) and (local_generation or generation[1]):
+            await record_active_user(user_id)
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    
+    cached_body, generation = await get_raw_cache_entry(cache_key)
+    etag = summary_etag(generation, price_version)
+    
+    # Recently active users get their summary re-warmed after price ticks.
+    # Recorded only once the user is known to exist (a cached entry or a
+    # successful compute), so probed ids never reach the warmer.
+    if cached_body:
+        await record_active_user(user_id)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        return summary_response(cached_body, etag)
+    
+    async def compute():
+        async with async_unit_of_work(read_only=True, user_id=user_id):
+            if not await async_user_repo.get_by_id(user_id):
+                raise UserNotFoundException(f"User {user_id} not found")
+            result = await portfolio_service.get_portfolio_summary(user_id)
+        body = orjson.dumps(result.model_dump())
+        await set_raw_cache(cache_key, body, generation=generation)
+        return body
+    
+    async def fetch():
+        filled, _ = await get_raw_cache_entry(cache_key)
+        return filled
+    
+    try:
+        body = await summary_flight.do(cache_key, compute, fetch)
+    except UserNotFoundException as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    await record_active_user(user_id)
+    return summary_response(body, etag)
+
+@router.post("/batch")
+def batch_portfolio_summaries(request: PortfolioBatchRequest):
+    # NDJSON, one GET /portfolio-summary body per line in user_id order; unknown
+    # users get {"user_id": ..., "error": ...}. Pages are produced on demand in
+    # the threadpool, so a slow reader only holds back its own stream.
+    batch = batch_portfolio_service.summaries(request.user_ids, request.warm_cache)
+    return StreamingResponse(
+        (ndjson_lines(page) for page in batch),
+        media_type="application/x-ndjson"
+    )
+
+@router.get("/stream")
+async def stream_portfolio_summary(user_id: int = Query(..., description="User ID to stream the portfolio for")):
+    # Server-Sent Events: one full `summary` event, then an `update` event per
+    # price tick with the new totals and only the holdings whose price moved.
+    # A `summary` is sent again whenever the user's positions change.
+    if not live_portfolio_hub.has_capacity():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many live subscribers on this worker",
+            headers={"Retry-After": "5"}
+        )
+    if not await async_user_repo.get_by_id(user_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"User {user_id} not found")
+    
+    return StreamingResponse(
+        live_portfolio_hub.stream(user_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/history", response_model=PortfolioHistoryResponse)
+def get_portfolio_history(
+    user_id: int = Query(..., description="User ID to get portfolio history for"),
+    from_: Optional[datetime] = Query(None, alias="from", description="Start of the range (default: 30 days before 'to')"),
+    to: Optional[datetime] = Query(None, description="End of the range (default: now)"),
+    interval: str = Query("1d", description="Sampling interval, e.g. 5m, 1h, 1d")
+):
+    start, end = history_range(from_, to)
+    
+    with unit_of_work(read_only=True, user_id=user_id):
+        user = user_repo.get_by_id(user_id)
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"User {user_id} not found"
+            )
+        
+        try:
+            return history_service.get_value_history(user_id, start, end, interval)
+        except InvalidHistoryRangeException as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+@router.get("/returns", response_model=PortfolioReturnsResponse)
+def get_portfolio_returns(user_id: int = Query(..., description="User ID to get returns for")):
+    with unit_of_work(read_only=True, user_id=user_id):
+        user = user_repo.get_by_id(user_id)
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"User {user_id} not found"
+            )
+        
+        return returns_service.get_returns(user_id)
+
+@router.get("/pnl", response_model=PortfolioPnLResponse)
+async def get_portfolio_pnl(
+    user_id: int = Query(..., description="User ID to get realized and unrealized P&L for"),
+    lots: bool = Query(False, description="Include each holding's open lots")
+):
+    user = await async_user_repo.get_by_id(user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User {user_id} not found"
         )
     
-    cache_key = f"portfolio:{user_id}"
-    cached_data = get_cache(cache_key)
-    
-    if cached_data:
-        return PortfolioSummaryResponse(**cached_data)
-    
-    result = portfolio_service.get_portfolio_summary(user_id)
-    set_cache(cache_key, result.model_dump())
-    
-    return result
+    books, last_id = await lot_service.refresh(user_id)
+    snapshot = await price_snapshot.get_async(refresh=True)
+    return lot_report(user_id, books, last_id, snapshot.prices, include_lots=lots)
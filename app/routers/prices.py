@@ -1,16 +1,31 @@
+import time
+from typing import Dict
 from fastapi import APIRouter, HTTPException, status
-from pydantic import BaseModel
-from app.repositories.price_repository import PriceRepository
+from pydantic import BaseModel, field_validator
+from app.repositories.async_price_repository import AsyncPriceRepository
+from app.services.price_service import PriceService
+from app.services.price_snapshot import price_snapshot
 
 router = APIRouter(prefix="/prices")
-price_repo = PriceRepository()
+price_repo = AsyncPriceRepository()
+price_service = PriceService()
 
 class PriceUpdate(BaseModel):
     price: float
 
+class BulkPriceUpdate(BaseModel):
+    prices: Dict[str, float]
+    
+    @field_validator('prices')
+    @classmethod
+    def validate_prices(cls, v):
+        if any(price <= 0 for price in v.values()):
+            raise ValueError('Prices must be positive')
+        return {symbol.upper(): round(price, 2) for symbol, price in v.items()}
+
 @router.get("/{symbol}")
-def get_price(symbol: str):
-    price = price_repo.get_by_symbol(symbol)
+async def get_price(symbol: str):
+    price = await price_repo.get_by_symbol(symbol)
     if not price:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -20,10 +35,18 @@ def get_price(symbol: str):
 
 @router.put("/{symbol}")
 def update_price(symbol: str, update: PriceUpdate):
-    result = price_repo.update(symbol, update.price)
-    return result
+    return price_service.update(symbol, update.price)
+
+@router.put("")
+def update_prices(update: BulkPriceUpdate):
+    started = time.perf_counter()
+    written = price_service.update_many(update.prices)
+    return {
+        "rows_written": len(written),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
 
 @router.get("")
-def get_all_prices():
-    prices = price_repo.get_all()
-    return {"prices": prices}
+async def get_all_prices():
+    prices = (await price_snapshot.get_async()).prices
+    return {"prices": dict(prices)}
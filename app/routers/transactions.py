@@ -1,29 +1,50 @@
-from fastapi import APIRouter, HTTPException, Query, status
-from typing import Optional
-from app.schemas.transaction import TransactionCreate, TransactionResponse
-from app.services.transaction_service import TransactionService
-from app.services.cache_service import invalidate_cache
+import csv
+import io
+import json
+import time
+from fastapi import APIRouter, HTTPException, Query, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import Literal, Optional
+from app.config import settings
+from app.schemas.transaction import TransactionCreate, TransactionResponse, BulkImportResponse
+from app.async_database import record_writes
+from app.services.transaction_service import AsyncTransactionService
+from app.services.portfolio_service import portfolio_cache_key
+from app.services.async_cache_service import invalidate_keys, publish
+from app.services.live_portfolio_service import POSITIONS_CHANNEL
 from app.utils.exceptions import (
     UserNotFoundException, InsufficientHoldingsException,
-    InvalidSymbolException, FutureDateException
+    InvalidSymbolException, FutureDateException, InvalidCursorException,
+    InvalidImportException, ImportTooLargeException, InvalidLotSelectionException
 )
+from app.utils.bulk_import import parse_csv, parse_ndjson
+from app.utils.pagination import encode_transaction_cursor, decode_transaction_cursor
 
 router = APIRouter(prefix="/transactions")
-transaction_service = TransactionService()
+transaction_service = AsyncTransactionService()
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_FIELDS = list(TransactionResponse.model_fields)
 
 @router.post("", response_model=TransactionResponse, status_code=status.HTTP_201_CREATED)
-def create_transaction(transaction: TransactionCreate):
+async def create_transaction(transaction: TransactionCreate):
     try:
-        result = transaction_service.create_transaction(
+        result = await transaction_service.create_transaction(
             transaction.user_id,
             transaction.symbol,
             transaction.transaction_type,
             transaction.units,
             transaction.price,
-            transaction.transaction_date
+            transaction.transaction_date,
+            [(lot.transaction_id, lot.units) for lot in transaction.lots] if transaction.lots else None
         )
         
-        invalidate_cache(f"portfolio:{transaction.user_id}")
+        # Before the invalidation, so a summary recomputed under the new
+        # generation is never read from a replica that lacks the write
+        await record_writes([transaction.user_id])
+        await invalidate_keys([portfolio_cache_key(transaction.user_id)])
+        await publish(POSITIONS_CHANNEL, [transaction.user_id])
         
         return TransactionResponse(**result)
     except UserNotFoundException as e:
@@ -34,15 +55,109 @@ def create_transaction(transaction: TransactionCreate):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except FutureDateException as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except InvalidLotSelectionException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/ndjson": "ndjson"
+}
+
+@router.post("/bulk", response_model=BulkImportResponse, status_code=status.HTTP_201_CREATED)
+async def bulk_import_transactions(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="Defaults to the Content-Type"),
+    user_id: Optional[int] = Query(None, description="Owner of rows without a user_id column"),
+    skip_invalid: bool = Query(False, description="Insert the valid rows even if some rows fail")
+):
+    started = time.perf_counter()
+    upload_format = format or IMPORT_CONTENT_TYPES.get(request.headers.get("content-type", "").split(";")[0].strip())
+    if upload_format is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson, or pass format"
+        )
+    
+    parse = parse_csv if upload_format == "csv" else parse_ndjson
+    try:
+        rows = await parse(request.stream(), settings.bulk_import_max_rows)
+    except InvalidImportException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except ImportTooLargeException as e:
+        raise HTTPException(status_code=status.HTTP_413_CONTENT_TOO_LARGE, detail=str(e))
+    
+    result = await transaction_service.import_transactions(rows, user_id, skip_invalid)
+    user_ids = result.pop('user_ids')
+    if user_ids:
+        await record_writes(user_ids)
+        await invalidate_keys([portfolio_cache_key(owner) for owner in user_ids])
+        await publish(POSITIONS_CHANNEL, user_ids)
+    
+    body = BulkImportResponse(**result, duration_ms=round((time.perf_counter() - started) * 1000, 2))
+    if body.error_count and not skip_invalid:
+        return JSONResponse(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, content=body.model_dump())
+    return body
+
+def _export_row(row: dict) -> dict:
+    return {
+        **row,
+        'price': float(row['price']),
+        'transaction_date': row['transaction_date'].isoformat(),
+        'created_at': row['created_at'].isoformat()
+    }
+
+async def _stream_ndjson(user_id: int, symbol: Optional[str]):
+    async for batch in transaction_service.transaction_repo.iter_batches(user_id, symbol):
+        yield "".join(json.dumps(_export_row(row)) + "\n" for row in batch)
+
+async def _stream_csv(user_id: int, symbol: Optional[str]):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    async for batch in transaction_service.transaction_repo.iter_batches(user_id, symbol):
+        writer.writerows(_export_row(row) for row in batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
 
 @router.get("", response_model=list[TransactionResponse])
-def get_transactions(
+async def get_transactions(
+    response: Response,
     user_id: int = Query(..., description="User ID to get transactions for"),
-    symbol: Optional[str] = Query(None, description="Filter by symbol")
+    symbol: Optional[str] = Query(None, description="Filter by symbol"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; enables keyset pagination"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    format: Literal["json", "ndjson", "csv"] = Query("json", description="ndjson/csv stream the full history")
 ):
-    if symbol:
-        transactions = transaction_service.transaction_repo.get_by_user_and_symbol(user_id, symbol)
-    else:
-        transactions = transaction_service.transaction_repo.get_by_user(user_id)
+    if format == "ndjson":
+        return StreamingResponse(_stream_ndjson(user_id, symbol), media_type="application/x-ndjson")
+    if format == "csv":
+        return StreamingResponse(
+            _stream_csv(user_id, symbol),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="transactions-{user_id}.csv"'}
+        )
+    
+    if limit is None and cursor is None:
+        if symbol:
+            transactions = await transaction_service.transaction_repo.get_by_user_and_symbol(user_id, symbol)
+        else:
+            transactions = await transaction_service.transaction_repo.get_by_user(user_id)
+        return [TransactionResponse(**txn) for txn in transactions]
+    
+    try:
+        after = decode_transaction_cursor(cursor) if cursor else None
+    except InvalidCursorException as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    page_size = limit or DEFAULT_PAGE_SIZE
+    # One extra row tells whether there is a next page without a COUNT
+    transactions = await transaction_service.transaction_repo.get_page(user_id, symbol, page_size + 1, after)
+    if len(transactions) > page_size:
+        transactions = transactions[:page_size]
+        response.headers["X-Next-Cursor"] = encode_transaction_cursor(transactions[-1])
     
     return [TransactionResponse(**txn) for txn in transactions]
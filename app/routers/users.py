@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, status
 from app.schemas.user import UserCreate, UserResponse
+from app.database import record_writes
 from app.repositories.user_repository import UserRepository
 from app.utils.exceptions import DuplicateEmailException
 from psycopg2.errors import UniqueViolation
@@ -11,6 +12,7 @@ user_repo = UserRepository()
 def create_user(user: UserCreate):
     try:
         result = user_repo.create(user.name, user.email, None)
+        record_writes([result['user_id']])
         return UserResponse(**result)
     except UniqueViolation:
         raise HTTPException(
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+from datetime import date, datetime
 
 class HoldingDetail(BaseModel):
     symbol: str
@@ -17,3 +18,55 @@ class PortfolioSummaryResponse(BaseModel):
     total_pl: float
     total_pl_percent: float
     holdings: List[HoldingDetail]
+
+class PortfolioBatchRequest(BaseModel):
+    # None means every user
+    user_ids: Optional[List[int]] = None
+    warm_cache: bool = False
+
+class PortfolioValuePoint(BaseModel):
+    timestamp: datetime
+    total_invested: float
+    current_value: float
+
+class PortfolioHistoryResponse(BaseModel):
+    user_id: int
+    interval_seconds: int
+    points: List[PortfolioValuePoint]
+
+class PortfolioReturnsResponse(BaseModel):
+    user_id: int
+    start_date: Optional[date]
+    as_of: date
+    xirr_percent: Optional[float]
+    twr_percent: Optional[float]
+
+class OpenLot(BaseModel):
+    transaction_id: int
+    transaction_date: date
+    units: int
+    unit_cost: float
+
+class LotHolding(BaseModel):
+    symbol: str
+    open_units: int
+    average_cost: float
+    cost_basis: float
+    current_price: float
+    market_value: float
+    unrealized_pl: float
+    realized_pl: float
+    realized_cost_basis: float
+    unmatched_units: int
+    open_lots: Optional[List[OpenLot]] = None
+
+class PortfolioPnLResponse(BaseModel):
+    user_id: int
+    method: str
+    as_of_transaction_id: int
+    realized_pl: float
+    unrealized_pl: float
+    total_pl: float
+    cost_basis: float
+    market_value: float
+    holdings: List[LotHolding]
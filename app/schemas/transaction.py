@@ -1,6 +1,17 @@
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, field_validator, model_validator
 from datetime import date, datetime
-from typing import Literal
+from typing import List, Literal, Optional
+
+class LotSelection(BaseModel):
+    transaction_id: int
+    units: int
+    
+    @field_validator('units')
+    @classmethod
+    def validate_units(cls, v):
+        if v <= 0:
+            raise ValueError('Units must be positive')
+        return v
 
 class TransactionCreate(BaseModel):
     user_id: int
@@ -9,6 +20,8 @@ class TransactionCreate(BaseModel):
     units: int
     price: float
     transaction_date: date
+    # SELL only: the BUY lots to close instead of FIFO
+    lots: Optional[List[LotSelection]] = None
     
     @field_validator('symbol')
     @classmethod
@@ -35,6 +48,18 @@ class TransactionCreate(BaseModel):
         if v > date.today():
             raise ValueError('Transaction date cannot be in the future')
         return v
+    
+    @model_validator(mode='after')
+    def validate_lots(self):
+        if self.lots is None:
+            return self
+        if self.transaction_type != 'SELL':
+            raise ValueError('Lots can only be selected for a SELL')
+        if len({lot.transaction_id for lot in self.lots}) != len(self.lots):
+            raise ValueError('Each lot can only be selected once')
+        if sum(lot.units for lot in self.lots) != self.units:
+            raise ValueError('Selected lot units must add up to the units sold')
+        return self
 
 class TransactionResponse(BaseModel):
     transaction_id: int
@@ -45,3 +70,14 @@ class TransactionResponse(BaseModel):
     price: float
     transaction_date: date
     created_at: datetime
+
+class BulkImportError(BaseModel):
+    row: int
+    error: str
+
+class BulkImportResponse(BaseModel):
+    received: int
+    inserted: int
+    error_count: int
+    errors: List[BulkImportError]
+    duration_ms: float
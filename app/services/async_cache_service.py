@@ -0,0 +1,241 @@
+import json
+import time
+import uuid
+from redis import asyncio as aioredis
+from typing import Optional, Any, Callable, List, Tuple
+from app.config import settings
+from app.utils.metrics import CACHE_REQUESTS, CACHE_ERRORS
+from app.utils import profiler
+from app.services.cache_service import (
+    redis_client, local_cache, INVALIDATION_CHANNEL,
+    _GET_SCRIPT, _SET_SCRIPT, _RELEASE_LOCK_SCRIPT, _generation_keys
+)
+
+class _ProfiledPipeline(aioredis.client.Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        if not profiler.active():
+            return await super().execute(raise_on_error)
+        started = time.perf_counter()
+        commands = len(self.command_stack)
+        try:
+            return await super().execute(raise_on_error)
+        finally:
+            profiler.record("redis", f"PIPELINE ({commands} commands)", time.perf_counter() - started)
+
+class ProfiledAsyncRedis(aioredis.Redis):
+    async def execute_command(self, *args, **options):
+        if not profiler.active():
+            return await super().execute_command(*args, **options)
+        started = time.perf_counter()
+        try:
+            return await super().execute_command(*args, **options)
+        finally:
+            profiler.record("redis", str(args[0]), time.perf_counter() - started, args[1:])
+    
+    def pipeline(self, transaction=True, shard_hint=None):
+        return _ProfiledPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+# redis.asyncio mirror of cache_service for the async routes. It shares the
+# key layout, Lua scripts and in-process tier, so entries written on either
+# path are visible to the other. Only enabled when the sync client connected.
+async_redis_client = ProfiledAsyncRedis.from_url(settings.redis_url, decode_responses=True) if redis_client else None
+
+if async_redis_client:
+    _get_script = async_redis_client.register_script(_GET_SCRIPT)
+    _set_script = async_redis_client.register_script(_SET_SCRIPT)
+    _release_lock_script = async_redis_client.register_script(_RELEASE_LOCK_SCRIPT)
+
+async def _bump_generations(gen_keys: List[str], batch_size: int = 1000) -> None:
+    for i in range(0, len(gen_keys), batch_size):
+        pipe = async_redis_client.pipeline(transaction=False)
+        for gen_key in gen_keys[i:i + batch_size]:
+            pipe.incr(gen_key)
+            pipe.expire(gen_key, settings.cache_generation_ttl)
+        await pipe.execute()
+
+async def _get_entry(key: str, decode: Callable[[str], Any]) -> Tuple[Optional[Any], Optional[Tuple[int, int]]]:
+    if not async_redis_client:
+        return None, None
+    
+    value, generation = local_cache.get(key)
+    if value is not None:
+        CACHE_REQUESTS.inc("local", "hit")
+        return value, generation
+    
+    epoch = local_cache.epoch
+    try:
+        ns_gen, key_gen, raw = await _get_script(keys=_generation_keys(key), args=[key])
+        generation = (int(ns_gen), int(key_gen))
+        if raw:
+            value = decode(raw)
+            local_cache.set(key, value, generation, len(raw), settings.cache_ttl, epoch)
+            CACHE_REQUESTS.inc("redis", "hit")
+            return value, generation
+        CACHE_REQUESTS.inc("redis", "miss")
+        return None, generation
+    except Exception as e:
+        CACHE_ERRORS.inc("get")
+        print(f"Cache get error: {e}")
+        return None, None
+
+async def get_raw_cache_entry(key: str) -> Tuple[Optional[bytes], Optional[Tuple[int, int]]]:
+    # For entries written with set_raw_cache: the stored JSON as bytes, never
+    # decoded, so it can be sent as the response body as-is. Keys must be read
+    # either raw or decoded, not both, since they share the local tier.
+    return await _get_entry(key, str.encode)
+
+async def get_generation(key: str) -> Optional[Tuple[int, int]]:
+    if not async_redis_client:
+        return None
+    
+    try:
+        ns_gen, key_gen = await async_redis_client.mget(_generation_keys(key))
+        return int(ns_gen or 0), int(key_gen or 0)
+    except Exception as e:
+        CACHE_ERRORS.inc("get")
+        print(f"Cache get error: {e}")
+        return None
+
+async def _set_entry(key: str, raw: Any, local_value: Any, ttl: int,
+                     generation: Optional[Tuple[int, int]]) -> bool:
+    if not async_redis_client:
+        return False
+    
+    try:
+        expected = [str(generation[0]), str(generation[1])] if generation else ['', '']
+        written = await _set_script(
+            keys=_generation_keys(key),
+            args=[key, raw, ttl, *expected, settings.cache_generation_ttl]
+        )
+        if not written:
+            return False
+        local_cache.set(key, local_value, (int(written[0]), int(written[1])), len(raw), ttl)
+        return True
+    except Exception as e:
+        CACHE_ERRORS.inc("set")
+        print(f"Cache set error: {e}")
+        return False
+
+async def set_raw_cache(key: str, raw: bytes, ttl: int = settings.cache_ttl,
+                        generation: Optional[Tuple[int, int]] = None) -> bool:
+    return await _set_entry(key, raw, raw, ttl, generation)
+
+async def _publish_invalidation(patterns: List[str]):
+    local_cache.invalidate_many(patterns)
+    await publish(INVALIDATION_CHANNEL, patterns)
+
+async def invalidate_keys(keys: List[str]) -> bool:
+    if not async_redis_client:
+        return False
+    
+    try:
+        await _bump_generations([f"gen:{key}" for key in keys])
+        await _publish_invalidation(keys)
+        return True
+    except Exception as e:
+        CACHE_ERRORS.inc("invalidate")
+        print(f"Cache invalidate error: {e}")
+        return False
+
+async def get_version(name: str) -> Optional[int]:
+    if not async_redis_client:
+        return None
+    
+    try:
+        return int(await async_redis_client.get(f"version:{name}") or 0)
+    except Exception as e:
+        CACHE_ERRORS.inc("version")
+        print(f"Cache version error: {e}")
+        return None
+
+async def acquire_lock(name: str, ttl_ms: int) -> Optional[str]:
+    if not async_redis_client:
+        return ""
+    
+    try:
+        token = uuid.uuid4().hex
+        if await async_redis_client.set(f"lock:{name}", token, nx=True, px=ttl_ms):
+            return token
+        return None
+    except Exception as e:
+        CACHE_ERRORS.inc("lock")
+        print(f"Cache lock error: {e}")
+        return ""
+
+async def lock_exists(name: str) -> bool:
+    if not async_redis_client:
+        return False
+    
+    try:
+        return bool(await async_redis_client.exists(f"lock:{name}"))
+    except Exception as e:
+        CACHE_ERRORS.inc("lock")
+        print(f"Cache lock error: {e}")
+        return False
+
+async def release_lock(name: str, token: str) -> bool:
+    if not async_redis_client or not token:
+        return False
+    
+    try:
+        return bool(await _release_lock_script(keys=[f"lock:{name}"], args=[token]))
+    except Exception as e:
+        CACHE_ERRORS.inc("lock")
+        print(f"Cache lock error: {e}")
+        return False
+
+async def set_strings(keys: List[str], value: str, ttl: int) -> bool:
+    if not async_redis_client or not keys:
+        return False
+    
+    try:
+        pipe = async_redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.set(key, value, ex=ttl)
+        await pipe.execute()
+        return True
+    except Exception as e:
+        CACHE_ERRORS.inc("set")
+        print(f"Cache set error: {e}")
+        return False
+
+async def get_string(key: str) -> Tuple[bool, Optional[str]]:
+    # (False, None) when Redis is unavailable, so callers can tell "no value"
+    # apart from "don't know"
+    if not async_redis_client:
+        return False, None
+    
+    try:
+        return True, await async_redis_client.get(key)
+    except Exception as e:
+        CACHE_ERRORS.inc("get")
+        print(f"Cache get error: {e}")
+        return False, None
+
+async def touch_member(key: str, member: Any, score: float) -> bool:
+    if not async_redis_client:
+        return False
+    
+    try:
+        await async_redis_client.zadd(key, {str(member): score})
+        return True
+    except Exception as e:
+        CACHE_ERRORS.inc("touch")
+        print(f"Cache touch error: {e}")
+        return False
+
+async def publish(channel: str, message: Any) -> bool:
+    if not async_redis_client:
+        return False
+    
+    try:
+        await async_redis_client.publish(channel, json.dumps(message, default=str))
+        return True
+    except Exception as e:
+        CACHE_ERRORS.inc("publish")
+        print(f"Cache publish error: {e}")
+        return False
+
+async def close():
+    if async_redis_client:
+        await async_redis_client.aclose()
@@ -1,22 +1,61 @@
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
-import bcrypt
+from typing import Dict, Optional, Tuple
 import jwt
 from app.config import settings
-from app.repositories.user_repository import UserRepository
+from app.repositories.async_user_repository import AsyncUserRepository
 from app.utils.exceptions import AuthenticationException
+from app.utils.password_pool import PasswordPool
 
-user_repo = UserRepository()
+user_repo = AsyncUserRepository()
+password_pool = PasswordPool(settings.auth_pool_workers, settings.auth_pool_max_queue, settings.auth_pool_timeout)
 
-def hash_password(password: str) -> str:
-    password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
-    return bcrypt.hashpw(password_bytes, salt).decode('utf-8')
+async def hash_password(password: str) -> str:
+    return await password_pool.hash(password)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    password_bytes = plain_password.encode('utf-8')
-    hashed_bytes = hashed_password.encode('utf-8')
-    return bcrypt.checkpw(password_bytes, hashed_bytes)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_pool.check(plain_password, hashed_password)
+
+# Decoded tokens, keyed by the raw token and kept until their exp, so hot
+# tokens skip the HMAC check and JSON decode. Only valid tokens are cached.
+class TokenCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+    
+    def get(self, token: str) -> Optional[Tuple[int, float]]:
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self._hits += 1
+            return entry
+    
+    def put(self, token: str, user_id: int, expires_at: float):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[token] = (user_id, expires_at)
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def discard(self, token: str):
+        with self._lock:
+            self._entries.pop(token, None)
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self._hits, 'misses': self._misses}
+
+token_cache = TokenCache(settings.auth_token_cache_size)
 
 def create_access_token(user_id: int) -> str:
     expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
@@ -27,26 +66,41 @@ def create_access_token(user_id: int) -> str:
     return jwt.encode(payload, settings.secret_key, algorithm=settings.algorithm)
 
 def verify_token(token: str) -> int:
+    cached = token_cache.get(token)
+    if cached is not None:
+        user_id, expires_at = cached
+        if time.time() < expires_at:
+            return user_id
+        token_cache.discard(token)
+        raise AuthenticationException("Token expired")
+    
     try:
         payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
         user_id: int = payload.get("user_id")
         if user_id is None:
             raise AuthenticationException("Invalid token")
-        return user_id
     except jwt.ExpiredSignatureError:
         raise AuthenticationException("Token expired")
     except jwt.InvalidTokenError:
         raise AuthenticationException("Invalid token")
+    
+    # Tokens without exp never expire; cache them for the default lifetime
+    expires_at = payload.get("exp") or time.time() + settings.access_token_expire_minutes * 60
+    token_cache.put(token, user_id, float(expires_at))
+    return user_id
+
+def auth_stats() -> Dict:
+    return {'password_pool': password_pool.stats(), 'token_cache': token_cache.stats()}
 
-def authenticate_user(email: str, password: str):
-    user = user_repo.get_by_email(email)
+async def authenticate_user(email: str, password: str):
+    user = await user_repo.get_by_email(email)
     if not user:
         raise AuthenticationException("Invalid credentials")
     
     if not user.get('password_hash'):
         raise AuthenticationException("User has no password set")
     
-    if not verify_password(password, user['password_hash']):
+    if not await verify_password(password, user['password_hash']):
         raise AuthenticationException("Invalid credentials")
     
     return user
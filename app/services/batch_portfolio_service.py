@@ -0,0 +1,136 @@
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+import numpy as np
+import orjson
+from app.config import settings
+from app.database import unit_of_work
+from app.repositories.position_repository import PositionRepository
+from app.repositories.user_repository import UserRepository
+from app.services.cache_service import get_generations, get_version, set_raw_cache_many
+from app.services.portfolio_service import portfolio_cache_key
+from app.services.price_snapshot import price_snapshot
+
+def value_portfolios(user_ids: List[int], positions: List[Dict], prices: Mapping[str, float]) -> Dict[int, Dict]:
+    # Values every position of a page of users at once: symbols are joined to
+    # the price snapshot through an index array and per-user totals come from
+    # np.bincount. Figures are rounded exactly as build_portfolio_summary does,
+    # so a batch summary is byte-for-byte what GET /portfolio-summary caches.
+    user_index = {user_id: i for i, user_id in enumerate(user_ids)}
+    symbols = sorted({position['symbol'] for position in positions})
+    symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+    price_vector = np.array([float(prices.get(symbol, 0.0)) for symbol in symbols], dtype=np.float64)
+    
+    count = len(positions)
+    owners = np.fromiter((user_index[p['user_id']] for p in positions), dtype=np.int64, count=count)
+    codes = np.fromiter((symbol_index[p['symbol']] for p in positions), dtype=np.int64, count=count)
+    buy_units = np.fromiter((float(p['buy_units']) for p in positions), dtype=np.float64, count=count)
+    buy_cost = np.fromiter((float(p['buy_cost']) for p in positions), dtype=np.float64, count=count)
+    units = buy_units - np.fromiter((float(p['sell_units']) for p in positions), dtype=np.float64, count=count)
+    current_price = price_vector[codes]
+    
+    # Python's round() rather than np.round, which rounds a few halves differently
+    raw_average = buy_cost / buy_units
+    average = np.array([round(x, 2) for x in raw_average.tolist()], dtype=np.float64)
+    cost_basis = np.array([round(x, 2) for x in (raw_average * units).tolist()], dtype=np.float64)
+    value = current_price * units
+    pl = (current_price - average) * units
+    
+    invested = np.bincount(owners, weights=cost_basis, minlength=len(user_ids)).tolist()
+    current_value = np.bincount(owners, weights=value, minlength=len(user_ids)).tolist()
+    
+    summaries: Dict[int, Dict] = {}
+    for i, user_id in enumerate(user_ids):
+        total_pl = current_value[i] - invested[i]
+        summaries[user_id] = {
+            'user_id': user_id,
+            'total_invested': round(invested[i], 2),
+            'current_value': round(current_value[i], 2),
+            'total_pl': round(total_pl, 2),
+            'total_pl_percent': round((total_pl / invested[i] * 100), 2) if invested[i] > 0 else 0.0,
+            'holdings': []
+        }
+    
+    rows = zip(owners.tolist(), codes.tolist(), units.tolist(), average.tolist(), cost_basis.tolist(),
+               current_price.tolist(), value.tolist(), pl.tolist())
+    for owner, code, held, avg_cost, basis, price, worth, gain in rows:
+        summaries[user_ids[owner]]['holdings'].append({
+            'symbol': symbols[code],
+            'total_units': int(held),
+            'average_cost': avg_cost,
+            'current_price': price,
+            'current_value': round(worth, 2),
+            'unrealized_pl': round(gain, 2),
+            'unrealized_pl_percent': round((gain / basis * 100), 2) if basis > 0 else 0.0
+        })
+    return summaries
+
+class BatchPortfolioService:
+    def __init__(self, page_size: int = settings.batch_summary_page_size):
+        self.page_size = page_size
+        self.user_repo = UserRepository()
+        self.position_repo = PositionRepository()
+    
+    def _pages(self, user_ids: Optional[List[int]]) -> Iterator[Tuple[List[int], List[int]]]:
+        # (requested ids, existing ids) per page, in user_id order
+        if user_ids is None:
+            after_id = 0
+            while True:
+                page = self.user_repo.get_ids_after(after_id, self.page_size)
+                if not page:
+                    return
+                yield page, page
+                after_id = page[-1]
+        
+        requested = sorted(set(user_ids))
+        for i in range(0, len(requested), self.page_size):
+            page = requested[i:i + self.page_size]
+            yield page, self.user_repo.get_existing_ids(page)
+    
+    def summaries(self, user_ids: Optional[List[int]] = None, warm_cache: bool = False) -> "SummaryBatch":
+        return SummaryBatch(self, user_ids, warm_cache)
+
+class SummaryBatch:
+    # One batch run: iterating yields a page at a time of (user_id, summary
+    # JSON, or None for an unknown user) in user_id order, so neither the
+    # database nor the caller holds the whole result. One price snapshot values the
+    # entire run; pages are only cached while it is still the current version.
+    def __init__(self, service: BatchPortfolioService, user_ids: Optional[List[int]], warm_cache: bool):
+        self.service = service
+        self.user_ids = user_ids
+        self.warm_cache = warm_cache
+        self.found = 0
+        self.missing = 0
+        self.warmed = 0
+    
+    def __iter__(self) -> Iterator[List[Tuple[int, Optional[bytes]]]]:
+        snapshot = price_snapshot.get(refresh=True)
+        pages = self.service._pages(self.user_ids)
+        while True:
+            # Warming stays on the primary: a lagging replica could cache a
+            # summary older than the generation it was read under
+            with unit_of_work(read_only=not self.warm_cache):
+                page = next(pages, None)
+                if page is None:
+                    return
+                requested, existing = page
+                keys = [portfolio_cache_key(user_id) for user_id in existing]
+                # Read before the positions, so a write in between fails the set
+                generations = get_generations(keys) if self.warm_cache and existing else None
+                positions = self.service.position_repo.get_by_users(existing) if existing else []
+            
+            summaries = value_portfolios(existing, positions, snapshot.prices)
+            bodies = {user_id: orjson.dumps(summaries[user_id]) for user_id in existing}
+            if generations is not None and get_version("prices") == snapshot.version:
+                self.warmed += set_raw_cache_many([
+                    (key, bodies[user_id], generation)
+                    for key, user_id, generation in zip(keys, existing, generations)
+                ])
+            self.found += len(existing)
+            self.missing += len(requested) - len(existing)
+            
+            yield [(user_id, bodies.get(user_id)) for user_id in requested]
+
+def ndjson_lines(page: List[Tuple[int, Optional[bytes]]]) -> bytes:
+    return b"".join(
+        (body if body is not None else orjson.dumps({'user_id': user_id, 'error': f"User {user_id} not found"})) + b"\n"
+        for user_id, body in page
+    )
@@ -1,49 +1,456 @@
 import redis
 import json
-from typing import Optional, Any
+import time
+import fnmatch
+import threading
+from collections import OrderedDict
+from typing import Optional, Any, List, Tuple, Dict, Callable
 from app.config import settings
+from app.utils.metrics import CACHE_REQUESTS, CACHE_ERRORS
+from app.utils import profiler
+
+class _ProfiledPipeline(redis.client.Pipeline):
+    def execute(self, raise_on_error: bool = True):
+        if not profiler.active():
+            return super().execute(raise_on_error)
+        started = time.perf_counter()
+        commands = len(self.command_stack)
+        try:
+            return super().execute(raise_on_error)
+        finally:
+            profiler.record("redis", f"PIPELINE ({commands} commands)", time.perf_counter() - started)
+
+# Reports every round trip to the request profiler when one is active
+class ProfiledRedis(redis.Redis):
+    def execute_command(self, *args, **options):
+        if not profiler.active():
+            return super().execute_command(*args, **options)
+        started = time.perf_counter()
+        try:
+            return super().execute_command(*args, **options)
+        finally:
+            profiler.record("redis", str(args[0]), time.perf_counter() - started, args[1:])
+    
+    def pipeline(self, transaction=True, shard_hint=None):
+        return _ProfiledPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
 
 try:
-    redis_client = redis.from_url(settings.redis_url, decode_responses=True)
+    redis_client = ProfiledRedis.from_url(settings.redis_url, decode_responses=True)
     redis_client.ping()
     print("Redis connected successfully")
 except Exception as e:
     print(f"Redis connection failed: {e}. Caching disabled.")
     redis_client = None
 
-def get_cache(key: str) -> Optional[Any]:
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+class LocalCache:
+    # Bounded in-process LRU with TTL in front of Redis. Entries are keyed by the
+    # logical key and hold the decoded value, so callers must not mutate it.
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Any, Tuple[int, int], int, float]]" = OrderedDict()
+        self._bytes = 0
+        self._epoch = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expirations': 0, 'invalidations': 0}
+    
+    def get(self, key: str) -> Tuple[Optional[Any], Optional[Tuple[int, int]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None, None
+            value, generation, size, expires_at = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None, None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return value, generation
+    
+    def generation(self, key: str) -> Optional[Tuple[int, int]]:
+        # Generation of a live entry, without touching LRU order or stats
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[3] <= time.monotonic():
+                return None
+            return entry[1]
+    
+    @property
+    def epoch(self) -> int:
+        return self._epoch
+    
+    def set(self, key: str, value: Any, generation: Tuple[int, int], size: int, ttl: float,
+            epoch: Optional[int] = None):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            # An invalidation that arrived while the value was being read from
+            # Redis may refer to it, so don't keep it locally.
+            if epoch is not None and epoch != self._epoch:
+                return
+            self._remove(key)
+            self._entries[key] = (value, generation, size, time.monotonic() + min(ttl, self.ttl))
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+    
+    def invalidate_many(self, patterns: List[str]):
+        with self._lock:
+            self._epoch += 1
+            removed = 0
+            for pattern in patterns:
+                if not any(char in pattern for char in '*?['):
+                    keys = [pattern] if pattern in self._entries else []
+                else:
+                    keys = [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]
+                for key in keys:
+                    self._remove(key)
+                removed += len(keys)
+            self._stats['invalidations'] += removed
+    
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+            self._bytes = 0
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, 'entries': len(self._entries), 'bytes': self._bytes}
+    
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+local_cache = LocalCache(
+    max_entries=settings.local_cache_max_entries,
+    max_bytes=settings.local_cache_max_bytes,
+    ttl=settings.local_cache_ttl
+)
+
+# Cache entries live under "<key>@<namespace generation>.<key generation>".
+# Invalidation bumps a generation with a single INCR; entries written under
+# older generations are never read again and expire through their TTL.
+_GET_SCRIPT = """
+local ns_gen = redis.call('GET', KEYS[1]) or '0'
+local key_gen = redis.call('GET', KEYS[2]) or '0'
+local value = redis.call('GET', ARGV[1] .. '@' .. ns_gen .. '.' .. key_gen)
+return {ns_gen, key_gen, value}
+"""
+
+_SET_SCRIPT = """
+local ns_gen = redis.call('GET', KEYS[1]) or '0'
+local key_gen = redis.call('GET', KEYS[2]) or '0'
+if ARGV[4] ~= '' and (ARGV[4] ~= ns_gen or ARGV[5] ~= key_gen) then
+    return 0
+end
+redis.call('SET', ARGV[1] .. '@' .. ns_gen .. '.' .. key_gen, ARGV[2], 'EX', ARGV[3])
+for _, gen_key in ipairs(KEYS) do
+    if redis.call('EXISTS', gen_key) == 1 then
+        redis.call('EXPIRE', gen_key, ARGV[6])
+    end
+end
+return {ns_gen, key_gen}
+"""
+
+_RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+if redis_client:
+    _get_script = redis_client.register_script(_GET_SCRIPT)
+    _set_script = redis_client.register_script(_SET_SCRIPT)
+
+def _generation_keys(key: str) -> List[str]:
+    namespace = key.split(':', 1)[0]
+    return [f"gen:{namespace}", f"gen:{key}"]
+
+def _bump_generations(gen_keys: List[str], batch_size: int = 1000) -> None:
+    for i in range(0, len(gen_keys), batch_size):
+        pipe = redis_client.pipeline(transaction=False)
+        for gen_key in gen_keys[i:i + batch_size]:
+            pipe.incr(gen_key)
+            pipe.expire(gen_key, settings.cache_generation_ttl)
+        pipe.execute()
+
+def get_cache_entry(key: str) -> Tuple[Optional[Any], Optional[Tuple[int, int]]]:
+    if not redis_client:
+        return None, None
+    
+    value, generation = local_cache.get(key)
+    if value is not None:
+        CACHE_REQUESTS.inc("local", "hit")
+        return value, generation
+    
+    epoch = local_cache.epoch
+    try:
+        ns_gen, key_gen, raw = _get_script(keys=_generation_keys(key), args=[key])
+        generation = (int(ns_gen), int(key_gen))
+        if raw:
+            value = json.loads(raw)
+            local_cache.set(key, value, generation, len(raw), settings.cache_ttl, epoch)
+            CACHE_REQUESTS.inc("redis", "hit")
+            return value, generation
+        CACHE_REQUESTS.inc("redis", "miss")
+        return None, generation
+    except Exception as e:
+        CACHE_ERRORS.inc("get")
+        print(f"Cache get error: {e}")
+        return None, None
+
+def get_generation(key: str) -> Optional[Tuple[int, int]]:
     if not redis_client:
         return None
     
     try:
-        value = redis_client.get(key)
-        if value:
-            return json.loads(value)
+        ns_gen, key_gen = redis_client.mget(_generation_keys(key))
+        return int(ns_gen or 0), int(key_gen or 0)
+    except Exception as e:
+        CACHE_ERRORS.inc("get")
+        print(f"Cache get error: {e}")
+        return None
+
+def get_generations(keys: List[str]) -> Optional[List[Tuple[int, int]]]:
+    # Generations of many keys in one MGET, e.g. before a batch computes them
+    if not redis_client:
         return None
+    
+    try:
+        values = redis_client.mget([gen_key for key in keys for gen_key in _generation_keys(key)])
+        return [(int(values[i] or 0), int(values[i + 1] or 0)) for i in range(0, len(values), 2)]
     except Exception as e:
+        CACHE_ERRORS.inc("get")
         print(f"Cache get error: {e}")
         return None
 
-def set_cache(key: str, value: Any, ttl: int = settings.cache_ttl) -> bool:
+def get_cache(key: str) -> Optional[Any]:
+    value, _ = get_cache_entry(key)
+    return value
+
+def set_cache(key: str, value: Any, ttl: int = settings.cache_ttl,
+              generation: Optional[Tuple[int, int]] = None) -> bool:
     if not redis_client:
         return False
     
     try:
-        redis_client.setex(key, ttl, json.dumps(value, default=str))
+        # With a generation from get_cache_entry, the write is dropped if the
+        # key was invalidated while the value was being computed.
+        expected = [str(generation[0]), str(generation[1])] if generation else ['', '']
+        raw = json.dumps(value, default=str)
+        written = _set_script(
+            keys=_generation_keys(key),
+            args=[key, raw, ttl, *expected, settings.cache_generation_ttl]
+        )
+        if not written:
+            return False
+        local_cache.set(key, json.loads(raw), (int(written[0]), int(written[1])), len(raw), ttl)
         return True
     except Exception as e:
+        CACHE_ERRORS.inc("set")
         print(f"Cache set error: {e}")
         return False
 
+def set_raw_cache_many(entries: List[Tuple[str, bytes, Tuple[int, int]]], ttl: int = settings.cache_ttl) -> int:
+    # Batch writer for (key, JSON bytes, generation) entries that
+    # get_raw_cache_entry serves as-is. One pipelined round trip; each write is
+    # still dropped if its key was invalidated after the generation was read.
+    # Bypasses the local tier so a large batch doesn't flush it.
+    if not redis_client or not entries:
+        return 0
+    
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for key, raw, generation in entries:
+            _set_script(
+                keys=_generation_keys(key),
+                args=[key, raw, ttl, str(generation[0]), str(generation[1]), settings.cache_generation_ttl],
+                client=pipe
+            )
+        return sum(1 for written in pipe.execute() if written)
+    except Exception as e:
+        CACHE_ERRORS.inc("set")
+        print(f"Cache set error: {e}")
+        return 0
+
+def _publish_invalidation(patterns: List[str]):
+    local_cache.invalidate_many(patterns)
+    publish(INVALIDATION_CHANNEL, patterns)
+
 def invalidate_cache(pattern: str) -> bool:
     if not redis_client:
         return False
     
     try:
-        keys = redis_client.keys(pattern)
-        if keys:
-            redis_client.delete(*keys)
+        namespace = pattern.split(':', 1)[0]
+        if not any(char in pattern for char in '*?['):
+            _bump_generations([f"gen:{pattern}"])
+        elif pattern == f"{namespace}:*":
+            _bump_generations([f"gen:{namespace}"])
+        else:
+            # Arbitrary globs can't map to a generation; SCAN in small batches
+            # instead of KEYS so Redis is never blocked for the whole keyspace.
+            batch = []
+            for key in redis_client.scan_iter(match=pattern, count=1000):
+                batch.append(key)
+                if len(batch) >= 1000:
+                    redis_client.unlink(*batch)
+                    batch = []
+            if batch:
+                redis_client.unlink(*batch)
+        _publish_invalidation([pattern])
+        return True
+    except Exception as e:
+        CACHE_ERRORS.inc("invalidate")
+        print(f"Cache invalidate error: {e}")
+        return False
+
+def invalidate_keys(keys: List[str]) -> bool:
+    if not redis_client:
+        return False
+    
+    try:
+        _bump_generations([f"gen:{key}" for key in keys])
+        _publish_invalidation(keys)
         return True
     except Exception as e:
+        CACHE_ERRORS.inc("invalidate")
         print(f"Cache invalidate error: {e}")
         return False
+
+def get_version(name: str) -> Optional[int]:
+    if not redis_client:
+        return None
+    
+    try:
+        return int(redis_client.get(f"version:{name}") or 0)
+    except Exception as e:
+        CACHE_ERRORS.inc("version")
+        print(f"Cache version error: {e}")
+        return None
+
+def next_version(name: str) -> Optional[int]:
+    if not redis_client:
+        return None
+    
+    try:
+        return int(redis_client.incr(f"version:{name}"))
+    except Exception as e:
+        CACHE_ERRORS.inc("version")
+        print(f"Cache version error: {e}")
+        return None
+
+def set_strings(keys: List[str], value: str, ttl: int) -> bool:
+    if not redis_client or not keys:
+        return False
+    
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.set(key, value, ex=ttl)
+        pipe.execute()
+        return True
+    except Exception as e:
+        CACHE_ERRORS.inc("set")
+        print(f"Cache set error: {e}")
+        return False
+
+def get_string(key: str) -> Tuple[bool, Optional[str]]:
+    # (False, None) when Redis is unavailable, so callers can tell "no value"
+    # apart from "don't know"
+    if not redis_client:
+        return False, None
+    
+    try:
+        return True, redis_client.get(key)
+    except Exception as e:
+        CACHE_ERRORS.inc("get")
+        print(f"Cache get error: {e}")
+        return False, None
+
+def recent_members(key: str, since: float, limit: int) -> List[str]:
+    # Members of a sorted set scored at or after `since`, newest first. Older
+    # members, and any beyond `limit`, are dropped on the way.
+    if not redis_client:
+        return []
+    
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.zremrangebyscore(key, '-inf', f"({since}")
+        pipe.zremrangebyrank(key, 0, -limit - 1)
+        pipe.zrevrange(key, 0, limit - 1)
+        return pipe.execute()[-1]
+    except Exception as e:
+        CACHE_ERRORS.inc("get")
+        print(f"Cache get error: {e}")
+        return []
+
+# Pub/sub fan-out shared by every worker: handlers are registered at import
+# time and run on one listener thread per process. on_reset is called when
+# the subscription is (re)established, since messages sent meanwhile are lost.
+_subscriptions: Dict[str, List[Tuple[Callable[[Any], None], Optional[Callable[[], None]]]]] = {}
+
+def subscribe(channel: str, handler: Callable[[Any], None],
+              on_reset: Optional[Callable[[], None]] = None):
+    _subscriptions.setdefault(channel, []).append((handler, on_reset))
+
+def publish(channel: str, message: Any) -> bool:
+    if not redis_client:
+        return False
+    
+    try:
+        redis_client.publish(channel, json.dumps(message, default=str))
+        return True
+    except Exception as e:
+        CACHE_ERRORS.inc("publish")
+        print(f"Cache publish error: {e}")
+        return False
+
+def _reset_subscribers():
+    for handlers in _subscriptions.values():
+        for _, on_reset in handlers:
+            if on_reset:
+                on_reset()
+
+def _listen():
+    while True:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        try:
+            pubsub.subscribe(*_subscriptions)
+            _reset_subscribers()
+            for message in pubsub.listen():
+                try:
+                    data = json.loads(message['data'])
+                except ValueError as e:
+                    print(f"Pub/sub message error on {message['channel']}: {e}")
+                    continue
+                for handler, _ in _subscriptions[message['channel']]:
+                    try:
+                        handler(data)
+                    except Exception as e:
+                        print(f"Pub/sub handler error on {message['channel']}: {e}")
+        except Exception as e:
+            print(f"Pub/sub listener error: {e}. Reconnecting.")
+            _reset_subscribers()
+            time.sleep(1)
+        finally:
+            pubsub.close()
+
+def start_listener():
+    if not redis_client:
+        return
+    
+    threading.Thread(target=_listen, name="cache-pubsub-listener", daemon=True).start()
+
+subscribe(INVALIDATION_CHANNEL, local_cache.invalidate_many, on_reset=local_cache.clear)
@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from app.config import settings
+from app.services.async_cache_service import touch_member
+from app.services.batch_portfolio_service import BatchPortfolioService
+from app.services.cache_service import recent_members
+from app.utils.metrics import CACHE_WARM_DURATION
+
+# Sorted set of user_id -> unix time of their last GET /portfolio-summary
+ACTIVE_USERS_KEY = "active:portfolio-summary"
+
+class ActivityTracker:
+    # Per-worker throttle so a busy dashboard costs at most one ZADD per user
+    # every `interval` seconds. Bounded LRU, so it can't grow with the user base.
+    def __init__(self, interval: float, max_entries: int):
+        self.interval = interval
+        self.max_entries = max_entries
+        self._touched: "OrderedDict[int, float]" = OrderedDict()
+    
+    def due(self, user_id: int) -> bool:
+        now = time.monotonic()
+        last = self._touched.get(user_id)
+        if last is not None and now - last < self.interval:
+            return False
+        self._touched[user_id] = now
+        self._touched.move_to_end(user_id)
+        if len(self._touched) > self.max_entries:
+            self._touched.popitem(last=False)
+        return True
+
+activity_tracker = ActivityTracker(settings.cache_warm_touch_interval, settings.cache_warm_max_users)
+
+async def record_active_user(user_id: int):
+    if settings.cache_warm_enabled and activity_tracker.due(user_id):
+        await touch_member(ACTIVE_USERS_KEY, user_id, time.time())
+
+# Refills the summary cache for recently active users after a price tick, so
+# their next dashboard load is a cache hit instead of a foreground recompute.
+# Users are split into chunks in most-recently-active order and valued by the
+# batch summary path on a small thread pool, which bounds the database
+# connections it takes. Chunks not started within the time budget are skipped.
+class CacheWarmer:
+    def __init__(self, workers: int, chunk_size: int, budget: float, window: int, max_users: int):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.budget = budget
+        self.window = window
+        self.max_users = max_users
+        self.batch_service = BatchPortfolioService(chunk_size)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'runs': 0,
+            'users_warmed': 0,
+            'users_stale': 0,
+            'users_skipped': 0,
+            'users_failed': 0,
+            'last_run_at': None,
+            'last_active_users': 0,
+            'last_warmed_users': 0,
+            'last_coverage': None,
+            'last_duration_ms': None
+        }
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="cache-warm")
+            return self._executor
+    
+    def _warm_chunk(self, user_ids: List[int], deadline: float) -> Optional[Tuple[int, int]]:
+        if time.monotonic() >= deadline:
+            return None
+        batch = self.batch_service.summaries(user_ids, warm_cache=True)
+        for _ in batch:
+            pass
+        return batch.found, batch.warmed
+    
+    def warm(self) -> Dict:
+        started = time.perf_counter()
+        deadline = time.monotonic() + self.budget
+        user_ids = [int(member) for member in recent_members(ACTIVE_USERS_KEY, time.time() - self.window, self.max_users)]
+        
+        executor = self._get_executor()
+        chunks = [user_ids[i:i + self.chunk_size] for i in range(0, len(user_ids), self.chunk_size)]
+        futures = [(len(chunk), executor.submit(self._warm_chunk, chunk, deadline)) for chunk in chunks]
+        
+        warmed = stale = skipped = failed = 0
+        for size, future in futures:
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Cache warm chunk failed: {e}")
+                failed += size
+                continue
+            if result is None:
+                skipped += size
+            else:
+                found, chunk_warmed = result
+                warmed += chunk_warmed
+                stale += found - chunk_warmed
+        
+        elapsed = time.perf_counter() - started
+        CACHE_WARM_DURATION.observe(elapsed)
+        coverage = round(warmed / len(user_ids), 4) if user_ids else 1.0
+        with self._lock:
+            self._stats['runs'] += 1
+            self._stats['users_warmed'] += warmed
+            self._stats['users_stale'] += stale
+            self._stats['users_skipped'] += skipped
+            self._stats['users_failed'] += failed
+            self._stats['last_run_at'] = datetime.now(timezone.utc).isoformat()
+            self._stats['last_active_users'] = len(user_ids)
+            self._stats['last_warmed_users'] = warmed
+            self._stats['last_coverage'] = coverage
+            self._stats['last_duration_ms'] = round(elapsed * 1000, 2)
+        
+        if user_ids:
+            print(f"Warmed {warmed}/{len(user_ids)} active portfolio summaries in {round(elapsed * 1000, 2)} ms"
+                  f" ({skipped} over budget)")
+        return {'active_users': len(user_ids), 'warmed': warmed, 'coverage': coverage}
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'budget_seconds': self.budget,
+                **self._stats
+            }
+    
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+cache_warmer = CacheWarmer(
+    workers=settings.cache_warm_workers,
+    chunk_size=settings.cache_warm_chunk_size,
+    budget=settings.cache_warm_budget,
+    window=settings.cache_warm_active_window,
+    max_users=settings.cache_warm_max_users
+)
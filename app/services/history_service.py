@@ -0,0 +1,139 @@
+import re
+import math
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+from app.config import settings
+from app.repositories.transaction_repository import TransactionRepository
+from app.repositories.price_history_repository import PriceHistoryRepository
+from app.schemas.portfolio import PortfolioHistoryResponse, PortfolioValuePoint
+from app.services.price_snapshot import price_snapshot
+from app.utils.exceptions import InvalidHistoryRangeException
+
+INTERVAL_UNITS = {'m': 60, 'h': 3600, 'd': 86400}
+
+def parse_interval(interval: str) -> int:
+    match = re.fullmatch(r'(\d+)([mhd])', interval)
+    if not match or int(match.group(1)) <= 0:
+        raise InvalidHistoryRangeException(
+            f"Invalid interval {interval}. Use e.g. 5m, 1h or 1d"
+        )
+    return int(match.group(1)) * INTERVAL_UNITS[match.group(2)]
+
+def to_naive_utc(moment: datetime) -> datetime:
+    # price_history.ts is naive UTC; naive inputs are taken to be UTC already
+    if moment.tzinfo is None:
+        return moment
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+def utc_now() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def history_range(start: Optional[datetime], end: Optional[datetime]) -> Tuple[datetime, datetime]:
+    # Defaults: 'to' is now, 'from' 30 days before 'to'
+    end = to_naive_utc(end) if end is not None else utc_now()
+    start = to_naive_utc(start) if start is not None else end - timedelta(days=30)
+    return start, end
+
+class PortfolioHistoryService:
+    def __init__(self):
+        self.transaction_repo = TransactionRepository()
+        self.price_history_repo = PriceHistoryRepository()
+    
+    def build_grid(self, start: datetime, end: datetime, interval_seconds: int) -> Tuple[np.ndarray, int]:
+        if start > end:
+            raise InvalidHistoryRangeException("'from' must not be after 'to'")
+        span = (end - start).total_seconds()
+        points = int(span // interval_seconds) + 1
+        # Downsample by widening the step, so the number of price lookups
+        # stays bounded whatever range and interval were requested
+        if points > settings.history_max_points:
+            interval_seconds *= math.ceil(points / settings.history_max_points)
+            points = int(span // interval_seconds) + 1
+        offsets = np.arange(points, dtype=np.int64) * interval_seconds
+        return np.datetime64(start, 's') + offsets.astype('timedelta64[s]'), interval_seconds
+    
+    def get_value_history(self, user_id: int, start: datetime, end: datetime,
+                          interval: str) -> PortfolioHistoryResponse:
+        grid, interval_seconds = self.build_grid(start, end, parse_interval(interval))
+        
+        flows = self.transaction_repo.get_daily_flows(user_id, end.date())
+        symbols = sorted({row['symbol'] for row in flows})
+        if not symbols:
+            return PortfolioHistoryResponse(
+                user_id=user_id,
+                interval_seconds=interval_seconds,
+                points=[
+                    PortfolioValuePoint(timestamp=ts, total_invested=0.0, current_value=0.0)
+                    for ts in grid.astype(datetime)
+                ]
+            )
+        
+        units, cost_basis = self.holdings_matrix(flows, symbols, grid)
+        prices = self.price_matrix(symbols, grid)
+        
+        invested = cost_basis.sum(axis=0)
+        values = (units * prices).sum(axis=0)
+        
+        return PortfolioHistoryResponse(
+            user_id=user_id,
+            interval_seconds=interval_seconds,
+            points=[
+                PortfolioValuePoint(timestamp=ts, total_invested=round(float(inv), 2), current_value=round(float(val), 2))
+                for ts, inv, val in zip(grid.astype(datetime), invested, values)
+            ]
+        )
+    
+    def holdings_matrix(self, flows: List[Dict], symbols: List[str], grid: np.ndarray):
+        shape = (len(symbols), len(grid))
+        symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+        
+        rows = np.fromiter((symbol_index[row['symbol']] for row in flows), dtype=np.int64, count=len(flows))
+        dates = np.array([row['transaction_date'] for row in flows], dtype='datetime64[s]')
+        buy_units = np.array([row['buy_units'] for row in flows], dtype=np.float64)
+        buy_cost = np.array([float(row['buy_cost']) for row in flows], dtype=np.float64)
+        sell_units = np.array([row['sell_units'] for row in flows], dtype=np.float64)
+        
+        # A transaction counts from the start of its transaction_date onwards
+        cols = np.searchsorted(grid, dates, side='left')
+        in_range = cols < len(grid)
+        rows, cols = rows[in_range], cols[in_range]
+        
+        cum_buy_units = np.zeros(shape)
+        cum_buy_cost = np.zeros(shape)
+        cum_sell_units = np.zeros(shape)
+        np.add.at(cum_buy_units, (rows, cols), buy_units[in_range])
+        np.add.at(cum_buy_cost, (rows, cols), buy_cost[in_range])
+        np.add.at(cum_sell_units, (rows, cols), sell_units[in_range])
+        np.cumsum(cum_buy_units, axis=1, out=cum_buy_units)
+        np.cumsum(cum_buy_cost, axis=1, out=cum_buy_cost)
+        np.cumsum(cum_sell_units, axis=1, out=cum_sell_units)
+        
+        units = cum_buy_units - cum_sell_units
+        average_cost = np.divide(cum_buy_cost, cum_buy_units, out=np.zeros(shape), where=cum_buy_units > 0)
+        return units, average_cost * units
+    
+    def price_matrix(self, symbols: List[str], grid: np.ndarray) -> np.ndarray:
+        prices = np.full((len(symbols), len(grid)), np.nan)
+        symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+        
+        rows = self.price_history_repo.get_prices_at(symbols, grid.astype(datetime).tolist())
+        if rows:
+            prices[
+                np.fromiter((symbol_index[row['symbol']] for row in rows), dtype=np.int64, count=len(rows)),
+                np.fromiter((row['idx'] for row in rows), dtype=np.int64, count=len(rows))
+            ] = np.fromiter((float(row['price']) for row in rows), dtype=np.float64, count=len(rows))
+        
+        # Before a symbol's first recorded tick, value it at its first known
+        # price (or today's price when it has no history at all)
+        missing = np.isnan(prices)
+        if missing.any():
+            first_known = np.argmax(~missing, axis=1)
+            has_history = (~missing).any(axis=1)
+            fallback = np.where(
+                has_history,
+                prices[np.arange(len(symbols)), first_known],
+                [price_snapshot.get().get(symbol, 0.0) for symbol in symbols]
+            )
+            prices = np.where(missing, fallback[:, None], prices)
+        return prices
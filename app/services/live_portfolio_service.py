@@ -0,0 +1,221 @@
+import asyncio
+import orjson
+from typing import AsyncIterator, Dict, FrozenSet, List, Optional, Set
+from app.config import settings
+from app.services.cache_service import subscribe
+from app.services.portfolio_service import (
+    AsyncPortfolioService, build_portfolio_summary, holding_detail, portfolio_totals
+)
+from app.services.price_snapshot import PRICES_CHANNEL, price_snapshot
+
+POSITIONS_CHANNEL = "positions:updated"
+
+class _LiveUser:
+    # frames memoizes the rendered events for the current state, keyed by the
+    # set of changed symbols (None for a full summary), for users with several
+    # connections, which usually all ask for the same one.
+    __slots__ = ('user_id', 'holdings', 'prices', 'subscribers', 'frames')
+    
+    def __init__(self, user_id: int, holdings: Dict[str, Dict], prices: Dict[str, float]):
+        self.user_id = user_id
+        self.holdings = holdings
+        self.prices = prices
+        self.subscribers: Set["_Subscriber"] = set()
+        self.frames: Dict[Optional[FrozenSet[str]], bytes] = {}
+
+class _Subscriber:
+    # Pending changes are coalesced into a set of symbols, so a slow client
+    # costs at most one entry per holding no matter how many ticks it misses.
+    __slots__ = ('event', 'dirty', 'full')
+    
+    def __init__(self):
+        self.event = asyncio.Event()
+        self.dirty: Set[str] = set()
+        self.full = False
+
+# Streams live portfolio valuations to SSE clients. Holdings are loaded once
+# per subscribed user and shared by all of that user's connections. Price
+# ticks and ledger changes arrive over Redis pub/sub on the listener thread
+# and are handed to the event loop, where a tick only touches the users
+# holding a changed symbol and only re-values those holdings.
+class LivePortfolioHub:
+    def __init__(self, max_subscribers: int, heartbeat_interval: float):
+        self.max_subscribers = max_subscribers
+        self.heartbeat_interval = heartbeat_interval
+        self.portfolio_service = AsyncPortfolioService()
+        self._users: Dict[int, _LiveUser] = {}
+        self._holders: Dict[str, Set[int]] = {}
+        self._subscribers = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reloads: Set[asyncio.Task] = set()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+    
+    def has_capacity(self) -> bool:
+        return self._subscribers < self.max_subscribers
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            'subscribers': self._subscribers,
+            'users': len(self._users),
+            'symbols': len(self._holders)
+        }
+    
+    async def stream(self, user_id: int) -> AsyncIterator[bytes]:
+        subscriber = _Subscriber()
+        self._subscribers += 1
+        try:
+            user = await self._join(user_id, subscriber)
+            yield self._render(user, None)
+            
+            while True:
+                # Woken by a change, or by the shared heartbeat with nothing pending
+                await subscriber.event.wait()
+                subscriber.event.clear()
+                if subscriber.full:
+                    subscriber.full = False
+                    subscriber.dirty = set()
+                    yield self._render(user, None)
+                elif subscriber.dirty:
+                    dirty, subscriber.dirty = subscriber.dirty, set()
+                    yield self._render(user, frozenset(dirty))
+                else:
+                    yield b": keepalive\n\n"
+        finally:
+            self._subscribers -= 1
+            self._leave(user_id, subscriber)
+    
+    async def _heartbeat(self):
+        # One timer for every connection instead of a timeout per subscriber
+        while self._users:
+            await asyncio.sleep(self.heartbeat_interval)
+            for user in list(self._users.values()):
+                for subscriber in user.subscribers:
+                    subscriber.event.set()
+        self._heartbeat_task = None
+    
+    async def _join(self, user_id: int, subscriber: _Subscriber) -> _LiveUser:
+        self._loop = asyncio.get_running_loop()
+        user = self._users.get(user_id)
+        if user is None:
+            holdings = await self.portfolio_service.calculate_holdings(user_id)
+            snapshot = await price_snapshot.get_async(refresh=True)
+            # Another connection for the same user may have loaded it meanwhile
+            user = self._users.get(user_id)
+            if user is None:
+                user = self._users[user_id] = _LiveUser(user_id, holdings, self._prices_for(holdings, snapshot.prices))
+                self._index(user)
+        user.subscribers.add(subscriber)
+        if self._heartbeat_task is None:
+            self._heartbeat_task = asyncio.ensure_future(self._heartbeat())
+        return user
+    
+    def _leave(self, user_id: int, subscriber: _Subscriber):
+        user = self._users.get(user_id)
+        if user is None:
+            return
+        user.subscribers.discard(subscriber)
+        if not user.subscribers:
+            self._unindex(user)
+            del self._users[user_id]
+    
+    def _index(self, user: _LiveUser):
+        for symbol in user.holdings:
+            self._holders.setdefault(symbol, set()).add(user.user_id)
+    
+    def _unindex(self, user: _LiveUser):
+        for symbol in user.holdings:
+            holders = self._holders.get(symbol)
+            if holders is not None:
+                holders.discard(user.user_id)
+                if not holders:
+                    del self._holders[symbol]
+    
+    @staticmethod
+    def _prices_for(holdings: Dict[str, Dict], prices) -> Dict[str, float]:
+        return {symbol: float(prices.get(symbol, 0.0)) for symbol in holdings}
+    
+    def _render(self, user: _LiveUser, symbols: Optional[FrozenSet[str]]) -> bytes:
+        frame = user.frames.get(symbols)
+        if frame is not None:
+            return frame
+        if symbols is None:
+            event = b"summary"
+            payload = build_portfolio_summary(user.user_id, user.holdings, user.prices).model_dump()
+        else:
+            event = b"update"
+            payload = {
+                'user_id': user.user_id,
+                **portfolio_totals(user.holdings, user.prices),
+                'holdings': [
+                    holding_detail(symbol, user.holdings[symbol], user.prices[symbol]).model_dump()
+                    for symbol in sorted(symbols) if symbol in user.holdings
+                ]
+            }
+        frame = b"event: " + event + b"\ndata: " + orjson.dumps(payload) + b"\n\n"
+        if len(user.subscribers) > 1:
+            user.frames[symbols] = frame
+        return frame
+    
+    def _notify(self, user: _LiveUser, symbols: Optional[Set[str]] = None):
+        user.frames.clear()
+        for subscriber in user.subscribers:
+            if symbols is None:
+                subscriber.full = True
+            else:
+                subscriber.dirty |= symbols
+            subscriber.event.set()
+    
+    # Pub/sub handlers, called on the listener thread
+    def _dispatch(self, callback, *args):
+        loop = self._loop
+        if loop is None or not self._users or loop.is_closed():
+            return
+        loop.call_soon_threadsafe(callback, *args)
+    
+    def on_prices(self, message: Dict):
+        self._dispatch(self._apply_prices, message['prices'])
+    
+    def on_positions(self, user_ids: List[int]):
+        self._dispatch(self._schedule_reload, user_ids)
+    
+    def on_reset(self):
+        # Ticks or ledger changes may have been missed while disconnected
+        self._dispatch(self._schedule_reload, None)
+    
+    def _apply_prices(self, changed: Dict[str, float]):
+        touched: Dict[int, Set[str]] = {}
+        for symbol, price in changed.items():
+            for user_id in self._holders.get(symbol, ()):
+                self._users[user_id].prices[symbol] = float(price)
+                touched.setdefault(user_id, set()).add(symbol)
+        for user_id, symbols in touched.items():
+            self._notify(self._users[user_id], symbols)
+    
+    def _schedule_reload(self, user_ids: Optional[List[int]]):
+        targets = [user_id for user_id in (user_ids if user_ids is not None else list(self._users))
+                   if user_id in self._users]
+        if targets:
+            task = asyncio.ensure_future(self._reload(targets))
+            self._reloads.add(task)
+            task.add_done_callback(self._reloads.discard)
+    
+    async def _reload(self, user_ids: List[int]):
+        for user_id in user_ids:
+            try:
+                holdings = await self.portfolio_service.calculate_holdings(user_id)
+                snapshot = await price_snapshot.get_async(refresh=True)
+            except Exception as e:
+                print(f"Live portfolio reload error for user {user_id}: {e}")
+                continue
+            user = self._users.get(user_id)
+            if user is None:
+                continue
+            self._unindex(user)
+            user.holdings = holdings
+            user.prices = self._prices_for(holdings, snapshot.prices)
+            self._index(user)
+            self._notify(user)
+
+live_portfolio_hub = LivePortfolioHub(settings.live_max_subscribers, settings.live_heartbeat_interval)
+subscribe(PRICES_CHANNEL, live_portfolio_hub.on_prices, on_reset=live_portfolio_hub.on_reset)
+subscribe(POSITIONS_CHANNEL, live_portfolio_hub.on_positions)
@@ -0,0 +1,241 @@
+import sys
+from array import array
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+from app.async_database import async_unit_of_work
+from app.repositories.async_lot_repository import AsyncLotRepository
+from app.repositories.async_position_repository import AsyncPositionRepository
+
+# Lots are matched per (user, symbol) in ledger date order: FIFO by default,
+# or the BUY lots a SELL named explicitly (transaction_lot_selections), with
+# any remainder taken FIFO. Money is kept in integer cents so realized P&L
+# is exact however many partial fills it is split over.
+COMPACT_MIN_HEAD = 64
+
+def to_cents(value) -> int:
+    return int((Decimal(str(value)) * 100).to_integral_value())
+
+class LotBook:
+    # Open lots as parallel int64 arrays: BUY transaction id, entry day
+    # (date ordinal), remaining units and unit cost in cents. Lots before
+    # `head` are used up. FIFO sells advance head, and the consumed prefix is
+    # dropped once it is at least half the arrays, so each lot costs
+    # amortized O(1) no matter how many sells eat into it.
+    __slots__ = ('ids', 'days', 'units', 'costs', 'head', 'bought_units', 'sold_units',
+                 'unmatched_units', 'realized_cents', 'realized_cost_cents', 'last_day')
+    
+    def __init__(self):
+        self.ids = array('q')
+        self.days = array('q')
+        self.units = array('q')
+        self.costs = array('q')
+        self.head = 0
+        self.bought_units = 0
+        self.sold_units = 0
+        # Sold units no open lot covered (e.g. a SELL backdated before its BUY)
+        self.unmatched_units = 0
+        self.realized_cents = 0
+        self.realized_cost_cents = 0
+        self.last_day = 0
+    
+    def buy(self, transaction_id: int, day: int, units: int, cost_cents: int):
+        self.ids.append(transaction_id)
+        self.days.append(day)
+        self.units.append(units)
+        self.costs.append(cost_cents)
+        self.bought_units += units
+        self.last_day = max(self.last_day, day)
+    
+    def sell(self, day: int, units: int, price_cents: int, selection: Optional[Sequence[Sequence[int]]] = None):
+        self.sold_units += units
+        self.last_day = max(self.last_day, day)
+        remaining = units
+        # Specific lots are looked up by scanning the open lots; FIFO covers the rest
+        for buy_id, wanted in selection or ():
+            index = self._find(buy_id)
+            if index is not None and remaining:
+                remaining -= self._consume(index, min(wanted, remaining), price_cents)
+        
+        units_column = self.units
+        while remaining and self.head < len(units_column):
+            if units_column[self.head]:
+                remaining -= self._consume(self.head, remaining, price_cents)
+            if not units_column[self.head]:
+                self.head += 1
+        self.unmatched_units += remaining
+        self._compact()
+    
+    def _consume(self, index: int, wanted: int, price_cents: int) -> int:
+        taken = min(wanted, self.units[index])
+        self.units[index] -= taken
+        cost = taken * self.costs[index]
+        self.realized_cost_cents += cost
+        self.realized_cents += taken * price_cents - cost
+        return taken
+    
+    def _find(self, buy_id: int) -> Optional[int]:
+        for index in range(self.head, len(self.ids)):
+            if self.ids[index] == buy_id and self.units[index]:
+                return index
+        return None
+    
+    def _compact(self):
+        while self.head < len(self.units) and not self.units[self.head]:
+            self.head += 1
+        if self.head >= COMPACT_MIN_HEAD and self.head * 2 >= len(self.units):
+            for column in (self.ids, self.days, self.units, self.costs):
+                del column[:self.head]
+            self.head = 0
+    
+    @property
+    def open_units(self) -> int:
+        return self.bought_units - self.sold_units + self.unmatched_units
+    
+    def open_lots(self) -> Iterator[Tuple[int, int, int, int]]:
+        for index in range(self.head, len(self.units)):
+            if self.units[index]:
+                yield self.ids[index], self.days[index], self.units[index], self.costs[index]
+    
+    def open_cost_cents(self) -> int:
+        return sum(units * cost for _, _, units, cost in self.open_lots())
+    
+    # Persisted as the open lots only: count, then the four columns, int64 little-endian
+    def pack(self) -> bytes:
+        columns = [array('q', column) for column in zip(*self.open_lots())] or [array('q')] * 4
+        packed = array('q', [len(columns[0])])
+        for column in columns:
+            packed.extend(column)
+        if sys.byteorder == 'big':
+            packed.byteswap()
+        return packed.tobytes()
+    
+    @classmethod
+    def unpack(cls, data: bytes, totals: Mapping) -> "LotBook":
+        book = cls()
+        packed = array('q')
+        packed.frombytes(data)
+        if sys.byteorder == 'big':
+            packed.byteswap()
+        count = packed[0] if packed else 0
+        book.ids, book.days, book.units, book.costs = (
+            packed[1 + i * count:1 + (i + 1) * count] for i in range(4)
+        )
+        for name in ('bought_units', 'sold_units', 'unmatched_units', 'realized_cents', 'realized_cost_cents'):
+            setattr(book, name, totals[name])
+        book.last_day = totals['last_date'].toordinal() if totals['last_date'] else 0
+        return book
+
+def apply_transaction(books: Dict[str, LotBook], row: Mapping):
+    book = books.get(row['symbol'])
+    if book is None:
+        book = books[row['symbol']] = LotBook()
+    day = row['transaction_date'].toordinal()
+    if row['transaction_type'] == 'BUY':
+        book.buy(row['transaction_id'], day, row['units'], to_cents(row['price']))
+    else:
+        book.sell(day, row['units'], to_cents(row['price']), row['lots'])
+
+class LotService:
+    def __init__(self):
+        self.lot_repo = AsyncLotRepository()
+        self.position_repo = AsyncPositionRepository()
+    
+    async def refresh(self, user_id: int) -> Tuple[Dict[str, LotBook], int]:
+        # Resumes from the persisted books and applies only transactions past
+        # the user's last_transaction_id. Falls back to a full replay when a
+        # new transaction is dated before what a book already processed, or
+        # when the books' unit totals disagree with positions, which catches
+        # transactions that committed after a later id had been processed.
+        async with async_unit_of_work():
+            last_id = await self.lot_repo.get_progress(user_id)
+            books = await self.lot_repo.get_books(user_id) if last_id is not None else {}
+            rows = await self.lot_repo.get_transactions(user_id, after_id=last_id or 0)
+            
+            replay = False
+            touched = set()
+            for row in rows:
+                book = books.get(row['symbol'])
+                if book is not None and row['transaction_date'].toordinal() < book.last_day:
+                    replay = True
+                    break
+                apply_transaction(books, row)
+                touched.add(row['symbol'])
+            
+            if not replay:
+                totals = await self.position_repo.get_totals(user_id)
+                replay = any(
+                    (book.bought_units, book.sold_units) != totals.get(symbol, (0, 0))
+                    for symbol, book in books.items()
+                ) or any(symbol not in books for symbol in totals)
+                if replay and last_id is not None:
+                    print(f"Lot books for user {user_id} are behind the ledger; replaying")
+            
+            if replay:
+                books = {}
+                rows = await self.lot_repo.get_transactions(user_id, after_id=0, date_order=True)
+                for row in rows:
+                    apply_transaction(books, row)
+                touched = set(books)
+            
+            new_last_id = max([last_id or 0] + [row['transaction_id'] for row in rows])
+            if rows or replay or last_id is None:
+                # Another request may have advanced the books meanwhile; theirs win
+                await self.lot_repo.save(
+                    user_id, {symbol: books[symbol] for symbol in touched},
+                    expected_last_id=last_id, last_id=new_last_id, replace=replay
+                )
+            return books, new_last_id
+
+def _money(cents: float) -> float:
+    return round(cents / 100, 2)
+
+def lot_report(user_id: int, books: Dict[str, LotBook], last_id: int,
+               prices: Mapping[str, float], include_lots: bool = False) -> Dict:
+    holdings: List[Dict] = []
+    totals = {'realized': 0, 'unrealized': 0.0, 'cost': 0, 'value': 0.0}
+    for symbol in sorted(books):
+        book = books[symbol]
+        open_units = book.open_units
+        if not open_units and not book.realized_cents and not book.unmatched_units:
+            continue
+        cost_cents = book.open_cost_cents()
+        price = float(prices.get(symbol, 0.0))
+        value_cents = price * 100 * open_units
+        unrealized_cents = value_cents - cost_cents
+        holding = {
+            'symbol': symbol,
+            'open_units': open_units,
+            'average_cost': _money(cost_cents / open_units) if open_units else 0.0,
+            'cost_basis': _money(cost_cents),
+            'current_price': price,
+            'market_value': _money(value_cents),
+            'unrealized_pl': _money(unrealized_cents),
+            'realized_pl': _money(book.realized_cents),
+            'realized_cost_basis': _money(book.realized_cost_cents),
+            'unmatched_units': book.unmatched_units,
+            'open_lots': None
+        }
+        if include_lots:
+            holding['open_lots'] = [
+                {'transaction_id': lot_id, 'transaction_date': date.fromordinal(day),
+                 'units': units, 'unit_cost': _money(cost)}
+                for lot_id, day, units, cost in book.open_lots()
+            ]
+        holdings.append(holding)
+        totals['realized'] += book.realized_cents
+        totals['unrealized'] += unrealized_cents
+        totals['cost'] += cost_cents
+        totals['value'] += value_cents
+    
+    return {
+        'user_id': user_id,
+        'method': 'FIFO',
+        'as_of_transaction_id': last_id,
+        'realized_pl': _money(totals['realized']),
+        'unrealized_pl': _money(totals['unrealized']),
+        'total_pl': _money(totals['realized'] + totals['unrealized']),
+        'cost_basis': _money(totals['cost']),
+        'market_value': _money(totals['value']),
+        'holdings': holdings
+    }
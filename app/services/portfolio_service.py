@@ -1,83 +1,106 @@
-from typing import Dict
+from typing import Dict, List, Mapping
 from app.repositories.transaction_repository import TransactionRepository
-from app.repositories.price_repository import PriceRepository
+from app.repositories.position_repository import PositionRepository
+from app.repositories.async_position_repository import AsyncPositionRepository
 from app.schemas.portfolio import PortfolioSummaryResponse, HoldingDetail
+from app.config import settings
+from app.services.cache_service import invalidate_cache, invalidate_keys
+from app.services.price_snapshot import price_snapshot
+
+def portfolio_cache_key(user_id: int) -> str:
+    return f"portfolio:{user_id}"
+
+def holdings_from_positions(positions: List[Dict]) -> Dict[str, Dict]:
+    result = {}
+    for position in positions:
+        current_units = position['buy_units'] - position['sell_units']
+        if current_units > 0:
+            avg_cost = float(position['buy_cost']) / float(position['buy_units'])
+            result[position['symbol']] = {
+                'total_units': current_units,
+                'average_cost': round(avg_cost, 2),
+                'cost_basis': round(avg_cost * float(current_units), 2)
+            }
+    
+    return result
+
+def holding_detail(symbol: str, data: Dict, current_price: float) -> HoldingDetail:
+    units = float(data['total_units'])
+    avg_cost = data['average_cost']
+    
+    value = current_price * units
+    pl = (current_price - avg_cost) * units
+    pl_percent = round((pl / data['cost_basis'] * 100), 2) if data['cost_basis'] > 0 else 0.0
+    
+    return HoldingDetail(
+        symbol=symbol,
+        total_units=data['total_units'],
+        average_cost=avg_cost,
+        current_price=current_price,
+        current_value=round(value, 2),
+        unrealized_pl=round(pl, 2),
+        unrealized_pl_percent=pl_percent
+    )
+
+def portfolio_totals(holdings: Dict[str, Dict], prices: Mapping[str, float]) -> Dict[str, float]:
+    total_invested = 0.0
+    current_value = 0.0
+    for symbol, data in holdings.items():
+        total_invested += data['cost_basis']
+        current_value += float(prices.get(symbol, 0.0)) * float(data['total_units'])
+    
+    total_pl = current_value - total_invested
+    total_pl_percent = round((total_pl / total_invested * 100), 2) if total_invested > 0 else 0.0
+    
+    return {
+        'total_invested': round(total_invested, 2),
+        'current_value': round(current_value, 2),
+        'total_pl': round(total_pl, 2),
+        'total_pl_percent': total_pl_percent
+    }
+
+def build_portfolio_summary(user_id: int, holdings: Dict[str, Dict],
+                            prices: Mapping[str, float]) -> PortfolioSummaryResponse:
+    holding_details = [
+        holding_detail(symbol, data, float(prices.get(symbol, 0.0)))
+        for symbol, data in holdings.items()
+    ]
+    return PortfolioSummaryResponse(
+        user_id=user_id,
+        holdings=holding_details,
+        **portfolio_totals(holdings, prices)
+    )
 
 class PortfolioService:
     def __init__(self):
         self.transaction_repo = TransactionRepository()
-        self.price_repo = PriceRepository()
+        self.position_repo = PositionRepository()
     
     def calculate_holdings(self, user_id: int) -> Dict[str, Dict]:
-        transactions = self.transaction_repo.get_by_user(user_id)
-        holdings = {}
-        
-        for txn in transactions:
-            symbol = txn['symbol']
-            if symbol not in holdings:
-                holdings[symbol] = {
-                    'total_buy_units': 0,
-                    'total_buy_cost': 0.0,
-                    'total_sell_units': 0
-                }
-            
-            if txn['transaction_type'] == 'BUY':
-                holdings[symbol]['total_buy_units'] += txn['units']
-                holdings[symbol]['total_buy_cost'] += float(txn['units']) * float(txn['price'])
-            else:
-                holdings[symbol]['total_sell_units'] += txn['units']
-        
-        result = {}
-        for symbol, data in holdings.items():
-            current_units = data['total_buy_units'] - data['total_sell_units']
-            if current_units > 0:
-                avg_cost = data['total_buy_cost'] / float(data['total_buy_units'])
-                result[symbol] = {
-                    'total_units': current_units,
-                    'average_cost': round(avg_cost, 2),
-                    'cost_basis': round(avg_cost * float(current_units), 2)
-                }
-        
-        return result
+        return holdings_from_positions(self.position_repo.get_by_user(user_id))
     
     def get_portfolio_summary(self, user_id: int) -> PortfolioSummaryResponse:
         holdings = self.calculate_holdings(user_id)
-        prices = self.price_repo.get_all()
-        
-        total_invested = 0.0
-        current_value = 0.0
-        holding_details = []
-        
-        for symbol, data in holdings.items():
-            current_price = float(prices.get(symbol, 0.0))
-            units = float(data['total_units'])
-            avg_cost = data['average_cost']
-            
-            value = current_price * units
-            pl = (current_price - avg_cost) * units
-            pl_percent = round((pl / data['cost_basis'] * 100), 2) if data['cost_basis'] > 0 else 0.0
-            
-            total_invested += data['cost_basis']
-            current_value += value
-            
-            holding_details.append(HoldingDetail(
-                symbol=symbol,
-                total_units=data['total_units'],
-                average_cost=avg_cost,
-                current_price=current_price,
-                current_value=round(value, 2),
-                unrealized_pl=round(pl, 2),
-                unrealized_pl_percent=pl_percent
-            ))
-        
-        total_pl = current_value - total_invested
-        total_pl_percent = round((total_pl / total_invested * 100), 2) if total_invested > 0 else 0.0
-        
-        return PortfolioSummaryResponse(
-            user_id=user_id,
-            total_invested=round(total_invested, 2),
-            current_value=round(current_value, 2),
-            total_pl=round(total_pl, 2),
-            total_pl_percent=total_pl_percent,
-            holdings=holding_details
-        )
+        prices = price_snapshot.get(refresh=True).prices
+        return build_portfolio_summary(user_id, holdings, prices)
+    
+    def invalidate_for_symbols(self, symbols: List[str]) -> int:
+        holders = self.position_repo.get_holders(symbols)
+        if len(holders) > settings.cache_bulk_invalidate_threshold:
+            # One INCR of the namespace generation beats thousands of per-user bumps
+            invalidate_cache("portfolio:*")
+        elif holders:
+            invalidate_keys([portfolio_cache_key(user_id) for user_id in holders])
+        return len(holders)
+
+class AsyncPortfolioService:
+    def __init__(self):
+        self.position_repo = AsyncPositionRepository()
+    
+    async def calculate_holdings(self, user_id: int) -> Dict[str, Dict]:
+        return holdings_from_positions(await self.position_repo.get_by_user(user_id))
+    
+    async def get_portfolio_summary(self, user_id: int) -> PortfolioSummaryResponse:
+        holdings = await self.calculate_holdings(user_id)
+        prices = (await price_snapshot.get_async(refresh=True)).prices
+        return build_portfolio_summary(user_id, holdings, prices)
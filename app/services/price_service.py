@@ -0,0 +1,26 @@
+from typing import Dict, List
+from app.repositories.price_repository import PriceRepository
+from app.services.portfolio_service import PortfolioService
+from app.services.price_snapshot import price_snapshot
+
+class PriceService:
+    def __init__(self):
+        self.price_repo = PriceRepository()
+        self.portfolio_service = PortfolioService()
+    
+    def update(self, symbol: str, price: float) -> Dict:
+        result = self.price_repo.update(symbol, price)
+        self._on_prices_written([result])
+        return result
+    
+    def update_many(self, prices: Dict[str, float]) -> List[Dict]:
+        written = self.price_repo.update_many(prices)
+        self._on_prices_written(written)
+        return written
+    
+    def _on_prices_written(self, rows: List[Dict]):
+        changed = {row['symbol']: float(row['current_price']) for row in rows}
+        # Publish the new snapshot before invalidating, so recomputed
+        # summaries are valued at the new prices.
+        price_snapshot.publish(changed)
+        self.portfolio_service.invalidate_for_symbols(list(changed))
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
+from app.config import settings
+from app.repositories.price_repository import PriceRepository
+from app.repositories.async_price_repository import AsyncPriceRepository
+from app.services.cache_service import get_version, next_version, publish, subscribe
+from app.services import async_cache_service
+
+PRICES_CHANNEL = "prices:updated"
+
+class PriceSnapshot:
+    __slots__ = ('version', 'prices')
+    
+    def __init__(self, version: Optional[int], prices: Mapping[str, float]):
+        self.version = version
+        self.prices = MappingProxyType(dict(prices))
+    
+    def get(self, symbol: str, default: Optional[float] = None) -> Optional[float]:
+        return self.prices.get(symbol, default)
+    
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.prices
+
+# Per-worker, immutable view of the prices table. Writers swap in a new
+# snapshot and publish the delta; other workers apply it if it's the next
+# version, and otherwise reload from the database on their next read. The
+# shared version counter in Redis is checked at most once per
+# PRICE_SNAPSHOT_CHECK_INTERVAL seconds.
+class PriceSnapshotStore:
+    def __init__(self, check_interval: float):
+        self.check_interval = check_interval
+        self.price_repo = PriceRepository()
+        self.async_price_repo = AsyncPriceRepository()
+        self._snapshot: Optional[PriceSnapshot] = None
+        self._checked_at = 0.0
+        self._reload_lock = threading.Lock()
+        self._async_reload_lock: Optional[asyncio.Lock] = None
+    
+    def get(self, refresh: bool = False) -> PriceSnapshot:
+        # refresh=True always checks the shared version, for callers about to
+        # cache something derived from the snapshot.
+        snapshot = self._snapshot
+        if not refresh and snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+        
+        with self._reload_lock:
+            snapshot = self._snapshot
+            if not refresh and snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return snapshot
+            version = get_version("prices")
+            if snapshot is None or version is None or version != snapshot.version:
+                snapshot = self._snapshot = PriceSnapshot(version, self.price_repo.get_all())
+            self._checked_at = time.monotonic()
+            return snapshot
+    
+    async def get_async(self, refresh: bool = False) -> PriceSnapshot:
+        # Same contract as get(), without blocking the event loop. The asyncio
+        # lock coalesces reloads per loop; the swap itself takes the thread lock.
+        snapshot = self._snapshot
+        if not refresh and snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return snapshot
+        
+        if self._async_reload_lock is None:
+            self._async_reload_lock = asyncio.Lock()
+        async with self._async_reload_lock:
+            snapshot = self._snapshot
+            if not refresh and snapshot is not None and time.monotonic() - self._checked_at < self.check_interval:
+                return snapshot
+            version = await async_cache_service.get_version("prices")
+            if snapshot is None or version is None or version != snapshot.version:
+                loaded = PriceSnapshot(version, await self.async_price_repo.get_all())
+                with self._reload_lock:
+                    snapshot = self._snapshot = loaded
+            self._checked_at = time.monotonic()
+            return snapshot
+    
+    def publish(self, changed: Dict[str, float]):
+        if not changed:
+            return
+        changed = {symbol: float(price) for symbol, price in changed.items()}
+        version = next_version("prices")
+        self._apply(version, changed)
+        publish(PRICES_CHANNEL, {'version': version, 'prices': changed})
+    
+    def _apply(self, version: Optional[int], changed: Dict[str, float]):
+        with self._reload_lock:
+            current = self._snapshot
+            if current is None:
+                return
+            if version is not None and current.version is not None and version != current.version + 1:
+                if version > current.version:
+                    self.mark_stale()
+                return
+            self._snapshot = PriceSnapshot(version, {**current.prices, **changed})
+    
+    def on_message(self, message: Dict):
+        self._apply(message['version'], message['prices'])
+    
+    def mark_stale(self):
+        self._checked_at = 0.0
+
+price_snapshot = PriceSnapshotStore(settings.price_snapshot_check_interval)
+subscribe(PRICES_CHANNEL, price_snapshot.on_message, on_reset=price_snapshot.mark_stale)
@@ -0,0 +1,175 @@
+from datetime import date, datetime, time as dt_time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.repositories.transaction_repository import TransactionRepository
+from app.repositories.position_repository import PositionRepository
+from app.schemas.portfolio import PortfolioReturnsResponse
+from app.services.cache_service import get_cache, set_cache, get_generation
+from app.services.history_service import PortfolioHistoryService, utc_now
+from app.services.portfolio_service import portfolio_cache_key
+from app.services.price_snapshot import price_snapshot
+
+DAYS_PER_YEAR = 365.0
+MIN_RATE = -0.999999
+
+def npv(amounts: np.ndarray, years: np.ndarray, rates: np.ndarray) -> np.ndarray:
+    return (amounts * (1.0 + rates[:, None]) ** -years).sum(axis=1)
+
+def xirr(amounts: np.ndarray, years: np.ndarray, guess: float = 0.1,
+         tol: float = 1e-9, max_iter: int = 50, bisect_iter: int = 200) -> np.ndarray:
+    # amounts/years are (users, flows) arrays padded with zero amounts. Solves
+    # all rows with Newton at once, then bisects the rows Newton left behind.
+    # Rows without a sign change in their cash flows have no IRR and get NaN.
+    users = amounts.shape[0]
+    rates = np.full(users, guess)
+    solvable = (amounts > 0).any(axis=1) & (amounts < 0).any(axis=1)
+    rates[~solvable] = np.nan
+    active = solvable.copy()
+    # A row whose first Newton step already failed still holds the guess,
+    # which says nothing about its NPV; it must go to bisection
+    moved = np.zeros(users, dtype=bool)
+    
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        for _ in range(max_iter):
+            idx = np.flatnonzero(active)
+            if idx.size == 0:
+                break
+            a, t, r = amounts[idx], years[idx], rates[idx]
+            base = 1.0 + r[:, None]
+            discounted = a * base ** -t
+            step = discounted.sum(axis=1) / (-t * discounted / base).sum(axis=1)
+            ok = np.isfinite(step)
+            new_rates = np.where(ok, np.maximum(r - step, MIN_RATE), r)
+            rates[idx] = new_rates
+            moved[idx] |= ok
+            # Rows whose derivative vanished or overflowed are left to bisection
+            active[idx[~ok | (np.abs(step) <= tol * np.maximum(1.0, np.abs(new_rates)))]] = False
+    
+    with np.errstate(over='ignore', divide='ignore', invalid='ignore'):
+        residual = np.abs(npv(amounts, years, rates))
+    scale = np.maximum(np.abs(amounts).sum(axis=1), 1.0)
+    unsolved = solvable & (~moved | ~np.isfinite(rates) | ~(residual <= 1e-6 * scale))
+    
+    idx = np.flatnonzero(unsolved)
+    if idx.size:
+        a, t = amounts[idx], years[idx]
+        lo = np.full(idx.size, MIN_RATE)
+        hi = np.full(idx.size, 100.0)
+        with np.errstate(over='ignore', invalid='ignore'):
+            f_lo = npv(a, t, lo)
+            f_hi = npv(a, t, hi)
+            bracketed = np.sign(f_lo) != np.sign(f_hi)
+            for _ in range(bisect_iter):
+                mid = (lo + hi) / 2.0
+                f_mid = npv(a, t, mid)
+                left = np.sign(f_mid) == np.sign(f_lo)
+                lo = np.where(left, mid, lo)
+                f_lo = np.where(left, f_mid, f_lo)
+                hi = np.where(left, hi, mid)
+        rates[idx] = np.where(bracketed, (lo + hi) / 2.0, np.nan)
+    
+    return rates
+
+def time_weighted_return(values: np.ndarray, inflows: np.ndarray) -> np.ndarray:
+    # values[u, t] is the end-of-period value including that period's
+    # external inflow inflows[u, t]; periods are chain-linked.
+    previous = values[:, :-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where(previous > 0, (values[:, 1:] - inflows[:, 1:]) / previous, 1.0)
+    return np.prod(growth, axis=1) - 1.0
+
+def pad_cash_flows(flows_by_user: List[List[Tuple[date, float]]]) -> Tuple[np.ndarray, np.ndarray]:
+    width = max((len(flows) for flows in flows_by_user), default=0)
+    amounts = np.zeros((len(flows_by_user), width))
+    years = np.zeros((len(flows_by_user), width))
+    for row, flows in enumerate(flows_by_user):
+        if not flows:
+            continue
+        start = flows[0][0]
+        amounts[row, :len(flows)] = [amount for _, amount in flows]
+        years[row, :len(flows)] = [(day - start).days / DAYS_PER_YEAR for day, _ in flows]
+    return amounts, years
+
+def _percent(value: float) -> Optional[float]:
+    return round(float(value) * 100, 2) if np.isfinite(value) else None
+
+class ReturnsService:
+    def __init__(self):
+        self.transaction_repo = TransactionRepository()
+        self.position_repo = PositionRepository()
+        self.history_service = PortfolioHistoryService()
+    
+    def get_xirr_batch(self, user_ids: List[int], as_of: Optional[date] = None) -> Dict[int, Optional[float]]:
+        as_of = as_of or date.today()
+        prices = price_snapshot.get(refresh=True).prices
+        
+        market_values = {user_id: 0.0 for user_id in user_ids}
+        for position in self.position_repo.get_by_users(user_ids):
+            units = position['buy_units'] - position['sell_units']
+            market_values[position['user_id']] += units * prices.get(position['symbol'], 0.0)
+        
+        flows_by_user = {user_id: [] for user_id in user_ids}
+        for row in self.transaction_repo.get_net_cash_flows(user_ids):
+            flows_by_user[row['user_id']].append((row['transaction_date'], float(row['amount'])))
+        for user_id, flows in flows_by_user.items():
+            if flows:
+                flows.append((as_of, market_values[user_id]))
+        
+        amounts, years = pad_cash_flows([flows_by_user[user_id] for user_id in user_ids])
+        rates = xirr(amounts, years) if amounts.size else np.full(len(user_ids), np.nan)
+        return {
+            user_id: (float(rate) if np.isfinite(rate) else None)
+            for user_id, rate in zip(user_ids, rates)
+        }
+    
+    def get_returns(self, user_id: int) -> PortfolioReturnsResponse:
+        today = date.today()
+        snapshot = price_snapshot.get(refresh=True)
+        generation = get_generation(portfolio_cache_key(user_id))
+        # Memoized per (ledger generation, price version, as-of date): results
+        # run up to today, so a quiet day must not serve yesterday's
+        memo_key = (f"returns:{user_id}:{generation[0]}.{generation[1]}:{snapshot.version}:{today.isoformat()}"
+                    if generation else None)
+        if memo_key:
+            cached = get_cache(memo_key)
+            if cached:
+                return PortfolioReturnsResponse(**cached)
+        
+        result = self._compute_returns(user_id, today)
+        if memo_key:
+            set_cache(memo_key, result.model_dump())
+        return result
+    
+    def _compute_returns(self, user_id: int, today: date) -> PortfolioReturnsResponse:
+        flows = self.transaction_repo.get_daily_flows(user_id, today)
+        if not flows:
+            return PortfolioReturnsResponse(user_id=user_id, start_date=None, as_of=today,
+                                            xirr_percent=None, twr_percent=None)
+        
+        start_date = flows[0]['transaction_date']
+        xirr_rate = self.get_xirr_batch([user_id], today)[user_id]
+        
+        # TWR over a daily grid (downsampled for long histories), ending now
+        grid, _ = self.history_service.build_grid(
+            datetime.combine(start_date, dt_time.min), utc_now(), 86400
+        )
+        symbols = sorted({row['symbol'] for row in flows})
+        units, _ = self.history_service.holdings_matrix(flows, symbols, grid)
+        values = (units * self.history_service.price_matrix(symbols, grid)).sum(axis=0)
+        
+        inflows = np.zeros(len(grid))
+        columns = np.searchsorted(grid, np.array([row['transaction_date'] for row in flows], dtype='datetime64[s]'))
+        in_range = columns < len(grid)
+        np.add.at(
+            inflows, columns[in_range],
+            np.array([float(row['buy_cost']) - float(row['sell_proceeds']) for row in flows])[in_range]
+        )
+        twr = time_weighted_return(values[None, :], inflows[None, :])[0] if len(grid) > 1 else np.nan
+        
+        return PortfolioReturnsResponse(
+            user_id=user_id,
+            start_date=start_date,
+            as_of=today,
+            xirr_percent=_percent(xirr_rate) if xirr_rate is not None else None,
+            twr_percent=_percent(twr)
+        )
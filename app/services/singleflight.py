@@ -0,0 +1,88 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict
+from app.services import async_cache_service
+
+_flights: Dict[str, Any] = {}
+
+# Collapses concurrent cache-miss computations for the same key: in-process
+# callers share the leader's Future, other workers wait on a short Redis lock
+# and poll `fetch` until the leader has filled the cache.
+class AsyncSingleFlight:
+    def __init__(self, name: str, lock_ttl_ms: int = 5000, wait_timeout: float = 5.0,
+                 poll_interval: float = 0.02):
+        self.name = name
+        self.lock_ttl_ms = lock_ttl_ms
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._calls: Dict[str, asyncio.Future] = {}
+        self._stats = {
+            'leader_computations': 0,
+            'coalesced_local_waits': 0,
+            'coalesced_remote_waits': 0,
+            'remote_wait_timeouts': 0
+        }
+        _flights[name] = self
+    
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+    
+    async def do(self, key: str, compute: Callable[[], Awaitable[Any]],
+                 fetch: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is not None:
+            self._stats['coalesced_local_waits'] += 1
+            try:
+                return await asyncio.wait_for(asyncio.shield(call), self.wait_timeout)
+            except asyncio.TimeoutError:
+                return await compute()
+            except asyncio.CancelledError:
+                # The leader was cancelled (client went away), not this waiter
+                if not call.cancelled():
+                    raise
+                return await compute()
+        
+        call = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await self._do_across_workers(key, compute, fetch)
+            call.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except Exception as e:
+            call.set_exception(e)
+            # Mark retrieved so a leader failure with no waiters isn't logged
+            call.exception()
+            raise
+        finally:
+            self._calls.pop(key, None)
+    
+    async def _do_across_workers(self, key: str, compute: Callable[[], Awaitable[Any]],
+                                 fetch: Callable[[], Awaitable[Any]]) -> Any:
+        lock_name = f"singleflight:{self.name}:{key}"
+        token = await async_cache_service.acquire_lock(lock_name, self.lock_ttl_ms)
+        
+        if token is None:
+            deadline = time.monotonic() + self.wait_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(self.poll_interval)
+                value = await fetch()
+                if value is not None:
+                    self._stats['coalesced_remote_waits'] += 1
+                    return value
+                if not await async_cache_service.lock_exists(lock_name):
+                    break
+            else:
+                self._stats['remote_wait_timeouts'] += 1
+            token = await async_cache_service.acquire_lock(lock_name, self.lock_ttl_ms)
+        
+        try:
+            self._stats['leader_computations'] += 1
+            return await compute()
+        finally:
+            if token:
+                await async_cache_service.release_lock(lock_name, token)
+
+def stats() -> Dict[str, Dict[str, int]]:
+    return {name: flight.stats() for name, flight in _flights.items()}
@@ -1,43 +1,167 @@
 from datetime import date
-from app.repositories.transaction_repository import TransactionRepository
-from app.repositories.user_repository import UserRepository
-from app.repositories.price_repository import PriceRepository
-from app.services.portfolio_service import PortfolioService
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+from pydantic import ValidationError
+from app.config import settings
+from app.async_database import async_unit_of_work
+from app.repositories.async_transaction_repository import AsyncTransactionRepository
+from app.repositories.async_user_repository import AsyncUserRepository
+from app.repositories.async_price_repository import AsyncPriceRepository
+from app.repositories.async_position_repository import AsyncPositionRepository
+from app.repositories.async_lot_repository import AsyncLotRepository
+from app.repositories.position_repository import position_delta
+from app.schemas.transaction import TransactionCreate
+from app.services.price_snapshot import price_snapshot
 from app.utils.exceptions import (
     UserNotFoundException, InsufficientHoldingsException,
-    InvalidSymbolException, FutureDateException
+    InvalidSymbolException, FutureDateException, InvalidLotSelectionException
 )
+from app.utils.bulk_import import ParsedRow
 
-class TransactionService:
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc'])}: {item['msg']}" if item['loc'] else item['msg']
+        for item in error.errors()
+    )
+
+class AsyncTransactionService:
     def __init__(self):
-        self.transaction_repo = TransactionRepository()
-        self.user_repo = UserRepository()
-        self.price_repo = PriceRepository()
-        self.portfolio_service = PortfolioService()
+        self.transaction_repo = AsyncTransactionRepository()
+        self.user_repo = AsyncUserRepository()
+        self.price_repo = AsyncPriceRepository()
+        self.position_repo = AsyncPositionRepository()
+        self.lot_repo = AsyncLotRepository()
+    
+    async def create_transaction(self, user_id: int, symbol: str, transaction_type: str,
+                                 units: int, price: float, transaction_date: date,
+                                 lots: Optional[List[Tuple[int, int]]] = None):
+        async with async_unit_of_work():
+            return await self._create_transaction(
+                user_id, symbol, transaction_type, units, price, transaction_date, lots
+            )
     
-    def create_transaction(self, user_id: int, symbol: str, transaction_type: str,
-                          units: int, price: float, transaction_date: date):
-        user = self.user_repo.get_by_id(user_id)
+    async def _create_transaction(self, user_id: int, symbol: str, transaction_type: str,
+                                  units: int, price: float, transaction_date: date,
+                                  lots: Optional[List[Tuple[int, int]]] = None):
+        user = await self.user_repo.get_by_id(user_id)
         if not user:
             raise UserNotFoundException(f"User {user_id} not found")
         
         symbol = symbol.upper()
-        symbol_price = self.price_repo.get_by_symbol(symbol)
-        if not symbol_price:
+        snapshot = await price_snapshot.get_async()
+        if symbol not in snapshot and not await self.price_repo.get_by_symbol(symbol):
             raise InvalidSymbolException(f"Symbol {symbol} not found")
         
         if transaction_date > date.today():
             raise FutureDateException("Transaction date cannot be in the future")
         
         if transaction_type == 'SELL':
-            holdings = self.portfolio_service.calculate_holdings(user_id)
-            current_units = holdings.get(symbol, {}).get('total_units', 0)
+            position = await self.position_repo.get_by_user_and_symbol(
+                user_id, symbol, for_update=settings.atomic_sells
+            )
+            current_units = position['buy_units'] - position['sell_units'] if position else 0
             
             if current_units < units:
                 raise InsufficientHoldingsException(
                     f"Insufficient holdings for {symbol}. Available: {current_units}, Requested: {units}"
                 )
         
-        return self.transaction_repo.create(
-            user_id, symbol, transaction_type, units, price, transaction_date
+        if lots:
+            # Selected lots must be this user's BUYs of the symbol; units the
+            # lot no longer has open fall back to FIFO when lots are matched
+            requested = [buy_id for buy_id, _ in lots]
+            found = set(await self.lot_repo.get_buy_lot_ids(user_id, symbol, requested))
+            unknown = [buy_id for buy_id in requested if buy_id not in found]
+            if unknown:
+                raise InvalidLotSelectionException(
+                    f"Transactions {', '.join(map(str, unknown))} are not BUY lots of {symbol} for user {user_id}"
+                )
+        
+        return await self.transaction_repo.create(
+            user_id, symbol, transaction_type, units, price, transaction_date, lots
         )
+    
+    async def import_transactions(self, rows: List[ParsedRow], user_id: Optional[int] = None,
+                                  skip_invalid: bool = False) -> Dict:
+        # Validates the whole upload in one pass: field checks per row, then one
+        # lookup each for users, unknown symbols and current balances, then
+        # SELLs against running balances in date order. Nothing is written if
+        # any row fails, unless skip_invalid is set.
+        errors: List[Tuple[int, str]] = []
+        parsed: List[Tuple[int, TransactionCreate]] = []
+        for number, fields, error in rows:
+            if error is None:
+                if user_id is not None and fields.get('user_id') in (None, ''):
+                    fields['user_id'] = user_id
+                if isinstance(fields.get('transaction_type'), str):
+                    fields['transaction_type'] = fields['transaction_type'].upper()
+                try:
+                    transaction = TransactionCreate(**fields)
+                except ValidationError as e:
+                    error = _validation_message(e)
+                else:
+                    if user_id is not None and transaction.user_id != user_id:
+                        error = f"user_id {transaction.user_id} does not match the import user {user_id}"
+                    else:
+                        parsed.append((number, transaction))
+            if error is not None:
+                errors.append((number, error))
+        
+        # Ledger order: by date, then upload order within a day
+        parsed.sort(key=lambda item: (item[1].transaction_date, item[0]))
+        
+        inserted = 0
+        accepted_users = set()
+        async with async_unit_of_work():
+            user_ids = sorted({transaction.user_id for _, transaction in parsed})
+            existing_users = await self.user_repo.get_existing_ids(user_ids) if user_ids else set()
+            snapshot = await price_snapshot.get_async()
+            unknown = sorted({transaction.symbol for _, transaction in parsed if transaction.symbol not in snapshot})
+            # Fall back to the database for symbols this worker hasn't seen yet
+            known = await self.price_repo.get_existing_symbols(unknown) if unknown else set()
+            sold = sorted({(transaction.user_id, transaction.symbol) for _, transaction in parsed
+                           if transaction.transaction_type == 'SELL'})
+            balances = await self.position_repo.get_balances(sold, for_update=settings.atomic_sells)
+            
+            records = []
+            deltas: Dict[Tuple[int, str], Dict] = {}
+            for number, transaction in parsed:
+                owner, symbol, units = transaction.user_id, transaction.symbol, transaction.units
+                if owner not in existing_users:
+                    errors.append((number, f"User {owner} not found"))
+                    continue
+                if symbol not in snapshot and symbol not in known:
+                    errors.append((number, f"Symbol {symbol} not found"))
+                    continue
+                key = (owner, symbol)
+                balance = balances.get(key, 0)
+                is_buy = transaction.transaction_type == 'BUY'
+                if not is_buy and balance < units:
+                    errors.append((number, f"Insufficient holdings for {symbol}. Available: {balance}, Requested: {units}"))
+                    continue
+                balances[key] = balance + units if is_buy else balance - units
+                
+                price = Decimal(str(transaction.price))
+                delta = deltas.get(key)
+                if delta is None:
+                    delta = deltas[key] = position_delta(owner, symbol, 'BUY', 0, 0)
+                if is_buy:
+                    delta['buy_units'] += units
+                    delta['buy_cost'] += price * units
+                else:
+                    delta['sell_units'] += units
+                records.append((owner, symbol, transaction.transaction_type, units, price, transaction.transaction_date))
+            
+            if records and (skip_invalid or not errors):
+                inserted = await self.transaction_repo.copy_many(records)
+                await self.position_repo.apply_deltas(list(deltas.values()))
+                accepted_users = {key[0] for key in deltas}
+        
+        errors.sort()
+        return {
+            'received': len(rows),
+            'inserted': inserted,
+            'error_count': len(errors),
+            'errors': [{'row': number, 'error': error} for number, error in errors[:settings.bulk_import_max_errors]],
+            'user_ids': sorted(accepted_users)
+        }
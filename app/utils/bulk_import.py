@@ -0,0 +1,77 @@
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from app.utils.exceptions import InvalidImportException, ImportTooLargeException
+
+IMPORT_FIELDS = ('user_id', 'symbol', 'transaction_type', 'units', 'price', 'transaction_date')
+
+# (row number, fields, parse error); row numbers count data records from 1
+ParsedRow = Tuple[int, Optional[Dict], Optional[str]]
+
+async def _line_batches(chunks: AsyncIterator[bytes]) -> AsyncIterator[List[str]]:
+    # Decodes the upload incrementally and yields the complete lines of each
+    # chunk, so the raw body is never held in memory as a whole
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    pending = ''
+    try:
+        async for chunk in chunks:
+            pending += decoder.decode(chunk)
+            lines = pending.split('\n')
+            pending = lines.pop()
+            if lines:
+                yield lines
+        pending += decoder.decode(b'', final=True)
+    except UnicodeDecodeError as e:
+        raise InvalidImportException(f"Upload is not valid UTF-8: {e}") from e
+    if pending:
+        yield [pending]
+
+def _check_size(rows: List[ParsedRow], max_rows: int):
+    if len(rows) > max_rows:
+        raise ImportTooLargeException(f"Import is limited to {max_rows} rows")
+
+async def parse_csv(chunks: AsyncIterator[bytes], max_rows: int) -> List[ParsedRow]:
+    # One record per line; a header row names the columns (any order, extra
+    # columns ignored, user_id optional when given for the whole upload)
+    rows: List[ParsedRow] = []
+    header = None
+    async for lines in _line_batches(chunks):
+        for record in csv.reader(line.rstrip('\r') for line in lines):
+            if not record or not any(value.strip() for value in record):
+                continue
+            if header is None:
+                header = [name.strip().lower() for name in record]
+                missing = [name for name in IMPORT_FIELDS[1:] if name not in header]
+                if missing:
+                    raise InvalidImportException(f"CSV header is missing columns: {', '.join(missing)}")
+                continue
+            number = len(rows) + 1
+            if len(record) != len(header):
+                rows.append((number, None, f"Expected {len(header)} columns, got {len(record)}"))
+            else:
+                fields = {name: value.strip() for name, value in zip(header, record) if name in IMPORT_FIELDS}
+                rows.append((number, fields, None))
+        _check_size(rows, max_rows)
+    if header is None:
+        raise InvalidImportException("CSV upload is empty")
+    return rows
+
+async def parse_ndjson(chunks: AsyncIterator[bytes], max_rows: int) -> List[ParsedRow]:
+    rows: List[ParsedRow] = []
+    async for lines in _line_batches(chunks):
+        for line in lines:
+            if not line.strip():
+                continue
+            number = len(rows) + 1
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                rows.append((number, None, f"Invalid JSON: {e}"))
+                continue
+            if not isinstance(record, dict):
+                rows.append((number, None, "Expected a JSON object"))
+                continue
+            rows.append((number, {name: record[name] for name in IMPORT_FIELDS if name in record}, None))
+        _check_size(rows, max_rows)
+    return rows
@@ -15,3 +15,33 @@ class FutureDateException(Exception):
 
 class AuthenticationException(Exception):
     pass
+
+class InvalidHistoryRangeException(Exception):
+    pass
+
+class PoolTimeoutException(Exception):
+    pass
+
+class InvalidCursorException(Exception):
+    pass
+
+class InvalidImportException(Exception):
+    pass
+
+class ImportTooLargeException(Exception):
+    pass
+
+class AuthBusyException(Exception):
+    pass
+
+class InvalidLotSelectionException(Exception):
+    pass
+
+class ReadOnlyUnitOfWorkException(Exception):
+    pass
+
+class NotLeaderException(Exception):
+    pass
+
+class PriceUpdateFailedException(Exception):
+    pass
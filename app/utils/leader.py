@@ -0,0 +1,102 @@
+import threading
+import time
+import psycopg2
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from app.config import settings
+
+# Leadership is a session-level Postgres advisory lock held on a dedicated
+# connection (never a pooled one). The holder stays leader until it resigns
+# or its session ends, at which point the server frees the lock for the
+# next candidate. TCP keepalives bound how long a dead leader's lock lingers.
+class LeaderElection:
+    def __init__(self, name: str, lock_key: int):
+        self.name = name
+        self.lock_key = lock_key
+        self._conn = None
+        self._lock = threading.Lock()
+        self._leader_since: Optional[float] = None
+        self._stats = {'elections_won': 0, 'leadership_lost': 0, 'errors': 0}
+    
+    @property
+    def is_leader(self) -> bool:
+        return self._leader_since is not None
+    
+    def _connect(self):
+        conn = psycopg2.connect(
+            host=settings.db_host,
+            port=settings.db_port,
+            database=settings.db_name,
+            user=settings.db_user,
+            password=settings.db_password,
+            application_name=f"wealthwise-{self.name}-leader",
+            connect_timeout=5,
+            keepalives=1,
+            keepalives_idle=10,
+            keepalives_interval=5,
+            keepalives_count=3
+        )
+        conn.autocommit = True
+        return conn
+    
+    def campaign(self) -> bool:
+        # Takes the lock if it is free, or confirms it is still held: a session
+        # lock can only be lost with the session, so a live connection is proof.
+        with self._lock:
+            try:
+                if self._conn is None or self._conn.closed:
+                    # A new session never holds the old session's lock
+                    self._step_down()
+                    self._conn = self._connect()
+                with self._conn.cursor() as cursor:
+                    if self._leader_since is None:
+                        cursor.execute("SELECT pg_try_advisory_lock(%s)", (self.lock_key,))
+                    else:
+                        cursor.execute("SELECT TRUE")
+                    held = cursor.fetchone()[0]
+            except psycopg2.Error as e:
+                print(f"Leader election ({self.name}) error: {e}")
+                self._stats['errors'] += 1
+                self._close()
+                held = False
+            
+            if held and self._leader_since is None:
+                self._leader_since = time.time()
+                self._stats['elections_won'] += 1
+                print(f"This process is now the {self.name} leader")
+            elif not held:
+                self._step_down()
+            return held
+    
+    def _step_down(self):
+        if self._leader_since is not None:
+            self._leader_since = None
+            self._stats['leadership_lost'] += 1
+            print(f"This process lost {self.name} leadership")
+    
+    def _close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except psycopg2.Error:
+                pass
+        self._conn = None
+    
+    def resign(self):
+        with self._lock:
+            if self._conn is not None and self._leader_since is not None:
+                try:
+                    with self._conn.cursor() as cursor:
+                        cursor.execute("SELECT pg_advisory_unlock(%s)", (self.lock_key,))
+                except psycopg2.Error:
+                    pass
+            self._leader_since = None
+            self._close()
+    
+    def stats(self) -> Dict[str, Any]:
+        leader_since = self._leader_since
+        return {
+            **self._stats,
+            'is_leader': leader_since is not None,
+            'leader_since': datetime.fromtimestamp(leader_since, timezone.utc).isoformat() if leader_since else None
+        }
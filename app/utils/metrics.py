@@ -0,0 +1,189 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Minimal in-process metrics registry rendered in the Prometheus text format.
+# Updates are a dict lookup and a few integer adds under an uncontended lock,
+# so they are cheap enough for every request and every SQL statement.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: List["_Metric"] = []
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+    
+    def samples(self) -> Iterable[str]:
+        return []
+    
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(_Metric):
+    kind = "counter"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+    
+    def inc(self, *labelvalues: str, amount: float = 1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+    
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}" for labels, value in values]
+
+class Histogram(_Metric):
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: one non-cumulative count per bucket plus +Inf, then the sum
+        self._children: Dict[Tuple[str, ...], list] = {}
+    
+    def observe(self, value: float, *labelvalues: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            child = self._children.get(labelvalues)
+            if child is None:
+                child = self._children[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0]
+            child[index] += 1
+            child[-1] += value
+    
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            children = [(labels, list(child)) for labels, child in self._children.items()]
+        lines = []
+        for labels, child in children:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), child):
+                cumulative += count
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(child[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+class CallbackMetric(_Metric):
+    # Read at scrape time from an existing stats source, for values that are
+    # already tracked elsewhere (pool sizes, cache counters, ...).
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 collect: Callable[[], Iterable[Tuple[Sequence[str], float]]], kind: str = "gauge"):
+        super().__init__(name, documentation, labelnames)
+        self.kind = kind
+        self.collect = collect
+    
+    def samples(self) -> Iterable[str]:
+        try:
+            values = list(self.collect())
+        except Exception as e:
+            print(f"Metrics collect error for {self.name}: {e}")
+            return []
+        return [f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+                for labels, value in values if value is not None]
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+_VALUES_LIST = re.compile(r'(\bVALUES\b).*', re.IGNORECASE | re.DOTALL)
+
+@lru_cache(maxsize=1024)
+def _statement_label(query: str) -> str:
+    return " ".join(query.split())[:200]
+
+def statement_label(query) -> str:
+    # Bytes come pre-rendered from psycopg2.extras helpers with the values
+    # inlined, so keep them only up to VALUES to bound the label set.
+    if isinstance(query, bytes):
+        return " ".join(_VALUES_LIST.sub(r'\1 ...', query[:2000].decode(errors='replace')).split())[:200]
+    if not isinstance(query, str):
+        return _statement_label(str(query))
+    return _statement_label(query)
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time from request start to response headers, by route template",
+    ("method", "route")
+)
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP responses by route template and status", ("method", "route", "status"))
+DB_QUERY_DURATION = Histogram("db_query_duration_seconds", "SQL statement execution time", ("driver", "statement"))
+DB_POOL_WAIT = Histogram("db_pool_wait_seconds", "Time spent waiting for a pooled connection", ("pool",))
+DB_READ_ROUTES = Counter("db_read_routes_total", "Read-only connections by driver and target when replicas are configured", ("driver", "target"))
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by tier and result", ("tier", "result"))
+CACHE_ERRORS = Counter("cache_errors_total", "Redis errors by cache operation", ("operation",))
+SCHEDULER_TICK_DURATION = Histogram(
+    "scheduler_tick_duration_seconds",
+    "Duration of price update ticks run by this process",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+)
+CACHE_WARM_DURATION = Histogram(
+    "cache_warm_duration_seconds",
+    "Duration of post-tick portfolio cache warming runs",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+)
+
+class MetricsMiddleware:
+    # Plain ASGI middleware (no BaseHTTPMiddleware task/stream overhead). The
+    # route template is read from the scope once routing has happened, and
+    # latency is taken at response start so long-lived streams stay sane.
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        recorded = False
+        
+        async def send_with_metrics(message):
+            nonlocal recorded
+            if not recorded and message["type"] == "http.response.start":
+                recorded = True
+                _record_request(scope, message["status"], time.perf_counter() - started)
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            if not recorded:
+                _record_request(scope, 500, time.perf_counter() - started)
+
+def _record_request(scope, status: int, elapsed: float):
+    route = scope.get("route")
+    template = getattr(route, "path", None) or "unmatched"
+    method = scope["method"]
+    HTTP_REQUEST_DURATION.observe(elapsed, method, template)
+    HTTP_REQUESTS.inc(method, template, str(status))
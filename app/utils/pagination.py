@@ -0,0 +1,19 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Tuple
+from app.utils.exceptions import InvalidCursorException
+
+# Opaque keyset cursors: the sort key of the last row on a page, as
+# base64url-encoded JSON. Clients pass them back verbatim.
+def encode_transaction_cursor(row: dict) -> str:
+    key = [row['transaction_date'].isoformat(), row['created_at'].isoformat(), row['transaction_id']]
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_transaction_cursor(cursor: str) -> Tuple[date, datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        transaction_date, created_at, transaction_id = json.loads(raw)
+        return date.fromisoformat(transaction_date), datetime.fromisoformat(created_at), int(transaction_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorException(f"Invalid cursor: {cursor}") from e
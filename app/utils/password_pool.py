@@ -0,0 +1,102 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+import bcrypt
+from app.utils.exceptions import AuthBusyException
+
+# Runs in the worker processes; keep this module's imports light, since
+# spawned workers import it to unpickle these functions
+def _hash(password: bytes) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt())
+
+def _check(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+# bcrypt on a small dedicated process pool, so a login burst burns those
+# cores instead of the GIL and threadpool that serve every other request.
+# Admission is bounded: beyond workers + max_queue outstanding calls, or
+# after waiting `timeout`, callers get AuthBusyException (503) at once
+# rather than queueing without limit. A call only stops counting once its
+# worker is done with it, so timed-out work still holds its slot.
+class PasswordPool:
+    def __init__(self, workers: int, max_queue: int, timeout: float):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._stats = {'completed': 0, 'rejected': 0, 'timeouts': 0, 'max_queue_depth': 0}
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: forking a worker that runs threads (scheduler, pub/sub) is unsafe
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+    
+    def _release(self, future: Future):
+        with self._lock:
+            self._outstanding -= 1
+            if not future.cancelled():
+                self._stats['completed'] += 1
+    
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self._outstanding >= self.workers + self.max_queue:
+                self._stats['rejected'] += 1
+                raise AuthBusyException("Authentication is busy, retry shortly")
+            self._outstanding += 1
+            self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self._outstanding - self.workers)
+        
+        executor = self._get_executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            with self._lock:
+                self._outstanding -= 1
+            self._discard(executor)
+            raise AuthBusyException("Authentication workers restarted, retry shortly")
+        future.add_done_callback(self._release)
+        
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise AuthBusyException("Authentication timed out, retry shortly")
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start a fresh pool on the next call
+            self._discard(executor)
+            raise AuthBusyException("Authentication workers restarted, retry shortly")
+    
+    def _discard(self, executor: ProcessPoolExecutor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    async def hash(self, password: str) -> str:
+        return (await self._run(_hash, password.encode('utf-8'))).decode('utf-8')
+    
+    async def check(self, password: str, hashed: str) -> bool:
+        return await self._run(_check, password.encode('utf-8'), hashed.encode('utf-8'))
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'outstanding': self._outstanding,
+                'queue_depth': max(0, self._outstanding - self.workers),
+                **self._stats
+            }
+    
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, List, Optional, Tuple
+from starlette.datastructures import MutableHeaders
+from app.config import settings
+
+# Opt-in per-request profiler. While a request is profiled, every SQL
+# statement and Redis call made on its behalf is appended to the profile in
+# a ContextVar (copied into threadpool workers, so sync routes work too).
+# Outside a profiled request record() is a single ContextVar lookup.
+class RequestProfile:
+    __slots__ = ('entries',)
+    
+    def __init__(self):
+        self.entries: List[Tuple[str, str, float, Any]] = []
+
+_current_profile: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+def active() -> bool:
+    return _current_profile.get() is not None
+
+def record(kind: str, label: str, elapsed: float, params: Any = None):
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.entries.append((kind, label, elapsed, params))
+
+def log_slow_statement(driver: str, label: str, elapsed: float):
+    if settings.slow_query_ms and elapsed * 1000 >= settings.slow_query_ms:
+        print(f"Slow query ({driver}, {elapsed * 1000:.1f} ms): {label}")
+
+def _repeats(entries) -> List[Tuple[str, int, int]]:
+    # (statement, times run, times run with parameters seen before)
+    runs = Counter(label for kind, label, _, _ in entries if kind == "sql")
+    identical = Counter((label, repr(params)) for kind, label, _, params in entries if kind == "sql")
+    duplicates = Counter()
+    for (label, _), count in identical.items():
+        duplicates[label] += count - 1
+    return [(label, count, duplicates[label]) for label, count in runs.items() if count > 1]
+
+def _totals(entries, kind: str) -> Tuple[int, float]:
+    durations = [elapsed for entry_kind, _, elapsed, _ in entries if entry_kind == kind]
+    return len(durations), sum(durations) * 1000
+
+def server_timing(profile: RequestProfile, elapsed: float) -> str:
+    sql_count, sql_ms = _totals(profile.entries, "sql")
+    redis_count, redis_ms = _totals(profile.entries, "redis")
+    repeated = len(_repeats(profile.entries))
+    return (
+        f'db;dur={sql_ms:.2f};desc="{sql_count} statements, {repeated} repeated", '
+        f'redis;dur={redis_ms:.2f};desc="{redis_count} calls", '
+        f'total;dur={elapsed * 1000:.2f}'
+    )
+
+def log_profile(method: str, path: str, profile: RequestProfile, elapsed: float):
+    sql_count, sql_ms = _totals(profile.entries, "sql")
+    redis_count, redis_ms = _totals(profile.entries, "redis")
+    lines = [
+        f"Slow request {method} {path} {elapsed * 1000:.1f} ms: "
+        f"{sql_count} SQL ({sql_ms:.1f} ms), {redis_count} Redis ({redis_ms:.1f} ms)"
+    ]
+    for kind, label, duration, _ in profile.entries:
+        lines.append(f"  {kind:<5} {duration * 1000:8.2f} ms  {label}")
+    for label, count, duplicates in _repeats(profile.entries):
+        lines.append(f"  repeated x{count} ({duplicates} with identical parameters): {label}")
+    print("\n".join(lines))
+
+def _wants_profile(scope) -> bool:
+    if settings.profiling_enabled:
+        return True
+    if not settings.profiling_allow_header:
+        return False
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            return value not in (b"", b"0", b"false")
+    return False
+
+class ProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+        
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                # asyncpg reports queries through loop.call_soon; let pending
+                # reports land before the header is built
+                await asyncio.sleep(0)
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(profile, time.perf_counter() - started))
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_profile.reset(token)
+            elapsed = time.perf_counter() - started
+            if elapsed * 1000 >= settings.profiling_slow_request_ms:
+                log_profile(scope["method"], scope["path"], profile, elapsed)
@@ -1,38 +1,143 @@
 from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.events import EVENT_JOB_MISSED, EVENT_JOB_MAX_INSTANCES
 import random
-from app.repositories.price_repository import PriceRepository
-from app.services.cache_service import invalidate_cache
+import threading
+import time
+from datetime import datetime, timezone
+from app.config import settings
+from app.services.price_service import PriceService
+from app.services.price_snapshot import price_snapshot
+from app.services.cache_warmer import cache_warmer
+from app.utils.exceptions import NotLeaderException, PriceUpdateFailedException
+from app.utils.leader import LeaderElection
+from app.utils.metrics import SCHEDULER_TICK_DURATION
 
-price_repo = PriceRepository()
+price_service = PriceService()
 scheduler = BackgroundScheduler()
+leader = LeaderElection("scheduler", settings.scheduler_lock_key)
+
+_stats_lock = threading.Lock()
+# Serializes scheduled and manual ticks within the leader process
+_tick_lock = threading.Lock()
+_job_stats = {
+    'runs': 0,
+    'manual_runs': 0,
+    'failures': 0,
+    'missed_runs': 0,
+    'skipped_as_follower': 0,
+    'last_run_at': None,
+    'last_duration_ms': None,
+    'max_duration_ms': 0.0,
+    'total_duration_ms': 0.0
+}
 
 def update_prices_job():
     try:
-        prices = price_repo.get_all()
+        started = time.perf_counter()
+        prices = price_snapshot.get(refresh=True).prices
+        new_prices = {}
         
         for symbol, current_price in prices.items():
             fluctuation = random.uniform(-0.05, 0.05)
             new_price = current_price * (1 + fluctuation)
             new_price = round(new_price, 2)
             
-            price_repo.update(symbol, new_price)
+            if new_price != current_price:
+                new_prices[symbol] = new_price
         
-        invalidate_cache("portfolio:*")
+        written = price_service.update_many(new_prices)
+        duration_ms = round((time.perf_counter() - started) * 1000, 2)
         
-        print(f"Updated {len(prices)} stock prices")
+        print(f"Updated {len(written)} stock prices in {duration_ms} ms")
+        return {"rows_written": len(written), "duration_ms": duration_ms}
     except Exception as e:
         print(f"Price update job failed: {e}")
+        return None
+
+def _run_tick(manual: bool = False):
+    with _tick_lock:
+        started = time.perf_counter()
+        result = update_prices_job()
+        elapsed = time.perf_counter() - started
+    duration_ms = round(elapsed * 1000, 2)
+    SCHEDULER_TICK_DURATION.observe(elapsed)
+    with _stats_lock:
+        _job_stats['runs'] += 1
+        if manual:
+            _job_stats['manual_runs'] += 1
+        if result is None:
+            _job_stats['failures'] += 1
+        _job_stats['last_run_at'] = datetime.now(timezone.utc).isoformat()
+        _job_stats['last_duration_ms'] = duration_ms
+        _job_stats['max_duration_ms'] = max(_job_stats['max_duration_ms'], duration_ms)
+        _job_stats['total_duration_ms'] = round(_job_stats['total_duration_ms'] + duration_ms, 2)
+    
+    # The tick just invalidated its holders' summaries; refill them for the
+    # users likely to ask next, outside the tick's own duration
+    if result is not None and settings.cache_warm_enabled:
+        cache_warmer.warm()
+    return result
+
+def scheduled_price_update():
+    # Every process schedules the tick, only the leader runs it. Followers
+    # pick up the new prices from the prices:updated notifications.
+    if not leader.campaign():
+        with _stats_lock:
+            _job_stats['skipped_as_follower'] += 1
+        return
+    _run_tick()
+
+def _on_job_missed(event):
+    if event.job_id == 'update_prices' and leader.is_leader:
+        with _stats_lock:
+            _job_stats['missed_runs'] += 1
+        print("Price update run missed or skipped while the previous run was still going")
 
 def start_scheduler():
+    scheduler.add_listener(_on_job_missed, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES)
     scheduler.add_job(
-        update_prices_job,
+        leader.campaign,
         'interval',
-        seconds=60,
-        id='update_prices'
+        seconds=settings.scheduler_election_interval,
+        id='leader_election',
+        next_run_time=datetime.now()
+    )
+    scheduler.add_job(
+        scheduled_price_update,
+        'interval',
+        seconds=settings.price_update_interval,
+        id='update_prices',
+        coalesce=True,
+        max_instances=1,
+        misfire_grace_time=settings.price_update_interval // 2 or 1
     )
     scheduler.start()
-    print("Background scheduler started - prices will update every 60 seconds")
+    print(f"Background scheduler started - the elected leader updates prices every {settings.price_update_interval} seconds")
+
+def stop_scheduler():
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+    cache_warmer.shutdown()
+    leader.resign()
+
+def scheduler_stats():
+    job = scheduler.get_job('update_prices') if scheduler.running else None
+    with _stats_lock:
+        stats = dict(_job_stats)
+    return {
+        'leader': leader.stats(),
+        'update_prices': {
+            **stats,
+            'next_run_at': job.next_run_time.isoformat() if job and job.next_run_time else None
+        }
+    }
 
 def trigger_price_update():
-    update_prices_job()
-    return {"message": "Price update triggered successfully"}
+    # Manual ticks go through the leader as well, so only one process ever
+    # writes prices and advances version:prices
+    if not leader.campaign():
+        raise NotLeaderException("This worker is not the scheduler leader; retry the request")
+    result = _run_tick(manual=True)
+    if result is None:
+        raise PriceUpdateFailedException("Price update failed")
+    return {"message": "Price update triggered successfully", **result}
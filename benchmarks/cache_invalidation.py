@@ -0,0 +1,100 @@
+"""Compare KEYS+DEL invalidation with generation-stamped keys.
+
+Fills Redis with N cached portfolio summaries, then measures the latency of
+each invalidation strategy and how long a concurrent client is blocked
+(max PING round trip while the invalidation runs; Redis executes commands
+on one thread, so that is the time every other client waits).
+
+    python -m benchmarks.cache_invalidation --redis-url redis://localhost:6379/15
+    python -m benchmarks.cache_invalidation --fake --keys 200000
+
+The target database is flushed. --fake needs the fakeredis and lupa packages.
+"""
+import argparse
+import json
+import threading
+import time
+import redis
+from app.services import cache_service
+
+PAYLOAD = json.dumps({"user_id": 0, "total_invested": 0.0, "current_value": 0.0, "holdings": []})
+
+class BlockingProbe(threading.Thread):
+    def __init__(self, client):
+        super().__init__(daemon=True)
+        self.client = client
+        self.max_latency = 0.0
+        self.samples = 0
+        self._stop_event = threading.Event()
+    
+    def run(self):
+        while not self._stop_event.is_set():
+            start = time.perf_counter()
+            self.client.ping()
+            self.max_latency = max(self.max_latency, time.perf_counter() - start)
+            self.samples += 1
+    
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+def populate(client, count: int, versioned: bool, batch_size: int = 10000):
+    client.flushdb()
+    for start in range(0, count, batch_size):
+        pipe = client.pipeline(transaction=False)
+        for user_id in range(start, min(start + batch_size, count)):
+            key = f"portfolio:{user_id}@0.0" if versioned else f"portfolio:{user_id}"
+            pipe.set(key, PAYLOAD, ex=300)
+        pipe.execute()
+
+def measure(client, probe_client, operation) -> dict:
+    probe = BlockingProbe(probe_client)
+    probe.start()
+    time.sleep(0.05)
+    start = time.perf_counter()
+    operation()
+    elapsed = time.perf_counter() - start
+    probe.stop()
+    return {
+        "invalidate_ms": round(elapsed * 1000, 3),
+        "max_blocked_ms": round(probe.max_latency * 1000, 3),
+        "probe_samples": probe.samples
+    }
+
+def keys_and_delete(client):
+    keys = client.keys("portfolio:*")
+    if keys:
+        client.delete(*keys)
+
+def run(client, probe_client, count: int) -> dict:
+    populate(client, count, versioned=False)
+    legacy = measure(client, probe_client, lambda: keys_and_delete(client))
+    
+    populate(client, count, versioned=True)
+    cache_service.redis_client = client
+    cache_service._get_script = client.register_script(cache_service._GET_SCRIPT)
+    cache_service._set_script = client.register_script(cache_service._SET_SCRIPT)
+    versioned = measure(client, probe_client, lambda: cache_service.invalidate_cache("portfolio:*"))
+    
+    return {"keys": count, "keys_delete": legacy, "generation_incr": versioned}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15")
+    parser.add_argument("--fake", action="store_true", help="use an in-process fakeredis server")
+    parser.add_argument("--keys", type=int, default=1_000_000)
+    args = parser.parse_args()
+    
+    if args.fake:
+        import fakeredis
+        server = fakeredis.FakeServer()
+        client = fakeredis.FakeRedis(server=server, decode_responses=True)
+        probe_client = fakeredis.FakeRedis(server=server, decode_responses=True)
+    else:
+        client = redis.from_url(args.redis_url, decode_responses=True)
+        probe_client = redis.from_url(args.redis_url, decode_responses=True)
+    
+    print(json.dumps(run(client, probe_client, args.keys), indent=2))
+
+if __name__ == "__main__":
+    main()
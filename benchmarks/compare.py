@@ -0,0 +1,58 @@
+"""Compare two benchmark result files, e.g. from two commits.
+
+    python -m benchmarks.compare benchmarks/results/micro-abc123-*.json benchmarks/results/micro-def456-*.json
+
+Prints every throughput and latency figure present in both files with the
+relative change. Latency rising or throughput falling by more than
+--threshold percent is marked as a regression.
+"""
+import argparse
+import json
+import sys
+
+LATENCY_KEYS = {"mean", "p50", "p95", "p99", "max"}
+THROUGHPUT_KEYS = {"requests_per_second", "ops_per_second"}
+
+def flatten(node, prefix=""):
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key == "meta":
+                continue
+            yield from flatten(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        yield prefix, node
+
+def compare(base: dict, head: dict, threshold: float):
+    head_values = dict(flatten(head))
+    rows = []
+    for path, before in flatten(base):
+        key = path.rsplit(".", 1)[-1]
+        if key not in LATENCY_KEYS | THROUGHPUT_KEYS or path not in head_values:
+            continue
+        after = head_values[path]
+        change = (after - before) / before * 100 if before else 0.0
+        worse = change > threshold if key in LATENCY_KEYS else change < -threshold
+        rows.append((path, before, after, change, worse))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change flagged as a regression")
+    args = parser.parse_args()
+    
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+    
+    print(f"base {base.get('meta', {}).get('commit')}  ->  head {head.get('meta', {}).get('commit')}")
+    rows = compare(base, head, args.threshold)
+    width = max((len(path) for path, *_ in rows), default=0)
+    for path, before, after, change, worse in rows:
+        print(f"{path:<{width}}  {before:>12.3f}  {after:>12.3f}  {change:+8.1f}%{'  REGRESSION' if worse else ''}")
+    return 1 if any(worse for *_, worse in rows) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""Closed-loop HTTP load test against a running API: N concurrent connections.
+
+    python -m benchmarks.load_async --base-url http://localhost:8000 --concurrency 1000 --duration 30
+
+Each connection issues requests back-to-back for --duration seconds, cycling
+through the hot endpoints. Run it once against the sync build (the commit
+before the async data layer) and once against this one, with the same
+server flags (e.g. `uvicorn app.main:app --workers 1`). Needs httpx and an
+open-files limit above --concurrency (`ulimit -n 4096`).
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import httpx
+from benchmarks.results import latency_summary, run_metadata, write_result
+
+def endpoints(user_ids, symbols, token):
+    user_id = random.choice(user_ids)
+    yield "GET", f"/portfolio-summary?user_id={user_id}", None
+    yield "GET", f"/transactions?user_id={user_id}", None
+    yield "GET", "/prices", None
+    yield "GET", f"/prices/{random.choice(symbols)}", None
+    if token:
+        yield "GET", "/auth/me", {"Authorization": f"Bearer {token}"}
+
+async def login(client: httpx.AsyncClient, email: str, password: str):
+    response = await client.post("/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+async def worker(client, deadline, args, token, latencies, statuses):
+    while time.perf_counter() < deadline:
+        for method, path, headers in endpoints(args.user_ids, args.symbols, token):
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, headers=headers)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+        token = await login(client, args.email, args.password) if args.email else None
+        
+        # Warm caches and connection pools before measuring
+        warm_deadline = time.perf_counter() + args.warmup
+        await asyncio.gather(*(worker(client, warm_deadline, args, token, [], {})
+                               for _ in range(min(args.concurrency, 50))))
+        
+        latencies, statuses = [], {}
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(worker(client, deadline, args, token, latencies, statuses)
+                               for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    
+    ok = sum(count for status, count in statuses.items() if status == 200)
+    return {
+        "meta": run_metadata(),
+        "benchmark": "load_async",
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "duration_seconds": round(elapsed, 2),
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "ok_ratio": round(ok / len(latencies), 4) if latencies else 0.0,
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "latency_ms": latency_summary(latencies)
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--user-ids", type=lambda v: [int(x) for x in v.split(",")], default=[1, 2, 3])
+    parser.add_argument("--symbols", type=lambda v: v.split(","), default=["AAPL", "GOOGL", "MSFT"])
+    parser.add_argument("--email", help="log in as this user to include /auth/me")
+    parser.add_argument("--password")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/load_async-<commit>-<time>.json)")
+    args = parser.parse_args()
+    
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    print(f"Wrote {write_result(result, 'load_async', args.output)}")
+
+if __name__ == "__main__":
+    main()
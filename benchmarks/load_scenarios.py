@@ -0,0 +1,181 @@
+"""HTTP load scenarios against a running API, seeded with benchmarks.seed.
+
+    python -m benchmarks.load_scenarios --scenario all --concurrency 200 --duration 60
+
+Scenarios (closed loop, --concurrency connections each):
+  dashboard         read-heavy: portfolio summary (revalidated with its ETag),
+                    latest transactions page and prices, for Zipf-skewed users
+  trade_burst       every connection posts BUY transactions back-to-back and
+                    re-reads the summary, as after an order ticket
+  price_tick_storm  dashboard readers while one client forces a price tick
+                    every --tick-interval seconds, invalidating summaries
+
+Users come from the dataset manifest written by the seeder. Latency is
+reported overall and per endpoint (p50/p95/p99). Results go to
+benchmarks/results/ unless --output is given.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date
+import httpx
+import numpy as np
+from benchmarks.results import latency_summary, run_metadata, write_result
+from benchmarks.seed import DEFAULT_MANIFEST, zipf_cdf
+
+class Recorder:
+    def __init__(self):
+        self.samples = {}
+        self.statuses = {}
+    
+    def add(self, endpoint: str, elapsed: float, status):
+        self.samples.setdefault(endpoint, []).append(elapsed)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+    
+    def summary(self, elapsed: float) -> dict:
+        requests = sum(len(samples) for samples in self.samples.values())
+        ok = sum(count for status, count in self.statuses.items() if isinstance(status, int) and status < 400)
+        return {
+            "duration_seconds": round(elapsed, 2),
+            "requests": requests,
+            "requests_per_second": round(requests / elapsed, 1) if elapsed else 0.0,
+            "ok_ratio": round(ok / requests, 4) if requests else 0.0,
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+            "latency_ms": latency_summary([s for samples in self.samples.values() for s in samples]),
+            "endpoints": {endpoint: latency_summary(samples) for endpoint, samples in self.samples.items()}
+        }
+
+class Workload:
+    def __init__(self, client: httpx.AsyncClient, args, user_ids, prices):
+        self.client = client
+        self.args = args
+        self.user_ids = user_ids
+        self.user_cdf = zipf_cdf(len(user_ids), args.user_skew)
+        self.prices = prices
+        self.symbols = list(prices)
+        self.etags = {}
+    
+    def pick_user(self) -> int:
+        return self.user_ids[min(int(np.searchsorted(self.user_cdf, random.random())), len(self.user_ids) - 1)]
+    
+    async def request(self, recorder: Recorder, endpoint: str, method: str, path: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            response, status = None, type(e).__name__
+        recorder.add(endpoint, time.perf_counter() - started, status)
+        return response
+    
+    async def dashboard(self, recorder: Recorder):
+        user_id = self.pick_user()
+        etag = self.etags.get(user_id)
+        response = await self.request(
+            recorder, "portfolio_summary", "GET", f"/portfolio-summary?user_id={user_id}",
+            headers={"If-None-Match": etag} if etag else None
+        )
+        if response is not None and response.headers.get("etag"):
+            self.etags[user_id] = response.headers["etag"]
+        await self.request(recorder, "transactions_page", "GET", f"/transactions?user_id={user_id}&limit=50")
+        await self.request(recorder, "prices", "GET", "/prices")
+    
+    async def trade(self, recorder: Recorder):
+        user_id = self.pick_user()
+        symbol = random.choice(self.symbols)
+        await self.request(recorder, "create_transaction", "POST", "/transactions", json={
+            "user_id": user_id,
+            "symbol": symbol,
+            "transaction_type": "BUY",
+            "units": random.randint(1, 50),
+            "price": round(self.prices[symbol] * random.uniform(0.98, 1.02), 2),
+            "transaction_date": date.today().isoformat()
+        })
+        await self.request(recorder, "portfolio_summary", "GET", f"/portfolio-summary?user_id={user_id}")
+    
+    async def ticker(self, recorder: Recorder, deadline: float):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await self.request(recorder, "price_tick", "POST", "/admin/update-prices")
+            await asyncio.sleep(max(0.0, self.args.tick_interval - (time.perf_counter() - started)))
+
+async def loop(step, recorder: Recorder, deadline: float):
+    while time.perf_counter() < deadline:
+        await step(recorder)
+
+async def run_scenario(workload: Workload, name: str, args) -> dict:
+    step = workload.trade if name == "trade_burst" else workload.dashboard
+    
+    warm_deadline = time.perf_counter() + args.warmup
+    await asyncio.gather(*(loop(workload.dashboard, Recorder(), warm_deadline)
+                           for _ in range(min(args.concurrency, 50))))
+    
+    recorder = Recorder()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    tasks = [loop(step, recorder, deadline) for _ in range(args.concurrency)]
+    if name == "price_tick_storm":
+        tasks.append(workload.ticker(recorder, deadline))
+    await asyncio.gather(*tasks)
+    return recorder.summary(time.perf_counter() - started)
+
+def load_manifest(path: str):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+async def run(args) -> dict:
+    manifest = load_manifest(args.manifest)
+    if args.user_ids:
+        user_ids = args.user_ids
+    elif manifest:
+        user_ids = list(range(manifest["first_user_id"], manifest["last_user_id"] + 1))
+    else:
+        raise SystemExit(f"No dataset manifest at {args.manifest}; run benchmarks.seed or pass --user-ids")
+    random.Random(args.seed).shuffle(user_ids)
+    
+    limits = httpx.Limits(max_connections=args.concurrency + 1, max_keepalive_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=httpx.Timeout(args.timeout)) as client:
+        prices = {symbol: float(price) for symbol, price in (await client.get("/prices")).json()["prices"].items()}
+        workload = Workload(client, args, user_ids, prices)
+        scenarios = ["dashboard", "trade_burst", "price_tick_storm"] if args.scenario == "all" else [args.scenario]
+        results = {}
+        for name in scenarios:
+            print(f"Running {name}...", flush=True)
+            results[name] = await run_scenario(workload, name, args)
+    
+    return {
+        "meta": run_metadata(),
+        "benchmark": "load_scenarios",
+        "base_url": args.base_url,
+        "concurrency": args.concurrency,
+        "dataset": {key: manifest[key] for key in ("users", "transactions", "seed")} if manifest else None,
+        "scenarios": results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--scenario", choices=["dashboard", "trade_burst", "price_tick_storm", "all"], default="all")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=60.0, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--tick-interval", type=float, default=0.5, help="seconds between forced price ticks")
+    parser.add_argument("--user-skew", type=float, default=1.1, help="Zipf exponent of requests per user")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    parser.add_argument("--user-ids", type=lambda v: [int(x) for x in v.split(",")], help="instead of the manifest")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/load_scenarios-<commit>-<time>.json)")
+    args = parser.parse_args()
+    
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    print(f"Wrote {write_result(result, 'load_scenarios', args.output)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Microbenchmarks of the service layer against the configured Postgres/Redis.
+
+    python -m benchmarks.micro --iterations 2000
+    python -m benchmarks.micro --only holdings,summary
+
+Cases:
+  holdings   PortfolioService.calculate_holdings for a sampled user
+  summary    PortfolioService.get_portfolio_summary (no response cache)
+  price_tick update_prices_job: one full price tick, including the price
+             writes, history rows and cache invalidation (mutates prices)
+
+Users are sampled from the database, half uniformly and half from the
+accounts with the most positions, so both the typical and the heavy path
+are covered. Results go to benchmarks/results/ unless --output is given.
+"""
+import argparse
+import json
+import random
+import time
+from app.database import init_pool, get_db_connection, get_db_cursor
+from app.services.portfolio_service import PortfolioService
+from app.utils.scheduler import update_prices_job
+from benchmarks.results import latency_summary, run_metadata, write_result
+
+def sample_users(count: int, seed: int):
+    with get_db_connection() as conn:
+        cursor = get_db_cursor(conn)
+        cursor.execute(
+            """
+            SELECT user_id FROM positions
+            GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT %s
+            """,
+            (count // 2,)
+        )
+        heavy = [row['user_id'] for row in cursor.fetchall()]
+        cursor.execute("SELECT user_id FROM users TABLESAMPLE SYSTEM (5) LIMIT %s", (count - len(heavy),))
+        typical = [row['user_id'] for row in cursor.fetchall()]
+        cursor.execute("SELECT COUNT(*) AS users FROM users")
+        users = cursor.fetchone()['users']
+        cursor.execute("SELECT reltuples::bigint AS rows FROM pg_class WHERE relname = 'transactions'")
+        transactions = cursor.fetchone()['rows']
+    user_ids = heavy + typical
+    random.Random(seed).shuffle(user_ids)
+    return user_ids, {"users": users, "transactions_estimate": transactions}
+
+def bench(fn, args_cycle, iterations: int, warmup: int):
+    for i in range(warmup):
+        fn(*args_cycle[i % len(args_cycle)])
+    timings = []
+    started = time.perf_counter()
+    for i in range(iterations):
+        call_args = args_cycle[i % len(args_cycle)]
+        t0 = time.perf_counter()
+        fn(*call_args)
+        timings.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    return {
+        "iterations": iterations,
+        "ops_per_second": round(iterations / elapsed, 1),
+        "latency_ms": latency_summary(timings)
+    }
+
+def run(args) -> dict:
+    init_pool()
+    user_ids, dataset = sample_users(args.users, args.seed)
+    users = [(user_id,) for user_id in user_ids] or [(1,)]
+    service = PortfolioService()
+    
+    def price_tick():
+        if update_prices_job() is None:
+            raise RuntimeError("update_prices_job failed")
+    
+    cases = {
+        "holdings": lambda: bench(service.calculate_holdings, users, args.iterations, args.warmup),
+        "summary": lambda: bench(service.get_portfolio_summary, users, args.iterations, args.warmup),
+        "price_tick": lambda: bench(price_tick, [()], args.tick_iterations, 1)
+    }
+    selected = args.only.split(",") if args.only else list(cases)
+    
+    results = {}
+    for name in selected:
+        print(f"Running {name}...", flush=True)
+        results[name] = cases[name]()
+    
+    return {
+        "meta": run_metadata(),
+        "benchmark": "micro",
+        "dataset": dataset,
+        "sampled_users": len(user_ids),
+        "cases": results
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--tick-iterations", type=int, default=20)
+    parser.add_argument("--users", type=int, default=200, help="users to sample and cycle through")
+    parser.add_argument("--only", help="comma-separated subset of: holdings,summary,price_tick")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/micro-<commit>-<time>.json)")
+    args = parser.parse_args()
+    
+    result = run(args)
+    print(json.dumps(result, indent=2))
+    print(f"Wrote {write_result(result, 'micro', args.output)}")
+
+if __name__ == "__main__":
+    main()
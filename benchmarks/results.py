@@ -0,0 +1,57 @@
+"""Shared helpers for benchmark output: latency percentiles, run metadata and
+JSON result files that can be diffed across commits with benchmarks.compare.
+"""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, Optional, Sequence
+import numpy as np
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+def latency_summary(seconds: Sequence[float]) -> Optional[Dict]:
+    if not len(seconds):
+        return None
+    latency_ms = np.asarray(seconds, dtype=float) * 1000
+    p50, p95, p99 = np.percentile(latency_ms, [50, 95, 99])
+    return {
+        "count": int(latency_ms.size),
+        "mean": round(float(latency_ms.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p95": round(float(p95), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(latency_ms.max()), 3)
+    }
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_metadata() -> Dict:
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+def write_result(result: Dict, name: str, output: Optional[str] = None) -> str:
+    # Default: benchmarks/results/<name>-<commit>-<timestamp>.json
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        commit = result.get("meta", {}).get("commit") or "nogit"
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(RESULTS_DIR, f"{name}-{commit}-{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    return output
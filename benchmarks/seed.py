@@ -0,0 +1,222 @@
+"""Seed a synthetic dataset with COPY: users, transactions and positions.
+
+    python -m benchmarks.seed --users 100000 --transactions 50000000
+
+Activity is skewed like a real book: users and symbols are drawn from Zipf
+distributions (a few very active accounts, a few very popular stocks).
+Every SELL is paired with an earlier BUY of at least as many units of the
+same symbol, so running balances never go negative in date order and the
+ledger passes the same checks as one built through the API. All seeded
+users share the password given by --password, for the load scenarios.
+
+The seed runs in one transaction. Secondary indexes on transactions are
+dropped for the load and rebuilt before commit (--keep-indexes to skip).
+A manifest describing the dataset is written for benchmarks.load_scenarios.
+"""
+import argparse
+import io
+import json
+import os
+import time
+from datetime import date, timedelta
+import bcrypt
+import numpy as np
+import psycopg2
+from app.config import settings
+from app.repositories.position_repository import AGGREGATE_TRANSACTIONS_SQL
+from benchmarks.results import RESULTS_DIR
+
+DEFAULT_MANIFEST = os.path.join(RESULTS_DIR, "dataset.json")
+
+def connect():
+    return psycopg2.connect(
+        host=settings.db_host, port=settings.db_port, dbname=settings.db_name,
+        user=settings.db_user, password=settings.db_password
+    )
+
+def zipf_cdf(size: int, exponent: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, size + 1) ** exponent
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+def draw(rng, cdf: np.ndarray, count: int) -> np.ndarray:
+    return np.minimum(np.searchsorted(cdf, rng.random(count)), cdf.size - 1)
+
+def copy_rows(cursor, table: str, columns: str, text: str):
+    cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN", io.StringIO(text))
+
+def seed_users(cursor, first_id: int, count: int, password_hash: str):
+    batch = 50_000
+    for start in range(first_id, first_id + count, batch):
+        stop = min(start + batch, first_id + count)
+        copy_rows(cursor, "users", "user_id, name, email, password_hash", "".join(
+            f"{user_id}\tBench User {user_id}\tbench{user_id}@example.com\t{password_hash}\n"
+            for user_id in range(start, stop)
+        ))
+    cursor.execute("SELECT setval('users_user_id_seq', (SELECT MAX(user_id) FROM users))")
+
+class TransactionGenerator:
+    def __init__(self, user_ids: np.ndarray, symbols, base_prices, args):
+        self.rng = np.random.default_rng(args.seed)
+        # Shuffle so the most active accounts are spread over the id range
+        self.user_ids = self.rng.permutation(user_ids)
+        self.user_cdf = zipf_cdf(len(user_ids), args.user_skew)
+        self.symbols = np.array(symbols, dtype=object)
+        self.symbol_cdf = zipf_cdf(len(symbols), args.symbol_skew)
+        self.base_prices = np.array(base_prices, dtype=float)
+        self.sell_ratio = args.sell_ratio
+        self.days = args.years * 365
+        today = date.today()
+        self.day_labels = [(today - timedelta(days=self.days - d)).isoformat() for d in range(self.days + 1)]
+        self.clock_labels = [f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}" for s in range(86400)]
+    
+    def chunk(self, count: int) -> str:
+        rng = self.rng
+        pairs = int(count * self.sell_ratio)
+        buys = count - pairs
+        
+        users = self.user_ids[draw(rng, self.user_cdf, buys)]
+        symbols = draw(rng, self.symbol_cdf, buys)
+        units = rng.integers(1, 101, buys)
+        prices = np.maximum(np.round(self.base_prices[symbols] * rng.lognormal(0, 0.25, buys), 2), 1.0)
+        days = rng.integers(0, self.days + 1, buys)
+        # The first `pairs` buys each get a later SELL. Buys are stamped in the
+        # morning and sells in the afternoon, so a same-day pair still sorts
+        # buy-first by created_at.
+        clocks = rng.integers(0, 43200, buys)
+        
+        sell_units = rng.integers(1, units[:pairs] + 1)
+        sell_days = days[:pairs] + (rng.random(pairs) * (self.days - days[:pairs] + 1)).astype(np.int64)
+        sell_prices = np.maximum(np.round(prices[:pairs] * rng.lognormal(0.05, 0.2, pairs), 2), 1.0)
+        sell_clocks = rng.integers(43200, 86400, pairs)
+        
+        day_labels, clock_labels = self.day_labels, self.clock_labels
+        out = io.StringIO()
+        for user_id, symbol, kind, n, price, day, clock in (
+            (users, self.symbols[symbols], "BUY", units, prices, days, clocks),
+            (users[:pairs], self.symbols[symbols[:pairs]], "SELL", sell_units, sell_prices, sell_days, sell_clocks)
+        ):
+            out.write("".join(
+                f"{u}\t{s}\t{kind}\t{q}\t{p:.2f}\t{day_labels[d]}\t{day_labels[d]} {clock_labels[c]}\n"
+                for u, s, q, p, d, c in zip(user_id.tolist(), symbol.tolist(), n.tolist(),
+                                            price.tolist(), day.tolist(), clock.tolist())
+            ))
+        return out.getvalue()
+
+def secondary_indexes(cursor):
+    cursor.execute(
+        """
+        SELECT i.indexname, i.indexdef
+        FROM pg_indexes i
+        JOIN pg_class c ON c.relname = i.indexname
+        JOIN pg_index x ON x.indexrelid = c.oid
+        WHERE i.tablename = 'transactions' AND NOT x.indisprimary
+        """
+    )
+    return cursor.fetchall()
+
+def run(args) -> dict:
+    conn = connect()
+    timings = {}
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT symbol, current_price FROM prices ORDER BY symbol")
+        symbols, base_prices = zip(*cursor.fetchall())
+        
+        if args.truncate:
+            cursor.execute("TRUNCATE users, transactions, positions RESTART IDENTITY CASCADE")
+        cursor.execute("SELECT COALESCE(MAX(user_id), 0) + 1 FROM users")
+        first_user = cursor.fetchone()[0]
+        
+        started = time.perf_counter()
+        password_hash = bcrypt.hashpw(args.password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        seed_users(cursor, first_user, args.users, password_hash)
+        timings['users_seconds'] = round(time.perf_counter() - started, 2)
+        
+        indexes = [] if args.keep_indexes else secondary_indexes(cursor)
+        for name, _ in indexes:
+            cursor.execute(f"DROP INDEX {name}")
+        
+        started = time.perf_counter()
+        generator = TransactionGenerator(
+            np.arange(first_user, first_user + args.users), symbols, [float(p) for p in base_prices], args
+        )
+        written = 0
+        while written < args.transactions:
+            count = min(args.chunk_size, args.transactions - written)
+            copy_rows(cursor, "transactions",
+                      "user_id, symbol, transaction_type, units, price, transaction_date, created_at",
+                      generator.chunk(count))
+            written += count
+            elapsed = time.perf_counter() - started
+            print(f"  {written:,} transactions ({written / elapsed:,.0f} rows/s)", flush=True)
+        timings['transactions_seconds'] = round(time.perf_counter() - started, 2)
+        
+        started = time.perf_counter()
+        for _, definition in indexes:
+            cursor.execute(definition)
+        timings['index_rebuild_seconds'] = round(time.perf_counter() - started, 2)
+        
+        started = time.perf_counter()
+        where = "WHERE user_id >= %s"
+        cursor.execute(
+            f"""
+            INSERT INTO positions (user_id, symbol, buy_units, buy_cost, sell_units, updated_at)
+            SELECT user_id, symbol, buy_units, buy_cost, sell_units, NOW()
+            FROM ({AGGREGATE_TRANSACTIONS_SQL.format(where=where)}) agg
+            """,
+            (first_user,)
+        )
+        positions = cursor.rowcount
+        timings['positions_seconds'] = round(time.perf_counter() - started, 2)
+        conn.commit()
+        
+        conn.autocommit = True
+        started = time.perf_counter()
+        cursor.execute("ANALYZE users, transactions, positions")
+        timings['analyze_seconds'] = round(time.perf_counter() - started, 2)
+    finally:
+        conn.close()
+    
+    return {
+        "first_user_id": first_user,
+        "last_user_id": first_user + args.users - 1,
+        "users": args.users,
+        "transactions": args.transactions,
+        "positions": positions,
+        "password": args.password,
+        "seed": args.seed,
+        "user_skew": args.user_skew,
+        "symbol_skew": args.symbol_skew,
+        "sell_ratio": args.sell_ratio,
+        "timings": timings
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--transactions", type=int, default=5_000_000)
+    parser.add_argument("--years", type=int, default=5, help="spread transaction dates over this many years")
+    parser.add_argument("--user-skew", type=float, default=1.1, help="Zipf exponent of activity per user")
+    parser.add_argument("--symbol-skew", type=float, default=1.0, help="Zipf exponent of trades per symbol")
+    parser.add_argument("--sell-ratio", type=float, default=0.2, help="fraction of rows that are SELLs (max 0.5)")
+    parser.add_argument("--chunk-size", type=int, default=200_000, help="rows generated and copied per batch")
+    parser.add_argument("--password", default="benchmark")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--truncate", action="store_true", help="delete ALL users, transactions and positions first")
+    parser.add_argument("--keep-indexes", action="store_true", help="load with secondary indexes in place")
+    parser.add_argument("--manifest", default=DEFAULT_MANIFEST)
+    args = parser.parse_args()
+    if not 0 <= args.sell_ratio <= 0.5:
+        parser.error("--sell-ratio must be between 0 and 0.5")
+    
+    result = run(args)
+    os.makedirs(os.path.dirname(os.path.abspath(args.manifest)), exist_ok=True)
+    with open(args.manifest, "w") as f:
+        json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+    if args.truncate:
+        print("Existing user ids were reused; flush Redis or restart the API before measuring")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+#!/bin/sh
+# Run once by the primary's docker-entrypoint on first init: lets the
+# postgres-replica service stream WAL from it (see docker-compose.yml).
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
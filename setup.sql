@@ -19,7 +19,7 @@ CREATE TABLE transactions (
     units INTEGER NOT NULL CHECK (units > 0),
     price DECIMAL(15, 2) NOT NULL CHECK (price > 0),
     transaction_date DATE NOT NULL CHECK (transaction_date <= CURRENT_DATE),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE TABLE prices (
@@ -28,11 +28,60 @@ CREATE TABLE prices (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE INDEX idx_transactions_user_id ON transactions(user_id);
+CREATE TABLE positions (
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    symbol VARCHAR(20) NOT NULL,
+    buy_units BIGINT NOT NULL DEFAULT 0,
+    buy_cost DECIMAL(20, 2) NOT NULL DEFAULT 0,
+    sell_units BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, symbol)
+);
+
+CREATE TABLE price_history (
+    symbol VARCHAR(20) NOT NULL,
+    ts TIMESTAMP NOT NULL, -- UTC
+    price DECIMAL(15, 2) NOT NULL CHECK (price > 0)
+);
+
+-- BUY lots a SELL closes explicitly, in the order given; the rest is matched FIFO
+CREATE TABLE transaction_lot_selections (
+    sell_transaction_id INTEGER NOT NULL REFERENCES transactions(transaction_id) ON DELETE CASCADE,
+    buy_transaction_id INTEGER NOT NULL REFERENCES transactions(transaction_id) ON DELETE CASCADE,
+    position SMALLINT NOT NULL,
+    units INTEGER NOT NULL CHECK (units > 0),
+    PRIMARY KEY (sell_transaction_id, buy_transaction_id)
+);
+
+-- Incremental lot state: open lots packed as int64 columns, realized P&L in cents
+CREATE TABLE lot_books (
+    user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    symbol VARCHAR(20) NOT NULL,
+    lots BYTEA NOT NULL,
+    bought_units BIGINT NOT NULL DEFAULT 0,
+    sold_units BIGINT NOT NULL DEFAULT 0,
+    unmatched_units BIGINT NOT NULL DEFAULT 0,
+    realized_cents BIGINT NOT NULL DEFAULT 0,
+    realized_cost_cents BIGINT NOT NULL DEFAULT 0,
+    last_date DATE,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, symbol)
+);
+
+CREATE TABLE lot_progress (
+    user_id INTEGER PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    last_transaction_id INTEGER NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 CREATE INDEX idx_transactions_symbol ON transactions(symbol);
-CREATE INDEX idx_transactions_user_symbol ON transactions(user_id, symbol);
+-- Keyset pagination order; also serve plain lookups by user and (user, symbol)
+CREATE INDEX idx_transactions_user_keyset ON transactions(user_id, transaction_date DESC, created_at DESC, transaction_id DESC);
+CREATE INDEX idx_transactions_user_symbol_keyset ON transactions(user_id, symbol, transaction_date DESC, created_at DESC, transaction_id DESC);
 CREATE INDEX idx_transactions_date ON transactions(transaction_date DESC);
 CREATE INDEX idx_users_email ON users(email);
+CREATE INDEX idx_price_history_symbol_ts ON price_history(symbol, ts);
+CREATE INDEX idx_positions_symbol_holders ON positions(symbol, user_id) WHERE buy_units > sell_units;
 
 INSERT INTO prices (symbol, current_price, updated_at) VALUES
     ('TCS', 3400.00, NOW()),
@@ -51,5 +100,8 @@ INSERT INTO prices (symbol, current_price, updated_at) VALUES
     ('MARUTI', 11200.00, NOW()),
     ('SUNPHARMA', 1480.00, NOW());
 
+INSERT INTO price_history (symbol, ts, price)
+SELECT symbol, NOW() AT TIME ZONE 'UTC', current_price FROM prices;
+
 SELECT 'Database setup completed' as status;
 SELECT COUNT(*) as price_count FROM prices;
@@ -0,0 +1,140 @@
+import asyncio
+import pytest
+from app.services import transaction_service as transaction_module
+from app.services.price_snapshot import PriceSnapshot
+from app.services.transaction_service import AsyncTransactionService
+from app.utils.bulk_import import parse_csv, parse_ndjson
+from app.utils.exceptions import ImportTooLargeException, InvalidImportException
+
+async def _chunks(*parts: bytes):
+    for part in parts:
+        yield part
+
+def parse(parser, *parts: bytes, max_rows: int = 1000):
+    return asyncio.run(parser(_chunks(*parts), max_rows))
+
+def test_csv_columns_in_any_order_across_chunk_boundaries():
+    rows = parse(
+        parse_csv,
+        b'\xef\xbb\xbfsymbol,units,extra,transaction_type,price,transaction_date\r\nTCS,5,x,BUY,1',
+        b'00.5,2024-01-02\r\n\r\ninfy,2,y,SELL,50,2024-01-03\n'
+    )
+    
+    assert rows == [
+        (1, {'symbol': 'TCS', 'units': '5', 'transaction_type': 'BUY', 'price': '100.5',
+             'transaction_date': '2024-01-02'}, None),
+        (2, {'symbol': 'infy', 'units': '2', 'transaction_type': 'SELL', 'price': '50',
+             'transaction_date': '2024-01-03'}, None)
+    ]
+
+def test_csv_reports_bad_rows_and_rejects_bad_headers():
+    rows = parse(parse_csv, b'symbol,transaction_type,units,price,transaction_date\nTCS,BUY,5\n')
+    assert rows == [(1, None, 'Expected 5 columns, got 3')]
+    
+    with pytest.raises(InvalidImportException):
+        parse(parse_csv, b'symbol,units\nTCS,5\n')
+    with pytest.raises(InvalidImportException):
+        parse(parse_csv, b'\n\n')
+
+def test_ndjson_rows_and_errors():
+    rows = parse(
+        parse_ndjson,
+        b'{"user_id": 1, "symbol": "TCS", "units": 5, "ignored": true}\n',
+        b'not json\n[1, 2]\n\n{"symbol": "INFY"}'
+    )
+    
+    assert [(number, fields) for number, fields, _ in rows] == [
+        (1, {'user_id': 1, 'symbol': 'TCS', 'units': 5}), (2, None), (3, None), (4, {'symbol': 'INFY'})
+    ]
+    assert rows[1][2].startswith('Invalid JSON')
+    assert rows[2][2] == 'Expected a JSON object'
+
+def test_row_limit_and_encoding():
+    with pytest.raises(ImportTooLargeException):
+        parse(parse_ndjson, b'{}\n' * 3, max_rows=2)
+    with pytest.raises(InvalidImportException):
+        parse(parse_ndjson, b'{"symbol": "\xff"}\n')
+
+class FakeRepository:
+    def __init__(self, **results):
+        self.calls = []
+        self.results = results
+    
+    def __getattr__(self, name):
+        async def call(*args, **kwargs):
+            self.calls.append((name, args))
+            return self.results[name]
+        return call
+
+def make_service(monkeypatch, balances=None):
+    snapshot = PriceSnapshot(1, {'TCS': 100.0, 'INFY': 50.0})
+    
+    async def get_async(refresh=False):
+        return snapshot
+    monkeypatch.setattr(transaction_module.price_snapshot, 'get_async', get_async)
+    
+    service = AsyncTransactionService()
+    service.user_repo = FakeRepository(get_existing_ids={1, 2})
+    service.price_repo = FakeRepository(get_existing_symbols={'WIPRO'})
+    service.position_repo = FakeRepository(get_balances=dict(balances or {}), apply_deltas=None)
+    service.transaction_repo = FakeRepository(copy_many=0)
+    return service
+
+def row(number, **fields):
+    base = {'user_id': 1, 'symbol': 'TCS', 'transaction_type': 'BUY', 'units': 1, 'price': 10,
+            'transaction_date': '2024-01-01'}
+    return number, {**base, **fields}, None
+
+def test_import_reports_each_failing_row(monkeypatch):
+    service = make_service(monkeypatch, balances={(1, 'INFY'): 3})
+    rows = [
+        row(1),
+        row(2, units=0),
+        row(3, user_id=9),
+        row(4, symbol='NOPE'),
+        row(5, symbol='INFY', transaction_type='sell', units=4),
+        (6, None, 'Invalid JSON: boom'),
+        row(7, symbol='WIPRO')
+    ]
+    result = asyncio.run(service.import_transactions(rows))
+    
+    assert result['inserted'] == 0
+    assert result['user_ids'] == []
+    assert [error['row'] for error in result['errors']] == [2, 3, 4, 5, 6]
+    assert 'Units must be positive' in result['errors'][0]['error']
+    assert result['errors'][1]['error'] == 'User 9 not found'
+    assert result['errors'][2]['error'] == 'Symbol NOPE not found'
+    assert result['errors'][3]['error'].startswith('Insufficient holdings for INFY. Available: 3')
+    # Nothing is written while any row fails
+    assert service.transaction_repo.calls == []
+
+def test_import_skip_invalid_writes_valid_rows_in_ledger_order(monkeypatch):
+    service = make_service(monkeypatch)
+    service.transaction_repo.results['copy_many'] = 3
+    rows = [
+        row(1, transaction_type='SELL', units=2, transaction_date='2024-01-02'),
+        row(2, units=5, transaction_date='2024-01-01'),
+        row(3, user_id=2, units=0),
+        row(4, user_id=2, symbol='WIPRO', price=20)
+    ]
+    result = asyncio.run(service.import_transactions(rows, skip_invalid=True))
+    
+    assert result['inserted'] == 3
+    assert result['error_count'] == 1
+    assert result['user_ids'] == [1, 2]
+    (_, (records,)), = service.transaction_repo.calls
+    # The BUY dated first is applied first, so the SELL is covered
+    assert [(record[0], record[2], record[3]) for record in records] == [(1, 'BUY', 5), (2, 'BUY', 1), (1, 'SELL', 2)]
+    (_, (deltas,)), = service.position_repo.calls[1:]
+    assert {(delta['user_id'], delta['symbol']): (delta['buy_units'], delta['sell_units']) for delta in deltas} == {
+        (1, 'TCS'): (5, 2), (2, 'WIPRO'): (1, 0)
+    }
+
+def test_import_user_must_match_import_owner(monkeypatch):
+    service = make_service(monkeypatch)
+    rows = [(1, {'symbol': 'TCS', 'transaction_type': 'BUY', 'units': 1, 'price': 10,
+                 'transaction_date': '2024-01-01'}, None), row(2, user_id=2)]
+    result = asyncio.run(service.import_transactions(rows, user_id=1))
+    
+    assert [error['row'] for error in result['errors']] == [2]
+    assert 'does not match the import user 1' in result['errors'][0]['error']
@@ -0,0 +1,42 @@
+import warnings
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import pytest
+from app.services import history_service
+from app.services.history_service import PortfolioHistoryService, history_range, parse_interval, to_naive_utc
+from app.utils.exceptions import InvalidHistoryRangeException
+
+IST = timezone(timedelta(hours=5, minutes=30))
+
+def test_to_naive_utc():
+    assert to_naive_utc(datetime(2024, 1, 1, 5, 30, tzinfo=IST)) == datetime(2024, 1, 1, 0, 0)
+    assert to_naive_utc(datetime(2024, 1, 1, 12, 0)) == datetime(2024, 1, 1, 12, 0)
+
+def test_aware_from_without_to(monkeypatch):
+    monkeypatch.setattr(history_service, 'utc_now', lambda: datetime(2024, 1, 10, 12, 0))
+    start, end = history_range(datetime(2024, 1, 1, tzinfo=timezone.utc), None)
+    
+    assert (start, end) == (datetime(2024, 1, 1), datetime(2024, 1, 10, 12, 0))
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        grid, step = PortfolioHistoryService().build_grid(start, end, parse_interval('1d'))
+    assert step == 86400
+    assert grid[0] == np.datetime64('2024-01-01T00:00:00') and len(grid) == 10
+
+def test_mixed_offset_bounds():
+    start, end = history_range(datetime(2024, 1, 1, 5, 30, tzinfo=IST), datetime(2024, 1, 1, 3, 0))
+    
+    assert (start, end) == (datetime(2024, 1, 1, 0, 0), datetime(2024, 1, 1, 3, 0))
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        grid, _ = PortfolioHistoryService().build_grid(start, end, parse_interval('1h'))
+    assert grid.tolist() == [datetime(2024, 1, 1, hour) for hour in range(4)]
+    
+    # 06:00+05:30 is 00:30 UTC, so it falls after a 00:00 UTC end
+    start, end = history_range(datetime(2024, 1, 1, 6, 0, tzinfo=IST), datetime(2024, 1, 1, 0, 0, tzinfo=timezone.utc))
+    with pytest.raises(InvalidHistoryRangeException):
+        PortfolioHistoryService().build_grid(start, end, 3600)
+
+def test_default_range_is_thirty_days_before_to():
+    start, end = history_range(None, datetime(2024, 3, 1, tzinfo=timezone.utc))
+    assert (start, end) == (datetime(2024, 1, 31), datetime(2024, 3, 1))
@@ -0,0 +1,202 @@
+import asyncio
+from datetime import date
+from decimal import Decimal
+from app.services.lot_service import COMPACT_MIN_HEAD, LotBook, LotService, lot_report, to_cents
+
+DAY = date(2024, 1, 1).toordinal()
+
+def totals(book: LotBook) -> dict:
+    return {
+        'bought_units': book.bought_units,
+        'sold_units': book.sold_units,
+        'unmatched_units': book.unmatched_units,
+        'realized_cents': book.realized_cents,
+        'realized_cost_cents': book.realized_cost_cents,
+        'last_date': date.fromordinal(book.last_day) if book.last_day else None
+    }
+
+def test_to_cents_is_exact():
+    assert to_cents(Decimal('123.45')) == 12345
+    assert to_cents(0.1) == 10
+    assert to_cents(1999.99) == 199999
+
+def test_fifo_sell_spans_lots():
+    book = LotBook()
+    book.buy(1, DAY, 100, 1000)
+    book.buy(2, DAY + 1, 50, 2000)
+    book.sell(DAY + 2, 120, 1500)
+    
+    assert book.realized_cents == 100 * 500 + 20 * -500
+    assert book.realized_cost_cents == 100 * 1000 + 20 * 2000
+    assert list(book.open_lots()) == [(2, DAY + 1, 30, 2000)]
+    assert book.open_units == 30
+
+def test_specific_lots_then_fifo_remainder():
+    book = LotBook()
+    book.buy(1, DAY, 10, 1000)
+    book.buy(2, DAY, 10, 3000)
+    book.sell(DAY + 1, 15, 2000, [(2, 10)])
+    
+    # Lot 2 as selected, then the 5 units left over from lot 1 (FIFO)
+    assert book.realized_cents == 10 * -1000 + 5 * 1000
+    assert list(book.open_lots()) == [(1, DAY, 5, 1000)]
+
+def test_selection_of_a_closed_lot_falls_back_to_fifo():
+    book = LotBook()
+    book.buy(1, DAY, 10, 1000)
+    book.buy(2, DAY, 10, 1000)
+    book.sell(DAY, 10, 1000, [(1, 10)])
+    book.sell(DAY, 5, 1000, [(1, 5)])
+    
+    assert list(book.open_lots()) == [(2, DAY, 5, 1000)]
+    assert book.unmatched_units == 0
+
+def test_unmatched_units_are_tracked():
+    book = LotBook()
+    book.sell(DAY, 5, 1000)
+    book.buy(1, DAY + 1, 10, 800)
+    
+    assert book.unmatched_units == 5
+    assert book.open_units == 10
+    assert book.realized_cents == 0
+
+def test_compaction_drops_consumed_prefix():
+    book = LotBook()
+    lots = 4 * COMPACT_MIN_HEAD
+    for lot_id in range(lots):
+        book.buy(lot_id, DAY, 1, 100)
+    book.sell(DAY, lots - 10, 150)
+    
+    assert book.head == 0
+    assert len(book.units) == 10
+    assert [lot_id for lot_id, _, _, _ in book.open_lots()] == list(range(lots - 10, lots))
+    assert book.realized_cents == (lots - 10) * 50
+
+def test_pack_round_trip():
+    book = LotBook()
+    book.buy(7, DAY, 10, 1234)
+    book.buy(8, DAY + 3, 4, 99)
+    book.sell(DAY + 4, 3, 2000)
+    
+    restored = LotBook.unpack(book.pack(), totals(book))
+    assert list(restored.open_lots()) == list(book.open_lots())
+    assert totals(restored) == totals(book)
+    
+    empty = LotBook.unpack(LotBook().pack(), totals(LotBook()))
+    assert list(empty.open_lots()) == [] and empty.last_day == 0
+
+class FakeLotRepository:
+    # Persists books through pack/unpack like lot_books does
+    def __init__(self, ledger):
+        self.ledger = ledger
+        self.progress = None
+        self.stored = {}
+        self.saves = []
+    
+    async def get_progress(self, user_id):
+        return self.progress
+    
+    async def get_books(self, user_id):
+        return {symbol: LotBook.unpack(packed, row) for symbol, (packed, row) in self.stored.items()}
+    
+    async def get_transactions(self, user_id, after_id=0, date_order=False):
+        rows = [row for row in self.ledger if row['transaction_id'] > after_id]
+        if date_order:
+            return sorted(rows, key=lambda row: (row['transaction_date'], row['transaction_id']))
+        return sorted(rows, key=lambda row: row['transaction_id'])
+    
+    async def save(self, user_id, books, expected_last_id, last_id, replace=False):
+        if expected_last_id != self.progress:
+            return False
+        self.saves.append((set(books), replace))
+        if replace:
+            self.stored = {}
+        for symbol, book in books.items():
+            self.stored[symbol] = (book.pack(), totals(book))
+        self.progress = last_id
+        return True
+
+class FakePositionRepository:
+    def __init__(self, ledger):
+        self.ledger = ledger
+    
+    async def get_totals(self, user_id):
+        result = {}
+        for row in self.ledger:
+            bought, sold = result.get(row['symbol'], (0, 0))
+            if row['transaction_type'] == 'BUY':
+                result[row['symbol']] = (bought + row['units'], sold)
+            else:
+                result[row['symbol']] = (bought, sold + row['units'])
+        return result
+
+def make_service():
+    ledger = []
+    service = LotService()
+    service.lot_repo = FakeLotRepository(ledger)
+    service.position_repo = FakePositionRepository(ledger)
+    
+    def add(transaction_id, symbol, transaction_type, units, price, day, lots=None):
+        ledger.append({
+            'transaction_id': transaction_id, 'symbol': symbol, 'transaction_type': transaction_type,
+            'units': units, 'price': Decimal(str(price)), 'transaction_date': date(2024, 1, day), 'lots': lots
+        })
+    return service, add
+
+def test_refresh_is_incremental():
+    service, add = make_service()
+    add(1, 'TCS', 'BUY', 10, 100, 1)
+    add(2, 'INFY', 'BUY', 5, 50, 1)
+    books, last_id = asyncio.run(service.refresh(1))
+    assert last_id == 2
+    assert service.lot_repo.saves == [({'TCS', 'INFY'}, False)]
+    
+    add(3, 'TCS', 'SELL', 4, 120, 2)
+    books, last_id = asyncio.run(service.refresh(1))
+    assert last_id == 3
+    assert service.lot_repo.saves[-1] == ({'TCS'}, False)
+    assert books['TCS'].realized_cents == 4 * 2000
+    
+    # Nothing new: no write
+    asyncio.run(service.refresh(1))
+    assert len(service.lot_repo.saves) == 2
+
+def test_backdated_transaction_triggers_replay():
+    service, add = make_service()
+    add(1, 'TCS', 'BUY', 10, 100, 2)
+    add(2, 'TCS', 'SELL', 10, 120, 3)
+    asyncio.run(service.refresh(1))
+    
+    # A cheaper BUY dated before the SELL changes which lot the SELL consumed
+    add(3, 'TCS', 'BUY', 10, 90, 1)
+    books, last_id = asyncio.run(service.refresh(1))
+    
+    assert service.lot_repo.saves[-1] == ({'TCS'}, True)
+    assert last_id == 3
+    assert books['TCS'].realized_cents == 10 * 3000
+    assert list(books['TCS'].open_lots()) == [(1, date(2024, 1, 2).toordinal(), 10, 10000)]
+
+def test_totals_mismatch_triggers_replay():
+    service, add = make_service()
+    add(1, 'TCS', 'BUY', 10, 100, 1)
+    add(3, 'TCS', 'BUY', 5, 100, 2)
+    asyncio.run(service.refresh(1))
+    
+    # Committed after id 3 had already been processed
+    add(2, 'TCS', 'BUY', 1, 100, 2)
+    books, last_id = asyncio.run(service.refresh(1))
+    
+    assert service.lot_repo.saves[-1] == ({'TCS'}, True)
+    assert books['TCS'].open_units == 16
+
+def test_lot_report_totals():
+    service, add = make_service()
+    add(1, 'TCS', 'BUY', 10, 100, 1)
+    add(2, 'TCS', 'SELL', 4, 150, 2)
+    books, last_id = asyncio.run(service.refresh(1))
+    report = lot_report(1, books, last_id, {'TCS': 110.0}, include_lots=True)
+    
+    assert report['realized_pl'] == 200.0
+    assert report['unrealized_pl'] == 60.0
+    assert report['total_pl'] == 260.0
+    assert report['holdings'][0]['open_lots'][0]['units'] == 6
@@ -0,0 +1,33 @@
+import base64
+from datetime import date, datetime, timezone
+import pytest
+from app.utils.exceptions import InvalidCursorException
+from app.utils.pagination import decode_transaction_cursor, encode_transaction_cursor
+
+def test_cursor_round_trip():
+    row = {
+        'transaction_date': date(2024, 2, 29),
+        'created_at': datetime(2024, 3, 1, 12, 30, 5, 123456, tzinfo=timezone.utc),
+        'transaction_id': 987654321
+    }
+    cursor = encode_transaction_cursor(row)
+    
+    assert '=' not in cursor and '+' not in cursor and '/' not in cursor
+    assert decode_transaction_cursor(cursor) == (row['transaction_date'], row['created_at'], row['transaction_id'])
+
+def test_cursor_round_trip_naive_timestamp():
+    row = {'transaction_date': date(2023, 1, 1), 'created_at': datetime(2023, 1, 1, 0, 0), 'transaction_id': 1}
+    
+    assert decode_transaction_cursor(encode_transaction_cursor(row)) == (date(2023, 1, 1), datetime(2023, 1, 1), 1)
+
+@pytest.mark.parametrize('cursor', [
+    '',
+    'not-a-cursor',
+    base64.urlsafe_b64encode(b'[1, 2]').decode(),
+    base64.urlsafe_b64encode(b'["2024-01-01", "yesterday", 5]').decode(),
+    base64.urlsafe_b64encode(b'["2024-01-01", "2024-01-01T00:00:00", "x"]').decode(),
+    base64.urlsafe_b64encode(b'{"a": 1}').decode()
+])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursorException):
+        decode_transaction_cursor(cursor)
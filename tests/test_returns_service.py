@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+import numpy as np
+from app.services.returns_service import npv, pad_cash_flows, time_weighted_return, xirr
+
+START = date(2021, 1, 1)
+
+def day(offset: int) -> date:
+    return START + timedelta(days=offset)
+
+def test_xirr_known_answers():
+    amounts, years = pad_cash_flows([
+        [(day(0), -1000.0), (day(365), 1100.0)],
+        [(day(0), -1000.0), (day(730), 1210.0)],
+        [(day(0), -1000.0), (day(365), 900.0)],
+        [(day(0), -500.0), (day(100), -500.0), (day(200), 300.0), (day(400), 900.0)]
+    ])
+    rates = xirr(amounts, years)
+    
+    np.testing.assert_allclose(rates[:3], [0.1, 0.1, -0.1], atol=1e-9)
+    assert abs(npv(amounts[3:], years[3:], rates[3:])[0]) < 1e-6
+
+def test_xirr_rows_without_sign_change_are_nan():
+    amounts, years = pad_cash_flows([
+        [(day(0), -1000.0), (day(365), 1100.0)],
+        [],
+        [(day(0), -1000.0), (day(10), -50.0)],
+        [(day(0), 200.0), (day(10), 300.0)]
+    ])
+    rates = xirr(amounts, years)
+    
+    assert abs(rates[0] - 0.1) < 1e-9
+    assert np.isnan(rates[1:]).all()
+
+def test_xirr_bisects_rows_newton_cannot_start():
+    # At a -100% guess the first Newton step is inf/inf, so the guess is never moved
+    amounts, years = pad_cash_flows([[(day(0), -1000.0), (day(365), 1100.0)]])
+    
+    np.testing.assert_allclose(xirr(amounts, years, guess=-1.0), [0.1], atol=1e-9)
+
+def test_time_weighted_return_ignores_inflows():
+    values = np.array([[100.0, 110.0, 1110.0, 1221.0]])
+    inflows = np.array([[100.0, 0.0, 1000.0, 0.0]])
+    
+    np.testing.assert_allclose(time_weighted_return(values, inflows), [1.1 * 1.0 * 1.1 - 1])
@@ -0,0 +1,37 @@
+import pytest
+from fastapi import HTTPException
+from app.routers.admin import manual_price_update
+from app.utils import scheduler
+
+@pytest.fixture
+def tick(monkeypatch):
+    calls = []
+    state = {'leader': True, 'result': {'rows_written': 3, 'duration_ms': 1.0}}
+    monkeypatch.setattr(scheduler.leader, 'campaign', lambda: state['leader'])
+    monkeypatch.setattr(scheduler, 'update_prices_job', lambda: calls.append(1) or state['result'])
+    monkeypatch.setattr(scheduler.settings, 'cache_warm_enabled', False)
+    state['calls'] = calls
+    return state
+
+def test_manual_update_runs_the_tick_on_the_leader(tick):
+    runs = scheduler.scheduler_stats()['update_prices']['manual_runs']
+    
+    assert manual_price_update() == {"message": "Price update triggered successfully", 'rows_written': 3, 'duration_ms': 1.0}
+    assert tick['calls'] == [1]
+    assert scheduler.scheduler_stats()['update_prices']['manual_runs'] == runs + 1
+
+def test_manual_update_is_refused_on_a_follower(tick):
+    tick['leader'] = False
+    with pytest.raises(HTTPException) as error:
+        manual_price_update()
+    
+    assert error.value.status_code == 409
+    assert tick['calls'] == []
+
+def test_failed_manual_update_is_an_error(tick):
+    tick['result'] = None
+    with pytest.raises(HTTPException) as error:
+        manual_price_update()
+    
+    assert error.value.status_code == 500
+    assert tick['calls'] == [1]